@@ -1,5 +1,92 @@
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
 from rest_framework import permissions
-from .models import ScopeType
+from orgs.versions import bump_version, get_version
+
+from .models import DataScope, Role, ScopeType
+
+
+PERMISSION_VERSION_NAME = 'accounts.perms'
+PERMISSION_CACHE_TIMEOUT = 60 * 60
+
+# JWT 中的权限声明（见 accounts/tokens.py）
+PERMISSIONS_CLAIM = 'perms'
+PERMISSION_VERSION_CLAIM = 'perm_ver'
+
+
+def get_permission_version():
+    """获取全局权限版本号（存于数据库，角色或角色分配变更时递增）"""
+    return get_version(PERMISSION_VERSION_NAME)
+
+
+def bump_permission_version():
+    """递增全局权限版本号，使所有进程中所有用户的权限缓存失效"""
+    bump_version(PERMISSION_VERSION_NAME)
+
+
+def permission_cache_key(user_id):
+    """用户有效权限缓存键"""
+    return f'accounts:perms:{get_permission_version()}:{user_id}'
+
+
+def get_token_permission_claims(request):
+    """
+    读取请求令牌中的权限声明
+
+    角色定义或用户角色分配变更会递增全局版本号（存于数据库，所有进程可见），
+    旧令牌中的声明随即失效并回退到查库，直到下次刷新令牌时写入新声明
+    """
+    token = getattr(request, 'auth', None)
+    if token is None or not hasattr(token, 'get'):
+        return None
+    codes = token.get(PERMISSIONS_CLAIM)
+    if codes is None or token.get(PERMISSION_VERSION_CLAIM) != get_permission_version():
+        return None
+    return frozenset(codes)
+
+
+def get_user_permissions(user, request=None):
+    """
+    获取用户有效权限点集合
+
+    优先读取本次请求上的缓存与令牌声明，其次读取按权限版本号缓存的结果，
+    都未命中时以单次查询汇总用户所有启用角色的权限点
+
+    Args:
+        user: 用户对象
+        request: 当前请求（可选），用于在同一请求内复用结果
+
+    Returns:
+        权限码 frozenset
+    """
+    if request is not None and getattr(request, 'user', None) is not None and request.user.pk == user.pk:
+        cached = getattr(request, '_user_permission_codes', None)
+        if cached is not None:
+            return cached
+
+        # 令牌声明的权限版本与当前一致时直接使用，无需查库
+        claims = get_token_permission_claims(request)
+        if claims is not None:
+            request._user_permission_codes = claims
+            return claims
+    else:
+        request = None
+
+    key = permission_cache_key(user.pk)
+    user_permissions = cache.get(key)
+    if user_permissions is None:
+        user_permissions = set()
+        role_permissions = Role.objects.filter(role_users__user=user, is_active=True).values_list(
+            'permissions', flat=True
+        )
+        for codes in role_permissions:
+            user_permissions.update(codes or [])
+        user_permissions = frozenset(user_permissions)
+        cache.set(key, user_permissions, PERMISSION_CACHE_TIMEOUT)
+
+    if request is not None:
+        request._user_permission_codes = user_permissions
+    return user_permissions
 
 
 class HasPermissionCode(permissions.BasePermission):
@@ -23,14 +110,184 @@ class HasPermissionCode(permissions.BasePermission):
             return True
 
         # 检查用户是否有所需权限
-        user_permissions = set()
-        for user_role in request.user.user_roles.all():
-            if user_role.role.is_active:
-                user_permissions.update(user_role.role.permissions)
+        user_permissions = get_user_permissions(request.user, request)
 
         return permission_code in user_permissions
 
 
+SCOPE_VERSION_NAME = 'accounts.scope'
+SCOPE_CACHE_TIMEOUT = 60 * 60
+
+
+def bump_scope_version():
+    """递增数据范围版本号，使所有进程中所有用户的已编译数据范围失效"""
+    bump_version(SCOPE_VERSION_NAME)
+
+
+def get_scope_version():
+    """获取数据范围版本号（存于数据库）"""
+    return get_version(SCOPE_VERSION_NAME)
+
+
+class CompiledScope:
+    """已编译的数据范围：范围类型 + 授权子树的物化路径前缀"""
+
+    def __init__(self, scope_type, paths=()):
+        self.scope_type = scope_type
+        self.paths = tuple(paths)
+
+    def subtree(self, path_field):
+        """
+        生成“path_field 位于授权子树内”的条件
+
+        以物化路径前缀匹配（可用 path 索引），不展开成单元ID列表；没有授权单元时返回 None
+        """
+        if not self.paths:
+            return None
+        condition = Q()
+        for prefix in self.paths:
+            condition |= Q(**{f'{path_field}__startswith': prefix})
+        return condition
+
+
+def compile_data_scope(user):
+    """
+    解析用户数据范围
+
+    ORG_UNIT 范围编译为授权单元的物化路径前缀（已去掉被其他前缀覆盖的下级），结果按
+    数据范围版本号与组织树版本号缓存，任一变化都会重新编译
+
+    Returns:
+        CompiledScope；用户没有数据范围时返回 None
+    """
+    from orgs.tree import get_tree_version
+
+    key = f'accounts:scope:{get_scope_version()}:{get_tree_version()}:{user.pk}'
+    cached = cache.get(key)
+    if cached is not None:
+        return CompiledScope(*cached) if cached else None
+
+    data_scope = DataScope.objects.filter(user=user).first()
+    if data_scope is None:
+        cache.set(key, (), SCOPE_CACHE_TIMEOUT)
+        return None
+
+    paths = []
+    if data_scope.scope_type == ScopeType.ORG_UNIT:
+        for path in sorted(data_scope.org_units.values_list('path', flat=True)):
+            if not paths or not path.startswith(paths[-1]):
+                paths.append(path)
+
+    compiled = (data_scope.scope_type, paths)
+    cache.set(key, compiled, SCOPE_CACHE_TIMEOUT)
+    return CompiledScope(*compiled)
+
+
+DATA_SCOPE_FILTERS = {}
+
+
+def register_data_scope(model_label):
+    """
+    注册模型的数据范围过滤表达式
+
+    被装饰函数签名为 (user, scope)，返回 Q 对象；返回 None 表示无权查看任何数据。
+    ORG_UNIT 与 SELF 范围都通过该函数生成过滤条件；
+    SELF 范围只能查看本人的干部档案与用户信息，其他模型返回 None
+    """
+    def decorator(func):
+        DATA_SCOPE_FILTERS[model_label] = func
+        return func
+    return decorator
+
+
+def _active_org_membership(scope, cadre_ref='pk'):
+    from staffing.models import OrgMembership, MembershipStatus
+    subtree = scope.subtree('org_unit__path')
+    if subtree is None:
+        return None
+    return Q(Exists(OrgMembership.objects.filter(
+        subtree,
+        cadre_id=OuterRef(cadre_ref),
+        status=MembershipStatus.ACTIVE
+    )))
+
+
+def _active_user_membership(scope, user_ref='pk'):
+    from orgs.models import Membership
+    subtree = scope.subtree('unit__path')
+    if subtree is None:
+        return None
+    return Q(Exists(Membership.objects.filter(
+        subtree,
+        user_id=OuterRef(user_ref),
+        effective_to__isnull=True
+    )))
+
+
+@register_data_scope('cadres.Cadre')
+def _cadre_scope(user, scope):
+    if scope.scope_type == ScopeType.SELF:
+        return Q(pk=user.profile_cadre_id) if user.profile_cadre_id else None
+    return _active_org_membership(scope)
+
+
+@register_data_scope('staffing.OrgMembership')
+def _org_membership_scope(user, scope):
+    from staffing.models import MembershipStatus
+    if scope.scope_type == ScopeType.SELF:
+        return None
+    subtree = scope.subtree('org_unit__path')
+    return subtree & Q(status=MembershipStatus.ACTIVE) if subtree is not None else None
+
+
+@register_data_scope('orgs.OrgUnit')
+def _org_unit_scope(user, scope):
+    if scope.scope_type == ScopeType.SELF:
+        return None
+    return scope.subtree('path')
+
+
+@register_data_scope('cadres.PersonnelRoster')
+def _roster_scope(user, scope):
+    from orgs.models import OrgUnit
+    if scope.scope_type == ScopeType.SELF:
+        return None
+    # 花名册以部门名称关联组织单元
+    subtree = scope.subtree('path')
+    if subtree is None:
+        return None
+    return Q(Exists(OrgUnit.objects.filter(subtree, name=OuterRef('department'))))
+
+
+@register_data_scope('staffing.StaffingPlanMove')
+def _plan_move_scope(user, scope):
+    if scope.scope_type == ScopeType.SELF:
+        return None
+    from_unit, to_unit = scope.subtree('from_unit__path'), scope.subtree('to_unit__path')
+    return from_unit | to_unit if from_unit is not None else None
+
+
+@register_data_scope('analytics.UnitMetric')
+def _unit_metric_scope(user, scope):
+    if scope.scope_type == ScopeType.SELF:
+        return None
+    return scope.subtree('unit__path')
+
+
+@register_data_scope('audit.AuditLog')
+def _audit_log_scope(user, scope):
+    if scope.scope_type == ScopeType.SELF:
+        return None
+    return _active_user_membership(scope, 'actor_id')
+
+
+@register_data_scope('accounts.User')
+def _user_scope(user, scope):
+    if scope.scope_type == ScopeType.SELF:
+        return Q(pk=user.pk)
+    return _active_user_membership(scope)
+
+
 class DataScopePermission:
     """数据范围权限过滤器"""
 
@@ -50,56 +307,23 @@ class DataScopePermission:
         if user.is_superuser:
             return queryset
 
-        try:
-            data_scope = user.data_scope
-
-            if data_scope.scope_type == ScopeType.ALL:
-                # 全部数据权限
-                return queryset
-            elif data_scope.scope_type == ScopeType.ORG_UNIT:
-                # 指定组织单元权限
-                allowed_org_units = data_scope.org_units.all()
-
-                # 如果查询集是Cadre
-                if queryset.model.__name__ == 'Cadre':
-                    from staffing.models import OrgMembership
-                    cadre_ids = OrgMembership.objects.filter(
-                        org_unit__in=allowed_org_units,
-                        status='ACTIVE'
-                    ).values_list('cadre_id', flat=True)
-                    return queryset.filter(id__in=cadre_ids)
-
-                # 如果查询集是OrgMembership
-                elif queryset.model.__name__ == 'OrgMembership':
-                    return queryset.filter(
-                        org_unit__in=allowed_org_units,
-                        status='ACTIVE'
-                    )
-
-                # 如果查询集是OrgUnit
-                elif queryset.model.__name__ == 'OrgUnit':
-                    return queryset.filter(id__in=allowed_org_units)
-
-                # 其他情况，返回空
-                return queryset.none()
-
-            elif data_scope.scope_type == ScopeType.SELF:
-                # 本人权限
-                if queryset.model.__name__ == 'Cadre':
-                    if hasattr(user, 'profile_cadre') and user.profile_cadre:
-                        return queryset.filter(id=user.profile_cadre.id)
-                    else:
-                        return queryset.none()
-                elif queryset.model.__name__ == 'User':
-                    return queryset.filter(id=user.id)
-                else:
-                    return queryset.none()
-
-        except Exception:
-            # 如果出现异常，返回空数据
+        scope = compile_data_scope(user)
+        if scope is None:
             return queryset.none()
 
-        return queryset.none()
+        if scope.scope_type == ScopeType.ALL:
+            # 全部数据权限
+            return queryset
+
+        # 未注册的模型，返回空
+        scope_filter = DATA_SCOPE_FILTERS.get(queryset.model._meta.label)
+        if scope_filter is None:
+            return queryset.none()
+
+        condition = scope_filter(user, scope)
+        if condition is None:
+            return queryset.none()
+        return queryset.filter(condition)
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -142,10 +366,7 @@ class CanManageStaffingPlan(permissions.BasePermission):
             'staffing:plan:apply'
         ]
 
-        user_permissions = set()
-        for user_role in request.user.user_roles.all():
-            if user_role.role.is_active:
-                user_permissions.update(user_role.role.permissions)
+        user_permissions = get_user_permissions(request.user, request)
 
         # 创建草案只需要create权限
         if request.method == 'POST' and view.action == 'create':
@@ -175,10 +396,7 @@ class CanManageRiskData(permissions.BasePermission):
             return True
 
         # 检查是否有风险管理权限
-        user_permissions = set()
-        for user_role in request.user.user_roles.all():
-            if user_role.role.is_active:
-                user_permissions.update(user_role.role.permissions)
+        user_permissions = get_user_permissions(request.user, request)
 
         # 读取权限
         if request.method in permissions.SAFE_METHODS:
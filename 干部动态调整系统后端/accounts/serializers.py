@@ -1,9 +1,13 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import User, Role, DataScope, ScopeType
-from audit.models import AuditLog, AuditAction
+from .permissions import get_user_permissions
+from .tokens import ClaimsRefreshToken
+from audit.models import AuditAction
+from audit.writer import record_audit
 
 
 class LoginSerializer(serializers.Serializer):
@@ -22,7 +26,7 @@ class LoginSerializer(serializers.Serializer):
 
         if user is None:
             # 记录登录失败日志
-            AuditLog.objects.create(
+            record_audit(
                 actor=None,
                 action=AuditAction.OTHER,
                 target_type='User',
@@ -36,7 +40,7 @@ class LoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('用户名或密码错误')
 
         if not user.is_active:
-            AuditLog.objects.create(
+            record_audit(
                 actor=user,
                 action=AuditAction.OTHER,
                 target_type='User',
@@ -66,7 +70,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     def get_roles(self, obj):
         """获取用户角色列表"""
-        return [user_role.role.code for user_role in obj.user_roles.all() if user_role.role.is_active]
+        return list(obj.user_roles.filter(role__is_active=True).values_list('role__code', flat=True))
 
     def get_data_scope(self, obj):
         """获取用户数据范围"""
@@ -84,16 +88,20 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     def get_permissions(self, obj):
         """获取用户权限点"""
-        permissions = set()
-        for user_role in obj.user_roles.all():
-            if user_role.role.is_active:
-                permissions.update(user_role.role.permissions)
-        return list(permissions)
+        return sorted(get_user_permissions(obj, self.context.get('request')))
 
 
-class RefreshTokenSerializer(serializers.Serializer):
-    """刷新Token序列化器"""
-    refresh = serializers.CharField()
+class RefreshTokenSerializer(TokenRefreshSerializer):
+    """刷新Token序列化器（按用户当前角色重新写入权限声明）"""
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is not None and user.is_active:
+            refresh.apply_claims(user)
+            attrs['refresh'] = str(refresh)
+        return super().validate(attrs)
 
 
 class LogoutSerializer(serializers.Serializer):
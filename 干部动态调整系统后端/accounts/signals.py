@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import DataScope, Role, UserRole
+from .permissions import bump_permission_version, bump_scope_version
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_permissions(sender, **kwargs):
+    """角色权限点或启用状态变更后，使所有用户的权限缓存失效"""
+    transaction.on_commit(bump_permission_version)
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_role_permissions(sender, **kwargs):
+    """
+    用户角色分配变更后，使权限缓存失效
+
+    递增全局版本号而不是只删除该用户的缓存键：其他进程本地缓存中的结果同样不再命中
+    """
+    transaction.on_commit(bump_permission_version)
+
+
+@receiver(post_save, sender=DataScope)
+@receiver(post_delete, sender=DataScope)
+@receiver(m2m_changed, sender=DataScope.org_units.through)
+def invalidate_data_scopes(sender, **kwargs):
+    """数据范围或其组织单元变更后，使已编译的数据范围失效"""
+    transaction.on_commit(bump_scope_version)
@@ -1,3 +1,169 @@
+from datetime import date
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db.models import F
 from django.test import TestCase
 
-# Create your tests here.
+from cadres.models import Cadre, Gender, PersonnelRoster
+from orgs.models import CacheVersion, OrgUnit, UnitType
+from staffing.models import MembershipStatus, OrgMembership
+
+from .models import DataScope, Role, ScopeType, User, UserRole
+from .permissions import (
+    PERMISSIONS_CLAIM,
+    PERMISSION_VERSION_CLAIM,
+    PERMISSION_VERSION_NAME,
+    DataScopePermission,
+    bump_permission_version,
+    compile_data_scope,
+    get_token_permission_claims,
+    get_user_permissions,
+)
+from .tokens import ClaimsRefreshToken
+
+
+class PermissionTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u', password='x', real_name='用户', email='u@a.com')
+        self.role = Role.objects.create(code=Role.ANALYST, name='研判', permissions=['cadres:view'])
+        UserRole.objects.create(user=self.user, role=self.role)
+
+    def token_request(self):
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        return SimpleNamespace(user=self.user, auth=token)
+
+
+class TokenClaimsTests(PermissionTestCase):
+    """令牌权限声明"""
+
+    def test_token_carries_permission_claims_only(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        self.assertEqual(token[PERMISSIONS_CLAIM], ['cadres:view'])
+        self.assertIn(PERMISSION_VERSION_CLAIM, token)
+        self.assertNotIn('scope_type', token)
+        self.assertNotIn('scope_units', token)
+
+    def test_claims_trusted_until_version_changes(self):
+        request = self.token_request()
+        self.assertEqual(get_token_permission_claims(request), frozenset(['cadres:view']))
+
+        bump_permission_version()
+        self.assertIsNone(get_token_permission_claims(request))
+
+    def test_claims_revoked_by_role_assignment_change(self):
+        request = self.token_request()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.filter(user=self.user).delete()
+        self.assertIsNone(get_token_permission_claims(request))
+        self.assertEqual(get_user_permissions(self.user, request), frozenset())
+
+
+class UserPermissionTests(PermissionTestCase):
+    """有效权限与缓存失效"""
+
+    def test_cached_until_version_changes(self):
+        self.assertEqual(get_user_permissions(self.user), frozenset(['cadres:view']))
+        Role.objects.filter(pk=self.role.pk).update(permissions=['cadres:view', 'cadres:edit'])
+        self.assertEqual(get_user_permissions(self.user), frozenset(['cadres:view']))
+
+        # 模拟其他进程递增版本号：版本号存于数据库，本进程的本地缓存随即不再命中
+        CacheVersion.objects.filter(name=PERMISSION_VERSION_NAME).update(version=F('version') + 1)
+        self.assertEqual(get_user_permissions(self.user), frozenset(['cadres:view', 'cadres:edit']))
+
+    def test_invalidated_by_role_change(self):
+        self.assertEqual(get_user_permissions(self.user), frozenset(['cadres:view']))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.permissions = ['audit:view']
+            self.role.save()
+        self.assertEqual(get_user_permissions(self.user), frozenset(['audit:view']))
+
+    def test_invalidated_by_role_removal(self):
+        self.assertEqual(get_user_permissions(self.user), frozenset(['cadres:view']))
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.get(user=self.user).delete()
+        self.assertEqual(get_user_permissions(self.user), frozenset())
+
+    def test_request_memo(self):
+        request = SimpleNamespace(user=self.user, auth=None)
+        get_user_permissions(self.user, request)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_permissions(self.user, request), frozenset(['cadres:view']))
+
+
+class DataScopeTests(PermissionTestCase):
+    """数据范围编译与过滤"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = OrgUnit.objects.create(name='根', unit_type=UnitType.DEPARTMENT)
+        self.child = OrgUnit.objects.create(name='下级', parent=self.root, unit_type=UnitType.BRANCH)
+        self.other = OrgUnit.objects.create(name='其他', unit_type=UnitType.DEPARTMENT)
+        self.scope = DataScope.objects.create(user=self.user, scope_type=ScopeType.ORG_UNIT)
+        self.scope.org_units.add(self.root)
+
+    def test_org_unit_scope_compiles_to_path_prefixes(self):
+        self.scope.org_units.add(self.child)
+        scope = compile_data_scope(self.user)
+        # 被上级覆盖的下级单元不再单独生成前缀
+        self.assertEqual(scope.paths, (self.root.path,))
+        units = DataScopePermission.apply_data_scope(self.user, OrgUnit.objects.all())
+        self.assertEqual(set(units), {self.root, self.child})
+
+    def test_filters_join_through_unit_paths(self):
+        inside = Cadre.objects.create(cadre_code='C001', name='张一')
+        outside = Cadre.objects.create(cadre_code='C002', name='李二')
+        OrgMembership.objects.create(cadre=inside, org_unit=self.child, start_date=date(2020, 1, 1))
+        OrgMembership.objects.create(cadre=outside, org_unit=self.other, start_date=date(2020, 1, 1))
+        OrgMembership.objects.create(
+            cadre=outside, org_unit=self.child, start_date=date(2019, 1, 1), status=MembershipStatus.INACTIVE
+        )
+        for number, (name, department) in enumerate([('张一', '下级'), ('李二', '其他')], start=1):
+            PersonnelRoster.objects.create(serial_number=number, name=name, department=department, gender=Gender.MALE)
+
+        def visible(queryset):
+            return DataScopePermission.apply_data_scope(self.user, queryset)
+
+        self.assertEqual(list(visible(Cadre.objects.all())), [inside])
+        self.assertEqual([row.cadre for row in visible(OrgMembership.objects.all())], [inside])
+        self.assertEqual([row.name for row in visible(PersonnelRoster.objects.all())], ['张一'])
+
+    def test_self_scope_sees_own_cadre_and_user_only(self):
+        cadre = Cadre.objects.create(cadre_code='C001', name='张一')
+        OrgMembership.objects.create(cadre=cadre, org_unit=self.child, start_date=date(2020, 1, 1))
+        self.user.profile_cadre = cadre
+        self.user.save()
+        DataScope.objects.filter(pk=self.scope.pk).update(scope_type=ScopeType.SELF)
+
+        def visible(queryset):
+            return DataScopePermission.apply_data_scope(self.user, queryset)
+
+        self.assertEqual(list(visible(Cadre.objects.all())), [cadre])
+        self.assertEqual(list(visible(User.objects.all())), [self.user])
+        self.assertFalse(visible(OrgMembership.objects.all()).exists())
+
+    def test_cached_between_changes(self):
+        compile_data_scope(self.user)
+        with self.assertNumQueries(2):
+            # 只读取两个版本号
+            compile_data_scope(self.user)
+
+    def test_recompiles_after_tree_change(self):
+        compile_data_scope(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.root.parent = self.other
+            self.root.save()
+        self.assertEqual(compile_data_scope(self.user).paths, (self.root.path,))
+
+    def test_recompiles_after_scope_change(self):
+        compile_data_scope(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.scope.org_units.add(self.other)
+        self.assertIn(self.other.path, compile_data_scope(self.user).paths)
+
+    def test_without_scope_sees_nothing(self):
+        self.scope.delete()
+        self.assertIsNone(compile_data_scope(self.user))
+        self.assertFalse(DataScopePermission.apply_data_scope(self.user, OrgUnit.objects.all()).exists())
@@ -10,6 +10,7 @@ from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import DataScope
+from .tokens import ClaimsRefreshToken
 from .serializers import (
     LoginSerializer,
     UserProfileSerializer,
@@ -17,7 +18,8 @@ from .serializers import (
     LogoutSerializer,
     ChangePasswordSerializer
 )
-from audit.models import AuditLog, AuditAction
+from audit.models import AuditAction
+from audit.writer import record_audit
 
 # 登录接口的请求和响应schema
 login_schema = openapi.Schema(
@@ -163,8 +165,8 @@ def login_view(request):
             }
         )
 
-        # 生成JWT tokens
-        refresh = RefreshToken.for_user(user)
+        # 生成JWT tokens（携带权限点声明）
+        refresh = ClaimsRefreshToken.for_user(user)
 
         # 更新登录信息
         user.last_login = timezone.now()
@@ -172,7 +174,7 @@ def login_view(request):
         user.save(update_fields=['last_login', 'last_login_ip'])
 
         # 记录登录成功日志
-        AuditLog.objects.create(
+        record_audit(
             actor=user,
             action=AuditAction.LOGIN,
             target_type='User',
@@ -199,7 +201,7 @@ def login_view(request):
         return Response(response_data, status=status.HTTP_200_OK)
 
     # 记录登录失败日志
-    AuditLog.objects.create(
+    record_audit(
         actor=None,
         action=AuditAction.OTHER,
         target_type='User',
@@ -289,7 +291,7 @@ def logout_view(request):
             token.blacklist()
 
             # 记录登出日志
-            AuditLog.objects.create(
+            record_audit(
                 actor=request.user,
                 action=AuditAction.LOGOUT,
                 target_type='User',
@@ -393,7 +395,7 @@ def change_password_view(request):
         user.save()
 
         # 记录修改密码日志
-        AuditLog.objects.create(
+        record_audit(
             actor=user,
             action=AuditAction.OTHER,
             target_type='User',
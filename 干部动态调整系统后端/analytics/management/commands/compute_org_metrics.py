@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from analytics.metrics import refresh_unit_metrics
+
+
+class Command(BaseCommand):
+    help = '全量重算组织单元结构指标（写入 metrics_snapshot）'
+
+    def handle(self, *args, **options):
+        total = refresh_unit_metrics()
+        print(f"组织单元指标已重算，共 {total} 个单元")
@@ -0,0 +1,527 @@
+"""
+组织单元结构指标
+按在职归属（OrgMembership.status=ACTIVE）统计各单元及其下级单位的干部构成，写入 OrgUnit.metrics_snapshot：
+    headcount         含下级单位的在职人数（同一干部多处归属只计一次）
+    direct_headcount  直接归属本单元的人数
+    average_age       平均年龄
+    age_bands         年龄段人数（35岁及以下 / 36-45岁 / 46-55岁 / 56岁及以上）
+    education         学历层次人数
+    tenure_bands      工龄段人数（按参加工作时间，缺失时按入职时间）
+    b_library         B库（启用的重点人员标签）人数与占比
+    age_total         已知年龄之和（供上级单位由下级快照汇总平均年龄）
+
+B库占比有两种口径：快照与 UnitMetric 为含下级单位的 b_library；方案推演、调整明细风险快照
+与风险排查统一使用 direct_b_library_*（直属成员，见 direct_b_library_counts）。
+
+全量计算时一次查询取出全部归属行，按物化路径展开到各级上级单位后用 NumPy 分组计数，所有单元一并算出。
+快照同时展开为 UnitMetric 的数值列，供排行按索引排序（见 analytics/ranking.py）。
+
+归属、干部信息、B库标签变化或单元移动时只重算受影响的单元及其上级单位（见 analytics/signals.py），
+同一事务内的变化在提交后汇总重算一次。增量重算不读取整棵子树，而是自下而上逐级汇总（rollup_metrics）：
+    上级单位 = 各下级单位快照之和 + 直属成员 - 在多个下级/直属处重复归属的干部（多计的次数）
+只读取路径上各单元的直属归属与多处归属干部的归属行。下级快照的年龄段按各自计算当天划分，
+compute_org_metrics 命令全量重算，宜每日执行以校正
+"""
+
+import uuid
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Exists, FloatField, OuterRef, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from cadres.models import EducationLevel
+from orgs.models import OrgUnit
+from risk_rules.models import RiskPersonTag
+from staffing.models import MembershipStatus, OrgMembership
+
+from .models import UnitMetric
+
+
+# 年龄段/工龄段：(下限, 上限, 名称)，按周岁/整年计，两端均含；None 表示不限
+AGE_BANDS = [
+    (None, 35, '35岁及以下'),
+    (36, 45, '36-45岁'),
+    (46, 55, '46-55岁'),
+    (56, None, '56岁及以上'),
+]
+TENURE_BANDS = [
+    (None, 4, '5年以下'),
+    (5, 9, '5-9年'),
+    (10, 19, '10-19年'),
+    (20, 29, '20-29年'),
+    (30, None, '30年及以上'),
+]
+UNKNOWN = '未知'
+
+EDUCATION_CODES = [level.value for level in EducationLevel]
+BACHELOR_ABOVE = [EducationLevel.BACHELOR, EducationLevel.MASTER, EducationLevel.DOCTOR]
+GRADUATE = [EducationLevel.MASTER, EducationLevel.DOCTOR]
+
+# 指标行随快照重算时更新的字段
+METRIC_ROW_FIELDS = [
+    field.name for field in UnitMetric._meta.concrete_fields if not field.primary_key
+]
+
+# 影响指标的干部字段
+CADRE_METRIC_FIELDS = ['birth_date', 'education_level', 'join_work_date', 'hire_date']
+
+
+def _date_number(value):
+    """日期 -> YYYYMMDD 整数，两者相减后整除 10000 即为周岁/整年；缺失为 -1"""
+    if value is None:
+        return -1
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def _full_years(numbers, today):
+    """YYYYMMDD 数组 -> 截至今天的整年数；缺失为 -1"""
+    years = (_date_number(today) - numbers) // 10000
+    return np.where(numbers < 0, -1, years)
+
+
+def _band_index(values, bands):
+    """整数数组 -> 所在区间序号；缺失（-1）为 len(bands)"""
+    index = np.full(len(values), len(bands), dtype=np.int64)
+    for position, (lower, upper, _) in enumerate(bands):
+        mask = values >= 0
+        if lower is not None:
+            mask &= values >= lower
+        if upper is not None:
+            mask &= values <= upper
+        index[mask] = position
+    return index
+
+
+def _unit_ids_from_path(path):
+    return [uuid.UUID(part) for part in path.strip('/').split('/')]
+
+
+def in_library_annotation(cadre_ref='cadre_id'):
+    """是否在 B库（有启用的重点人员标签）"""
+    return Exists(RiskPersonTag.objects.filter(cadre=OuterRef(cadre_ref), is_active=True))
+
+
+# 计算指标所需的干部字段（相对归属行）
+MEMBERSHIP_ATTRIBUTE_FIELDS = [
+    'cadre__birth_date', 'cadre__education_level', 'cadre__join_work_date', 'cadre__hire_date', 'in_library'
+]
+
+
+def direct_b_library_counts(*fields):
+    """
+    各单元直属成员的 B库人数与占比（direct_b_library_* 口径）
+
+    直属成员为在职归属（主/兼职）直接所在单元的干部，同一干部只计一次，不含下级单位；
+    与 PlanSimulation.direct_metrics 的 headcount / b_library 一致
+
+    Args:
+        fields: 随单元ID一并分组输出的字段（如 'org_unit__name'）
+
+    Returns:
+        按 org_unit_id 分组的查询集，含 direct_headcount、direct_b_library_count、direct_b_library_ratio
+    """
+    return OrgMembership.objects.filter(status=MembershipStatus.ACTIVE).values('org_unit_id', *fields).annotate(
+        direct_headcount=Count('cadre_id', distinct=True),
+        direct_b_library_count=Count('cadre_id', distinct=True, filter=Q(cadre__risk_tag__is_active=True)),
+    ).annotate(
+        direct_b_library_ratio=Cast('direct_b_library_count', FloatField()) / Cast('direct_headcount', FloatField())
+    ).order_by()
+
+
+def cadre_attributes(birth_date, education, join_work_date, hire_date, in_library):
+    """干部 -> 指标计算用的属性（出生日期数值, 学历序号, 工作起始日期数值, 是否B库）"""
+    return (
+        _date_number(birth_date),
+        EDUCATION_CODES.index(education) if education in EDUCATION_CODES else len(EDUCATION_CODES),
+        _date_number(join_work_date or hire_date),
+        int(bool(in_library)),
+    )
+
+
+def _membership_rows(roots):
+    """
+    在职归属行：(所在单元路径, 干部ID, 出生日期, 学历层次, 参加工作时间, 入职时间, 是否B库)
+
+    Args:
+        roots: 单元路径列表，只取这些单元子树内的归属；None 表示全部
+    """
+    queryset = OrgMembership.objects.filter(status=MembershipStatus.ACTIVE)
+    if roots is not None:
+        condition = Q(pk__in=[])
+        for path in roots:
+            condition |= Q(org_unit__path__startswith=path)
+        queryset = queryset.filter(condition)
+    return queryset.annotate(in_library=in_library_annotation()).values_list(
+        'org_unit__path', 'cadre_id', *MEMBERSHIP_ATTRIBUTE_FIELDS
+    ).order_by().iterator(chunk_size=5000)
+
+
+def summarize(unit_of, attributes, unit_count, today=None):
+    """
+    按单元汇总结构指标
+
+    Args:
+        unit_of: 每个 (单元, 干部) 对的单元序号，同一单元内干部不重复
+        attributes: 与 unit_of 对应的干部属性矩阵（n x 4，见 cadre_attributes）
+        unit_count: 单元数
+        today: 计算年龄/工龄的基准日期，默认今天
+
+    Returns:
+        按单元序号排列的指标字典列表
+    """
+    today = today or timezone.localdate()
+    unit_of = np.asarray(unit_of, dtype=np.int64)
+    attributes = np.asarray(attributes, dtype=np.int64).reshape(-1, 4)
+
+    ages = _full_years(attributes[:, 0], today)
+    tenures = _full_years(attributes[:, 2], today)
+    known_age = ages >= 0
+    headcount = np.bincount(unit_of, minlength=unit_count)
+    age_total = np.bincount(unit_of[known_age], weights=ages[known_age], minlength=unit_count)
+    age_known = np.bincount(unit_of[known_age], minlength=unit_count)
+    age_counts = _grouped_counts(unit_of, _band_index(ages, AGE_BANDS), len(AGE_BANDS) + 1, unit_count)
+    education_counts = _grouped_counts(unit_of, attributes[:, 1], len(EDUCATION_CODES) + 1, unit_count)
+    tenure_counts = _grouped_counts(unit_of, _band_index(tenures, TENURE_BANDS), len(TENURE_BANDS) + 1, unit_count)
+    library_counts = np.bincount(unit_of, weights=attributes[:, 3], minlength=unit_count).astype(np.int64)
+
+    age_labels = [label for _, _, label in AGE_BANDS] + [UNKNOWN]
+    education_labels = EDUCATION_CODES + [UNKNOWN]
+    tenure_labels = [label for _, _, label in TENURE_BANDS] + [UNKNOWN]
+
+    results = []
+    for position in range(unit_count):
+        total = int(headcount[position])
+        results.append({
+            'headcount': total,
+            'average_age': _average(int(age_total[position]), int(age_known[position])),
+            'age_total': int(age_total[position]),
+            'age_bands': dict(zip(age_labels, age_counts[position].tolist())),
+            'education': dict(zip(education_labels, education_counts[position].tolist())),
+            'tenure_bands': dict(zip(tenure_labels, tenure_counts[position].tolist())),
+            'b_library': {
+                'count': int(library_counts[position]),
+                'ratio': _ratio(int(library_counts[position]), total),
+            },
+        })
+    return results
+
+
+def compute_metrics(units, roots=None, today=None):
+    """
+    计算各单元的结构指标（含下级单位）
+
+    Args:
+        units: [(单元ID, 路径), ...]，需包含所有待计算单元
+        roots: 传给归属查询的子树路径；None 表示全部归属
+        today: 计算年龄/工龄的基准日期，默认今天
+
+    Returns:
+        {单元ID: 指标快照}
+    """
+    unit_index = {unit_id: position for position, (unit_id, _) in enumerate(units)}
+
+    cadre_index = {}
+    cadre_values = []
+    pair_units, pair_cadres, pair_direct = [], [], []
+    for path, cadre_id, *values in _membership_rows(roots):
+        cadre = cadre_index.get(cadre_id)
+        if cadre is None:
+            cadre = cadre_index[cadre_id] = len(cadre_values)
+            cadre_values.append(cadre_attributes(*values))
+        # 归属计入所在单元及其各级上级单位
+        ancestors = _unit_ids_from_path(path)
+        for unit_id in ancestors:
+            position = unit_index.get(unit_id)
+            if position is not None:
+                pair_units.append(position)
+                pair_cadres.append(cadre)
+                pair_direct.append(unit_id == ancestors[-1])
+
+    unit_count = len(units)
+    unit_of = np.zeros(0, dtype=np.int64)
+    attributes = np.zeros((0, 4), dtype=np.int64)
+    direct_counts = np.zeros(unit_count, dtype=np.int64)
+    if pair_units:
+        pairs = np.array([pair_units, pair_cadres], dtype=np.int64)
+        direct = np.array(pair_direct, dtype=bool)
+
+        # 同一干部在同一单元子树内多处归属只计一次
+        keys = pairs[0] * len(cadre_values) + pairs[1]
+        _, first = np.unique(keys, return_index=True)
+        unit_of = pairs[0][first]
+        attributes = np.array(cadre_values, dtype=np.int64)[pairs[1][first]]
+        direct_counts = np.bincount(np.unique(keys[direct]) // len(cadre_values), minlength=unit_count)
+
+    computed_at = timezone.now().isoformat()
+    results = summarize(unit_of, attributes, unit_count, today=today)
+    return {
+        unit_id: {
+            **results[position],
+            'direct_headcount': int(direct_counts[position]),
+            'computed_at': computed_at,
+        }
+        for unit_id, position in unit_index.items()
+    }
+
+
+def _grouped_counts(unit_of, category, category_count, unit_count):
+    """按 (单元, 类别) 计数 -> unit_count x category_count 矩阵"""
+    counts = np.bincount(unit_of * category_count + category, minlength=unit_count * category_count)
+    return counts.reshape(unit_count, category_count)
+
+
+def _snapshot_counts(snapshot):
+    """快照中可相加的计数（快照缺失或缺少 age_total 时返回 None）"""
+    if not snapshot or 'age_total' not in snapshot:
+        return None
+    return {
+        'headcount': snapshot['headcount'],
+        'age_total': snapshot['age_total'],
+        'b_library': snapshot['b_library']['count'],
+        **{key: dict(snapshot[key]) for key in ('age_bands', 'education', 'tenure_bands')},
+    }
+
+
+def _add_counts(total, counts, sign=1):
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            for label, count in value.items():
+                total[key][label] = total[key].get(label, 0) + sign * count
+        else:
+            total[key] += sign * value
+
+
+def _counts_snapshot(counts, direct_headcount, computed_at):
+    total = counts['headcount']
+    return {
+        'headcount': total,
+        'average_age': _average(counts['age_total'], total - counts['age_bands'][UNKNOWN]),
+        'age_total': counts['age_total'],
+        'age_bands': counts['age_bands'],
+        'education': counts['education'],
+        'tenure_bands': counts['tenure_bands'],
+        'b_library': {'count': counts['b_library'], 'ratio': _ratio(counts['b_library'], total)},
+        'direct_headcount': direct_headcount,
+        'computed_at': computed_at,
+    }
+
+
+def _summarized_counts(unit_of, cadres, attributes, unit_count, today):
+    """(单元序号, 干部) 行 -> 各单元的可相加计数"""
+    rows = np.array([attributes[cadre] for cadre in cadres], dtype=np.int64).reshape(-1, 4)
+    return [_snapshot_counts(result) for result in summarize(unit_of, rows, unit_count, today=today)]
+
+
+def rollup_metrics(units, today=None):
+    """
+    由下级单位快照逐级汇总各单元的结构指标（增量重算）
+
+    Args:
+        units: [(单元ID, 路径), ...]，须包含其中每个单元的各级上级单位（即若干条到根的路径）
+        today: 计算年龄/工龄的基准日期，默认今天
+
+    Returns:
+        {单元ID: 指标快照}，另含为补齐缺失快照而整棵计算的下级单位
+    """
+    paths = dict(units)
+    position_of = {unit_id: position for position, unit_id in enumerate(paths)}
+    unit_count = len(paths)
+
+    # 路径之外的下级单位直接使用已有快照；缺失时按其子树计算并一并写入
+    children = {unit_id: [] for unit_id in paths}
+    existing, snapshots = {}, {}
+    missing = []
+    for child_id, parent_id, child_path, snapshot in (
+        OrgUnit.objects.filter(parent_id__in=list(paths)).exclude(id__in=list(paths))
+        .values_list('id', 'parent_id', 'path', 'metrics_snapshot')
+    ):
+        children[parent_id].append(child_id)
+        if _snapshot_counts(snapshot) is None:
+            missing.append((child_id, child_path))
+        else:
+            existing[child_id] = snapshot
+    if missing:
+        snapshots.update(compute_metrics(missing, roots=[path for _, path in missing], today=today))
+    for unit_id, path in units:
+        parent = path.strip('/').split('/')[-2:-1]
+        if parent and uuid.UUID(parent[0]) in children:
+            children[uuid.UUID(parent[0])].append(unit_id)
+
+    # 直属归属，以及在多处在职归属的干部（可能在上级单位的多个下级/直属处重复计数）
+    attributes, cadre_index = [], {}
+
+    def cadre_of(cadre_id, values):
+        if cadre_id not in cadre_index:
+            cadre_index[cadre_id] = len(attributes)
+            attributes.append(cadre_attributes(*values))
+        return cadre_index[cadre_id]
+
+    active = OrgMembership.objects.filter(status=MembershipStatus.ACTIVE).annotate(in_library=in_library_annotation())
+    direct = set()
+    for unit_id, cadre_id, *values in active.filter(org_unit_id__in=list(paths)).values_list(
+        'org_unit_id', 'cadre_id', *MEMBERSHIP_ATTRIBUTE_FIELDS
+    ).order_by():
+        direct.add((position_of[unit_id], cadre_of(cadre_id, values)))
+
+    repeated = OrgMembership.objects.filter(status=MembershipStatus.ACTIVE).values('cadre_id').annotate(
+        memberships=Count('id')
+    ).filter(memberships__gt=1).values('cadre_id')
+    cadre_paths = {}
+    in_tree = Q(pk__in=[])
+    for root in _covering_paths(paths.values()):
+        in_tree |= Q(org_unit__path__startswith=root)
+    for path, cadre_id, *values in active.filter(in_tree, cadre_id__in=repeated).values_list('org_unit__path', 'cadre_id', *MEMBERSHIP_ATTRIBUTE_FIELDS).order_by():
+        cadre_paths.setdefault(cadre_of(cadre_id, values), set()).add(path)
+
+    # 某单元子树内的干部若出现在 k 个不同部分（直属或某个下级单位），汇总时多计了 k-1 次
+    extra_units, extra_cadres = [], []
+    for cadre, member_paths in cadre_paths.items():
+        for unit_id, path in paths.items():
+            parts = {
+                member_path[len(path):].split('/', 1)[0]
+                for member_path in member_paths if member_path.startswith(path)
+            }
+            extra_units += [position_of[unit_id]] * (len(parts) - 1)
+            extra_cadres += [cadre] * (len(parts) - 1)
+
+    today = today or timezone.localdate()
+    direct_units, direct_cadres = zip(*sorted(direct)) if direct else ((), ())
+    direct_counts = _summarized_counts(direct_units, direct_cadres, attributes, unit_count, today)
+    extra_counts = _summarized_counts(extra_units, extra_cadres, attributes, unit_count, today)
+    direct_headcount = np.bincount(np.asarray(direct_units, dtype=np.int64), minlength=unit_count)
+
+    computed_at = timezone.now().isoformat()
+    # 自下而上：先算路径上较深的单元，上级单位汇总时其快照已更新
+    for unit_id, path in sorted(units, key=lambda unit: -len(unit[1])):
+        position = position_of[unit_id]
+        counts = direct_counts[position]
+        for child_id in children[unit_id]:
+            _add_counts(counts, _snapshot_counts(snapshots.get(child_id) or existing[child_id]))
+        _add_counts(counts, extra_counts[position], sign=-1)
+        snapshots[unit_id] = _counts_snapshot(counts, int(direct_headcount[position]), computed_at)
+    return snapshots
+
+
+def refresh_unit_metrics(unit_ids=None):
+    """
+    重算并写入指标快照
+
+    Args:
+        unit_ids: 受影响的单元ID；其各级上级单位一并重算，由下级快照逐级汇总（见 rollup_metrics）。
+            None 表示全量重算全部单元
+
+    Returns:
+        重算的单元数
+    """
+    if unit_ids is None:
+        units = list(OrgUnit.objects.values_list('id', 'path'))
+        snapshots = compute_metrics(units) if units else {}
+    else:
+        unit_ids = {unit_id for unit_id in unit_ids if unit_id is not None}
+        if not unit_ids:
+            return 0
+        paths = OrgUnit.objects.filter(id__in=unit_ids).values_list('path', flat=True)
+        units = list(OrgUnit.objects.filter(
+            id__in={unit_id for path in paths for unit_id in _unit_ids_from_path(path)}
+        ).values_list('id', 'path'))
+        snapshots = rollup_metrics(units) if units else {}
+    if not snapshots:
+        return 0
+
+    unit_types = OrgUnit.objects.filter(id__in=list(snapshots)).values_list('id', 'unit_type', 'is_active')
+    with transaction.atomic():
+        OrgUnit.objects.bulk_update(
+            [OrgUnit(id=unit_id, metrics_snapshot=snapshot) for unit_id, snapshot in snapshots.items()],
+            ['metrics_snapshot'],
+            batch_size=500
+        )
+        UnitMetric.objects.bulk_create(
+            [
+                metric_row(unit_id, unit_type, is_active, snapshots[unit_id])
+                for unit_id, unit_type, is_active in unit_types.iterator(chunk_size=2000)
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['unit'],
+            update_fields=METRIC_ROW_FIELDS
+        )
+    return len(snapshots)
+
+
+def _ratio(count, total):
+    return round(count / total, 4) if total else 0.0
+
+
+def _average(total, count):
+    return round(total / count, 1) if count else None
+
+
+def metric_row(unit_id, unit_type, is_active, snapshot):
+    """指标快照 -> 排行用的指标行"""
+    total = snapshot['headcount']
+    age_bands = snapshot['age_bands']
+    education = snapshot['education']
+    bachelor_above = sum(education[code] for code in BACHELOR_ABOVE)
+    graduate = sum(education[code] for code in GRADUATE)
+    return UnitMetric(
+        unit_id=unit_id,
+        unit_type=unit_type,
+        is_active=is_active,
+        headcount=total,
+        direct_headcount=snapshot['direct_headcount'],
+        average_age=snapshot['average_age'],
+        age_35_below=age_bands['35岁及以下'],
+        age_36_45=age_bands['36-45岁'],
+        age_46_55=age_bands['46-55岁'],
+        age_56_above=age_bands['56岁及以上'],
+        young_ratio=_ratio(age_bands['35岁及以下'], total),
+        bachelor_above=bachelor_above,
+        bachelor_above_ratio=_ratio(bachelor_above, total),
+        graduate=graduate,
+        b_library_count=snapshot['b_library']['count'],
+        b_library_ratio=snapshot['b_library']['ratio'],
+        computed_at=parse_datetime(snapshot['computed_at']),
+    )
+
+
+def _covering_paths(paths):
+    """去掉被其他路径覆盖的子路径，剩余路径的子树即为全部待读取范围"""
+    result = []
+    for path in sorted(paths, key=len):
+        if not any(path.startswith(prefix) for prefix in result):
+            result.append(path)
+    return result
+
+
+def _refresh_pending_metrics(connection):
+    unit_ids, connection.pending_metric_units = getattr(connection, 'pending_metric_units', set()), set()
+    if unit_ids:
+        refresh_unit_metrics(unit_ids)
+
+
+def refresh_unit_metrics_on_commit(unit_ids):
+    """
+    事务提交后重算受影响单元（回滚时不执行）
+
+    同一事务内多次调用只汇总单元ID、提交后重算一次：ID 暂存在当前数据库连接上，
+    首个执行的提交回调取走全部待重算单元，其余回调无事可做。
+    回滚事务暂存的ID会并入下一次重算，只多算几个单元，结果仍然正确
+    """
+    unit_ids = {unit_id for unit_id in unit_ids if unit_id is not None}
+    if not unit_ids:
+        return
+    connection = transaction.get_connection()
+    if not hasattr(connection, 'pending_metric_units'):
+        connection.pending_metric_units = set()
+    connection.pending_metric_units |= unit_ids
+    transaction.on_commit(lambda: _refresh_pending_metrics(connection))
+
+
+def cadre_unit_ids(cadre_ids):
+    """干部当前在职归属的单元ID"""
+    return set(OrgMembership.objects.filter(
+        cadre_id__in=cadre_ids, status=MembershipStatus.ACTIVE
+    ).values_list('org_unit_id', flat=True))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orgs', '0003_orgunit_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitMetric',
+            fields=[
+                ('unit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metric', serialize=False, to='orgs.orgunit', verbose_name='组织单元')),
+                ('unit_type', models.CharField(max_length=20, verbose_name='单位类型')),
+                ('is_active', models.BooleanField(default=True, verbose_name='启用')),
+                ('headcount', models.IntegerField(default=0, verbose_name='在职人数')),
+                ('direct_headcount', models.IntegerField(default=0, verbose_name='直属人数')),
+                ('average_age', models.FloatField(blank=True, null=True, verbose_name='平均年龄')),
+                ('age_35_below', models.IntegerField(default=0, verbose_name='35岁及以下人数')),
+                ('age_36_45', models.IntegerField(default=0, verbose_name='36-45岁人数')),
+                ('age_46_55', models.IntegerField(default=0, verbose_name='46-55岁人数')),
+                ('age_56_above', models.IntegerField(default=0, verbose_name='56岁及以上人数')),
+                ('young_ratio', models.FloatField(default=0, verbose_name='35岁及以下占比')),
+                ('bachelor_above', models.IntegerField(default=0, verbose_name='本科及以上人数')),
+                ('bachelor_above_ratio', models.FloatField(default=0, verbose_name='本科及以上占比')),
+                ('graduate', models.IntegerField(default=0, verbose_name='研究生人数')),
+                ('b_library_count', models.IntegerField(default=0, verbose_name='B库人数')),
+                ('b_library_ratio', models.FloatField(default=0, verbose_name='B库占比')),
+                ('computed_at', models.DateTimeField(verbose_name='计算时间')),
+            ],
+            options={
+                'verbose_name': '组织单元指标',
+                'verbose_name_plural': '组织单元指标',
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'headcount', 'unit'], name='metric_headcount'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'direct_headcount', 'unit'], name='metric_direct_headcount'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'average_age', 'unit'], name='metric_average_age'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'age_35_below', 'unit'], name='metric_age_35_below'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'age_36_45', 'unit'], name='metric_age_36_45'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'age_46_55', 'unit'], name='metric_age_46_55'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'age_56_above', 'unit'], name='metric_age_56_above'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'young_ratio', 'unit'], name='metric_young_ratio'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'bachelor_above', 'unit'], name='metric_bachelor_above'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'bachelor_above_ratio', 'unit'], name='metric_bachelor_above_ratio'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'graduate', 'unit'], name='metric_graduate'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'b_library_count', 'unit'], name='metric_b_library_count'), models.Index(condition=models.Q(('is_active', True)), fields=['unit_type', 'b_library_ratio', 'unit'], name='metric_b_library_ratio')],
+            },
+        ),
+    ]
@@ -1,3 +1,66 @@
 from django.db import models
+from orgs.models import OrgUnit
 
-# Create your models here.
+
+# 可用于排行的指标：字段名 -> 名称
+RANKING_METRICS = {
+    'headcount': '在职人数',
+    'direct_headcount': '直属人数',
+    'average_age': '平均年龄',
+    'age_35_below': '35岁及以下人数',
+    'age_36_45': '36-45岁人数',
+    'age_46_55': '46-55岁人数',
+    'age_56_above': '56岁及以上人数',
+    'young_ratio': '35岁及以下占比',
+    'bachelor_above': '本科及以上人数',
+    'bachelor_above_ratio': '本科及以上占比',
+    'graduate': '研究生人数',
+    'b_library_count': 'B库人数',
+    'b_library_ratio': 'B库占比',
+}
+
+
+class UnitMetric(models.Model):
+    """
+    组织单元指标 - 由 metrics_snapshot 展开的数值列，随快照一同写入（见 analytics/metrics.py），
+    每个指标有 (单位类型, 指标, 单元) 索引，排行按索引顺序读取
+    """
+    unit = models.OneToOneField(
+        OrgUnit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='metric',
+        verbose_name='组织单元'
+    )
+    # 冗余单元类型与启用状态，排行过滤不需关联组织单元表
+    unit_type = models.CharField('单位类型', max_length=20)
+    is_active = models.BooleanField('启用', default=True)
+    headcount = models.IntegerField('在职人数', default=0)
+    direct_headcount = models.IntegerField('直属人数', default=0)
+    average_age = models.FloatField('平均年龄', null=True, blank=True)
+    age_35_below = models.IntegerField('35岁及以下人数', default=0)
+    age_36_45 = models.IntegerField('36-45岁人数', default=0)
+    age_46_55 = models.IntegerField('46-55岁人数', default=0)
+    age_56_above = models.IntegerField('56岁及以上人数', default=0)
+    young_ratio = models.FloatField('35岁及以下占比', default=0)
+    bachelor_above = models.IntegerField('本科及以上人数', default=0)
+    bachelor_above_ratio = models.FloatField('本科及以上占比', default=0)
+    graduate = models.IntegerField('研究生人数', default=0)
+    b_library_count = models.IntegerField('B库人数', default=0)
+    b_library_ratio = models.FloatField('B库占比', default=0)
+    computed_at = models.DateTimeField('计算时间')
+
+    class Meta:
+        verbose_name = '组织单元指标'
+        verbose_name_plural = '组织单元指标'
+        indexes = [
+            models.Index(
+                fields=['unit_type', metric, 'unit'],
+                condition=models.Q(is_active=True),
+                name=f'metric_{metric}'
+            )
+            for metric in RANKING_METRICS
+        ]
+
+    def __str__(self):
+        return f"{self.unit_id} 指标"
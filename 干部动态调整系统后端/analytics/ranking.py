@@ -0,0 +1,35 @@
+"""
+组织单元排行
+在 UnitMetric 上按指标排序：过滤单位类型/启用状态后由 (单位类型, 指标, 单元) 索引直接给出顺序，
+RANK() 窗口函数计算名次，一条查询返回结果
+"""
+
+from django.db.models import F, Window
+from django.db.models.functions import Rank
+
+from .models import RANKING_METRICS
+
+
+DEFAULT_METRIC = 'b_library_ratio'
+
+
+def rank_units(queryset, metric, descending=True, top=None):
+    """
+    按指标排名
+
+    并列取相同名次（如 1, 1, 3）；top 为 N 时返回名次不大于 N 的全部单元，
+    第 N 名有并列时一并返回，结果可能多于 N 个。指标为空（如无在职人员的平均年龄）时排在最后
+
+    Args:
+        queryset: UnitMetric 查询集（已按单位类型、数据范围等过滤）
+        metric: RANKING_METRICS 中的指标字段
+        descending: 是否从大到小排名
+        top: 只返回前 N 名；None 表示全部
+    """
+    if metric not in RANKING_METRICS:
+        raise ValueError(f'不支持的排行指标: {metric}')
+    value = F(metric).desc(nulls_last=True) if descending else F(metric).asc(nulls_last=True)
+    queryset = queryset.annotate(rank=Window(Rank(), order_by=value))
+    if top is not None:
+        queryset = queryset.filter(rank__lte=top)
+    return queryset.select_related('unit').order_by('rank', 'unit__sort_order', 'unit__name')
@@ -0,0 +1,22 @@
+from rest_framework import serializers
+from .models import RANKING_METRICS, UnitMetric
+
+
+class UnitRankingSerializer(serializers.ModelSerializer):
+    """组织单元排行序列化器（value 为排行所用指标的值）"""
+    rank = serializers.IntegerField(read_only=True)
+    unit_name = serializers.CharField(source='unit.name', read_only=True)
+    unit_code = serializers.CharField(source='unit.code', read_only=True)
+    parent = serializers.UUIDField(source='unit.parent_id', read_only=True)
+    value = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UnitMetric
+        fields = [
+            'rank', 'unit', 'unit_name', 'unit_code', 'unit_type', 'parent', 'value',
+            *RANKING_METRICS, 'computed_at'
+        ]
+        read_only_fields = fields
+
+    def get_value(self, obj):
+        return getattr(obj, self.context['metric'])
@@ -0,0 +1,101 @@
+import uuid
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from cadres.models import Cadre
+from cadres.sync import roster_synced
+from orgs.models import OrgUnit
+from orgs.tree import units_moved
+from risk_rules.models import RiskPersonTag
+from staffing.models import OrgMembership
+
+from .metrics import CADRE_METRIC_FIELDS, cadre_unit_ids, refresh_unit_metrics_on_commit
+from .models import UnitMetric
+
+
+@receiver(pre_save, sender=OrgMembership)
+def remember_membership_unit(sender, instance, **kwargs):
+    """修改前记录原单元（调动时原单元与新单元都需重算）"""
+    instance._metrics_unit_before = None
+    if not instance._state.adding:
+        instance._metrics_unit_before = (
+            OrgMembership.objects.filter(pk=instance.pk).values_list('org_unit_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=OrgMembership)
+@receiver(post_delete, sender=OrgMembership)
+def refresh_membership_metrics(sender, instance, **kwargs):
+    """归属新增/修改/删除后重算所在单元"""
+    refresh_unit_metrics_on_commit({instance.org_unit_id, getattr(instance, '_metrics_unit_before', None)})
+
+
+@receiver(pre_save, sender=Cadre)
+def remember_cadre_metric_values(sender, instance, update_fields=None, **kwargs):
+    """修改前记录影响指标的字段，未变化时不重算"""
+    instance._metrics_before = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(CADRE_METRIC_FIELDS):
+        instance._metrics_before = {field: getattr(instance, field) for field in CADRE_METRIC_FIELDS}
+        return
+    instance._metrics_before = Cadre.objects.filter(pk=instance.pk).values(*CADRE_METRIC_FIELDS).first()
+
+
+@receiver(post_save, sender=Cadre)
+def refresh_cadre_metrics(sender, instance, created, **kwargs):
+    """干部出生日期、学历、工作时间变化后重算其所在单元（新建干部尚无归属）"""
+    before = getattr(instance, '_metrics_before', None)
+    if created or before is None:
+        return
+    if any(before[field] != getattr(instance, field) for field in CADRE_METRIC_FIELDS):
+        refresh_unit_metrics_on_commit(cadre_unit_ids([instance.pk]))
+
+
+@receiver(post_save, sender=RiskPersonTag)
+@receiver(post_delete, sender=RiskPersonTag)
+def refresh_risk_tag_metrics(sender, instance, **kwargs):
+    """B库标签变化后重算该干部所在单元"""
+    refresh_unit_metrics_on_commit(cadre_unit_ids([instance.cadre_id]))
+
+
+@receiver(pre_save, sender=OrgUnit)
+def remember_unit_path(sender, instance, **kwargs):
+    """修改前记录原路径，移动单元时原上级单位也需重算"""
+    instance._metrics_path_before = None
+    if not instance._state.adding:
+        instance._metrics_path_before = OrgUnit.objects.filter(pk=instance.pk).values_list('path', flat=True).first()
+
+
+@receiver(post_save, sender=OrgUnit)
+def refresh_moved_unit_metrics(sender, instance, created, **kwargs):
+    """单元新建或移动后重算本单元及新旧上级单位"""
+    before = getattr(instance, '_metrics_path_before', None)
+    if created:
+        refresh_unit_metrics_on_commit({instance.pk})
+    elif before and before != instance.path:
+        # 重算时会沿路径带上各级上级单位，这里只需给出本单元与原上级单位
+        old_parent = before.strip('/').split('/')[-2:-1]
+        refresh_unit_metrics_on_commit({instance.pk, *(uuid.UUID(part) for part in old_parent)})
+
+
+@receiver(post_save, sender=OrgUnit)
+def sync_unit_metric_type(sender, instance, created, **kwargs):
+    """同步排行表中冗余的单位类型与启用状态"""
+    if not created:
+        UnitMetric.objects.filter(unit_id=instance.pk).exclude(
+            unit_type=instance.unit_type, is_active=instance.is_active
+        ).update(unit_type=instance.unit_type, is_active=instance.is_active)
+
+
+@receiver(units_moved)
+def refresh_bulk_moved_metrics(sender, unit_ids, **kwargs):
+    """批量移动后重算被移动单元与原上级单位（新上级单位在重算时沿新路径一并展开）"""
+    refresh_unit_metrics_on_commit(unit_ids)
+
+
+@receiver(roster_synced)
+def refresh_synced_metrics(sender, cadre_ids, unit_ids, **kwargs):
+    """花名册同步批量写入后重算归属变化的单元与信息变化干部的所在单元"""
+    refresh_unit_metrics_on_commit(set(unit_ids) | (cadre_unit_ids(cadre_ids) if cadre_ids else set()))
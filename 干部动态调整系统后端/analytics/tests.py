@@ -1,3 +1,155 @@
+from datetime import date
+from unittest import mock
+
+from django.db import transaction
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from cadres.models import Cadre
+from orgs.models import OrgUnit, UnitType
+from orgs.tree import bulk_move_units
+from risk_rules.models import RiskPersonTag
+from staffing.models import OrgMembership
+
+from . import metrics
+from .metrics import compute_metrics, direct_b_library_counts, refresh_unit_metrics
+from .models import UnitMetric
+
+
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        self.root = self.make_unit('根')
+        self.branch = self.make_unit('支部', self.root)
+        self.other = self.make_unit('其他', self.root)
+        self.zhang = self.make_cadre('张一', self.root, date(1960, 1, 1))
+        self.li = self.make_cadre('李二', self.branch, date(1995, 1, 1))
+        RiskPersonTag.objects.create(cadre=self.li)
+
+    def make_unit(self, name, parent=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OrgUnit.objects.create(name=name, parent=parent, unit_type=UnitType.DEPARTMENT)
+
+    def make_cadre(self, name, unit, birth_date):
+        with self.captureOnCommitCallbacks(execute=True):
+            cadre = Cadre.objects.create(cadre_code=f'C{Cadre.objects.count() + 1:03d}', name=name, birth_date=birth_date)
+            OrgMembership.objects.create(cadre=cadre, org_unit=unit, start_date=date(2020, 1, 1))
+        return cadre
+
+    def metric(self, unit):
+        return UnitMetric.objects.get(unit=unit)
+
+
+class ComputeMetricsTests(MetricsTestCase):
+    """结构指标计算"""
+
+    def test_subtree_and_direct_counts(self):
+        snapshots = compute_metrics([(unit.pk, unit.path) for unit in (self.root, self.branch, self.other)])
+
+        root = snapshots[self.root.pk]
+        self.assertEqual((root['headcount'], root['direct_headcount']), (2, 1))
+        self.assertEqual(root['b_library'], {'count': 1, 'ratio': 0.5})
+        self.assertEqual(root['age_bands']['35岁及以下'], 1)
+        self.assertEqual(snapshots[self.other.pk]['headcount'], 0)
+        self.assertIsNone(snapshots[self.other.pk]['average_age'])
+
+    def test_cadre_counted_once_per_subtree(self):
+        OrgMembership.objects.create(cadre=self.li, org_unit=self.root, is_primary=False, start_date=date(2020, 1, 1))
+        snapshots = compute_metrics([(self.root.pk, self.root.path)])
+        self.assertEqual((snapshots[self.root.pk]['headcount'], snapshots[self.root.pk]['direct_headcount']), (2, 2))
+
+    def test_direct_b_library_counts(self):
+        rows = {row['org_unit_id']: row for row in direct_b_library_counts()}
+        self.assertEqual(rows[self.branch.pk]['direct_b_library_ratio'], 1.0)
+        self.assertEqual(rows[self.root.pk]['direct_b_library_count'], 0)
+
+
+class MetricsRefreshTests(MetricsTestCase):
+    """指标随数据变化重算"""
+
+    def test_membership_change_refreshes_old_and_new_units(self):
+        self.assertEqual(self.metric(self.branch).headcount, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            membership = OrgMembership.objects.get(cadre=self.li)
+            membership.org_unit = self.other
+            membership.save()
+
+        self.assertEqual(self.metric(self.branch).headcount, 0)
+        self.assertEqual(self.metric(self.other).b_library_count, 1)
+        self.assertEqual(self.metric(self.root).headcount, 2)
+
+    def test_bulk_move_refreshes_old_and_new_parents(self):
+        new_root = self.make_unit('新根')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_move_units([{'unit_id': self.branch.pk, 'new_parent_id': new_root.pk}])
+
+        self.assertEqual(self.metric(self.root).headcount, 1)
+        self.assertEqual(self.metric(new_root).headcount, 1)
+        self.assertEqual(self.metric(new_root).b_library_ratio, 1.0)
+
+    def test_rollup_matches_full_computation(self):
+        leaf = self.make_unit('小组', self.branch)
+        wang = self.make_cadre('王三', leaf, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            # 王三同时在本单元、上级与其他单元兼职，各级汇总时只计一次
+            for unit in (self.branch, self.other, self.root):
+                OrgMembership.objects.create(cadre=wang, org_unit=unit, is_primary=False, start_date=date(2020, 1, 1))
+
+        units = list(OrgUnit.objects.values_list('id', 'path'))
+        expected = compute_metrics(units)
+        for unit_id, _ in units:
+            snapshot = OrgUnit.objects.get(pk=unit_id).metrics_snapshot
+            for key in ('headcount', 'direct_headcount', 'average_age', 'age_total', 'age_bands', 'b_library'):
+                self.assertEqual(snapshot[key], expected[unit_id][key], key)
+
+    def test_refresh_reads_only_path_units(self):
+        with mock.patch.object(metrics, '_membership_rows') as rows:
+            with self.captureOnCommitCallbacks(execute=True):
+                RiskPersonTag.objects.create(cadre=self.zhang)
+        rows.assert_not_called()
+        self.assertEqual(self.metric(self.root).b_library_count, 2)
+        self.assertEqual(self.metric(self.branch).b_library_count, 1)
+
+    def test_rollup_fills_missing_child_snapshots(self):
+        OrgUnit.objects.filter(pk=self.branch.pk).update(metrics_snapshot=None)
+        self.assertEqual(refresh_unit_metrics([self.root.pk]), 2)
+        self.assertEqual(OrgUnit.objects.get(pk=self.branch.pk).metrics_snapshot['headcount'], 1)
+        self.assertEqual(self.metric(self.root).headcount, 2)
+
+    def test_one_refresh_per_transaction(self):
+        with mock.patch.object(metrics, 'refresh_unit_metrics', wraps=refresh_unit_metrics) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for cadre in (self.zhang, self.li):
+                        cadre.birth_date = date(2000, 1, 1)
+                        cadre.save()
+                    OrgMembership.objects.filter(cadre=self.li).get().save()
+
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(set(refresh.call_args.args[0]), {self.root.pk, self.branch.pk})
+        self.assertEqual(self.metric(self.root).age_35_below, 2)
+
+
+class UnitRankingTests(MetricsTestCase):
+    """组织单元排行接口"""
+
+    def setUp(self):
+        super().setUp()
+        refresh_unit_metrics()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'a@a.com', 'x', real_name='管理员'))
+
+    def test_ranking_with_ties(self):
+        response = self.client.get('/api/analytics/rankings/', {'metric': 'headcount', 'order': 'asc', 'top': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['metric'], 'headcount')
+
+        # 只有“其他”人数为 0，排第 1；“支部”人数为 1，排第 2
+        self.assertEqual([row['unit_name'] for row in response.data['results']], ['其他'])
+        response = self.client.get('/api/analytics/rankings/', {'metric': 'b_library_count', 'top': 1})
+        self.assertEqual({row['unit_name'] for row in response.data['results']}, {'根', '支部'})
 
-# Create your tests here.
+    def test_rejects_invalid_parameters(self):
+        for params in ({'metric': 'unknown'}, {'order': 'up'}, {'top': '0'}):
+            self.assertEqual(self.client.get('/api/analytics/rankings/', params).status_code, 400)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import UnitRankingView
+
+urlpatterns = [
+    path('rankings/', UnitRankingView.as_view(), name='unit-ranking'),
+]
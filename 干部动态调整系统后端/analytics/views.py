@@ -1,3 +1,78 @@
-from django.shortcuts import render
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from accounts.permissions import DataScopePermission, HasPermissionCode
+from orgs.models import UnitType
+
+from .models import RANKING_METRICS, UnitMetric
+from .ranking import DEFAULT_METRIC, rank_units
+from .serializers import UnitRankingSerializer
+
+
+class UnitRankingView(ListAPIView):
+    """
+    组织单元排行
+    GET /api/analytics/rankings/?metric=b_library_ratio&order=desc&unit_type=BRANCH&top=10
+
+    metric 取值见 RANKING_METRICS；order 为 desc（默认）或 asc；
+    top 为前 N 名（末位并列一并返回），不传返回全部；include_inactive=true 时包含停用单元
+    """
+    permission_classes = [IsAuthenticated, HasPermissionCode]
+    permission_code = 'analytics:view'
+    serializer_class = UnitRankingSerializer
+    pagination_class = None
+
+    @cached_property
+    def params(self):
+        """解析并校验查询参数：(指标, 排序方向, 单位类型, 前N名, 是否包含停用单元)"""
+        params = self.request.query_params
+        metric = params.get('metric') or DEFAULT_METRIC
+        if metric not in RANKING_METRICS:
+            raise ValidationError({'metric': f'不支持的排行指标，可选：{", ".join(RANKING_METRICS)}'})
+
+        order = params.get('order') or 'desc'
+        if order not in ('desc', 'asc'):
+            raise ValidationError({'order': '排序方向只能为 desc 或 asc'})
+
+        unit_type = params.get('unit_type') or None
+        if unit_type is not None and unit_type not in UnitType.values:
+            raise ValidationError({'unit_type': '无效的单位类型'})
+
+        top = params.get('top') or None
+        if top is not None:
+            try:
+                top = int(top)
+            except ValueError:
+                raise ValidationError({'top': '必须为正整数'})
+            if top < 1:
+                raise ValidationError({'top': '必须为正整数'})
+
+        include_inactive = (params.get('include_inactive') or '').lower() == 'true'
+        return metric, order, unit_type, top, include_inactive
+
+    def get_queryset(self):
+        metric, order, unit_type, top, include_inactive = self.params
+        queryset = UnitMetric.objects.all()
+        if unit_type:
+            queryset = queryset.filter(unit_type=unit_type)
+        if not include_inactive:
+            queryset = queryset.filter(is_active=True)
+        queryset = DataScopePermission.apply_data_scope(self.request.user, queryset)
+        return rank_units(queryset, metric, descending=order == 'desc', top=top)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'metric': self.params[0]}
+
+    def list(self, request, *args, **kwargs):
+        metric, order, _, top, _ = self.params
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response({
+            'metric': metric,
+            'metric_label': RANKING_METRICS[metric],
+            'order': order,
+            'top': top,
+            'results': serializer.data,
+        })
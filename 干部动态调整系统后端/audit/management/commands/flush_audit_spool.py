@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from audit.writer import replay_spool
+
+
+class Command(BaseCommand):
+    help = '补写审计日志 spool 中遗留（进程异常退出时未写库）的事件'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spool-dir',
+            help='spool 目录，默认使用 AUDIT_LOG_SPOOL_DIR'
+        )
+
+    def handle(self, *args, **options):
+        count = replay_spool(options.get('spool_dir'))
+        print(f"补写审计日志 {count} 条")
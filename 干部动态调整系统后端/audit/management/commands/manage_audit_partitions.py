@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from audit.partitions import archive_partitions, ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = '维护审计日志月度分区：预建未来分区，归档并删除超过保留期的分区'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=getattr(settings, 'AUDIT_LOG_PARTITIONS_AHEAD', 3),
+            help='提前创建的月份数'
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            default=getattr(settings, 'AUDIT_LOG_RETENTION_MONTHS', 36),
+            help='在线保留的月份数（含本月）'
+        )
+        parser.add_argument(
+            '--archive-dir',
+            help='归档目录，默认使用 AUDIT_LOG_ARCHIVE_DIR'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只列出将被归档的分区，不做修改'
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError('审计日志表未分区（仅 PostgreSQL 执行迁移后可用）')
+        if options['retain_months'] < 1:
+            raise CommandError('--retain-months 至少为 1')
+
+        print("1. 预建分区...")
+        if options['dry_run']:
+            print("   跳过（--dry-run）")
+        else:
+            created = ensure_partitions(months_ahead=options['ahead'])
+            for name in created:
+                print(f"   已创建 {name}")
+            if not created:
+                print("   无需新建")
+
+        print("\n2. 归档过期分区...")
+        archived = archive_partitions(
+            options['retain_months'],
+            archive_dir=options.get('archive_dir'),
+            dry_run=options['dry_run']
+        )
+        for name, path in archived:
+            print(f"   {name} -> {path}" if path else f"   将归档 {name}")
+        if not archived:
+            print("   没有超过保留期的分区")
+
+        print("\n审计日志分区维护完成！")
@@ -0,0 +1,71 @@
+from datetime import date, datetime, time
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def partition_auditlog(apps, schema_editor):
+    """将 audit_auditlog 转换为按 created_at 月度 RANGE 分区的表（仅 PostgreSQL）"""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        # 记录原有索引定义，迁移数据后在分区父表上重建（同名，保证后续迁移可识别）
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = 'audit_auditlog' AND indexname NOT LIKE '%_pkey'"
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'audit_auditlog'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute('ALTER TABLE audit_auditlog RENAME TO audit_auditlog_legacy')
+        cursor.execute(
+            'CREATE TABLE audit_auditlog (LIKE audit_auditlog_legacy INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE (created_at)'
+        )
+        # 分区表的唯一约束必须包含分区键
+        cursor.execute('ALTER TABLE audit_auditlog ADD PRIMARY KEY (id, created_at)')
+        cursor.execute('CREATE TABLE audit_auditlog_default PARTITION OF audit_auditlog DEFAULT')
+
+        # 为已有数据所在月份到未来 3 个月创建分区（按本地时区划分月份，与 audit.partitions 一致）
+        cursor.execute('SELECT min(created_at) FROM audit_auditlog_legacy')
+        oldest = cursor.fetchone()[0]
+        today = timezone.localdate()
+        month = timezone.localtime(oldest).date().replace(day=1) if oldest else today.replace(day=1)
+        index = today.year * 12 + today.month - 1 + 3
+        last = date(index // 12, index % 12 + 1, 1)
+        while month <= last:
+            following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            cursor.execute(
+                f'CREATE TABLE audit_auditlog_p{month:%Y_%m} PARTITION OF audit_auditlog '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [timezone.make_aware(datetime.combine(month, time.min)),
+                 timezone.make_aware(datetime.combine(following, time.min))]
+            )
+            month = following
+
+        cursor.execute('INSERT INTO audit_auditlog SELECT * FROM audit_auditlog_legacy')
+        cursor.execute('DROP TABLE audit_auditlog_legacy')
+
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE audit_auditlog ADD CONSTRAINT {name} {definition}')
+        for name, definition in indexes:
+            cursor.execute(definition.replace('audit_auditlog_legacy', 'audit_auditlog'))
+
+
+class Migration(migrations.Migration):
+
+    atomic = True
+
+    dependencies = [
+        ('audit', '0003_auditlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_auditlog, migrations.RunPython.noop),
+    ]
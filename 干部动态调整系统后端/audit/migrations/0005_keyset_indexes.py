@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_partition_auditlog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_audit_action_0c6a84_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_audit_actor_i_1175ab_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-created_at', '-id'], name='audit_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', '-created_at', '-id'], name='audit_action_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['actor', '-created_at', '-id'], name='audit_actor_keyset'),
+        ),
+    ]
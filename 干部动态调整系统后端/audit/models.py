@@ -1,6 +1,8 @@
 import uuid
+from datetime import timedelta
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 
 User = get_user_model()
@@ -30,6 +32,23 @@ class AuditAction(models.TextChoices):
     OTHER = 'OTHER', '其他操作'
 
 
+class AuditLogQuerySet(models.QuerySet):
+    """审计日志查询集；按时间范围过滤以便 PostgreSQL 只扫描相关月份分区"""
+
+    def within(self, start=None, end=None):
+        """限定操作时间范围 [start, end)"""
+        qs = self
+        if start is not None:
+            qs = qs.filter(created_at__gte=start)
+        if end is not None:
+            qs = qs.filter(created_at__lt=end)
+        return qs
+
+    def recent(self, days=30):
+        """最近 days 天的日志"""
+        return self.within(start=timezone.now() - timedelta(days=days))
+
+
 class AuditLog(models.Model):
     """审计日志"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -76,20 +95,26 @@ class AuditLog(models.Model):
         blank=True,
         help_text='浏览器或客户端信息'
     )
+    # 使用 default 而非 auto_now_add，异步批量写入时保留事件发生时间
     created_at = models.DateTimeField(
         '操作时间',
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         db_index=True
     )
 
+    objects = AuditLogQuerySet.as_manager()
+
     class Meta:
         verbose_name = '审计日志'
         verbose_name_plural = '审计日志'
         ordering = ['-created_at']
+        # 游标分页按 (created_at, id) 降序，索引末尾带上主键
         indexes = [
-            models.Index(fields=['action', '-created_at']),
+            models.Index(name='audit_keyset', fields=['-created_at', '-id']),
+            models.Index(name='audit_action_keyset', fields=['action', '-created_at', '-id']),
             models.Index(fields=['target_type', 'target_id']),
-            models.Index(fields=['actor', '-created_at']),
+            models.Index(name='audit_actor_keyset', fields=['actor', '-created_at', '-id']),
         ]
 
     def __str__(self):
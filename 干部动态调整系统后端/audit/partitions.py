@@ -0,0 +1,168 @@
+"""
+审计日志分区管理（仅 PostgreSQL）
+audit_auditlog 按 created_at 做月度 RANGE 分区：
+    audit_auditlog_pYYYY_MM  每月一个分区
+    audit_auditlog_default   兜底分区（分区未提前创建时的数据落在这里）
+超过保留期的分区先 DETACH，再导出为 gzip 压缩的 CSV 归档后删除
+"""
+
+import gzip
+import logging
+import os
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger('app')
+
+PARENT_TABLE = 'audit_auditlog'
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+
+
+def month_start(value):
+    """取所在月份的第一天"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    """按月偏移（value 为月初日期）"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """月度分区表名"""
+    return f'{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def _bound(month):
+    return timezone.make_aware(datetime.combine(month, time.min)).isoformat()
+
+
+def is_partitioned():
+    """当前数据库中的审计表是否为分区表"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s",
+            [PARENT_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """列出所有已挂载的月度分区：[(分区表名, 月初日期), ...]"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s ORDER BY child.relname",
+            [PARENT_TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    prefix = f'{PARENT_TABLE}_p'
+    for name in names:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split('_')
+            partitions.append((name, date(int(year), int(month), 1)))
+    return partitions
+
+
+def ensure_partitions(months_ahead=3, start=None):
+    """
+    创建从 start（默认本月）起到未来 months_ahead 个月的分区
+
+    Returns:
+        新建的分区表名列表
+    """
+    first = month_start(start or timezone.localdate())
+    last = add_months(month_start(timezone.localdate()), months_ahead)
+    existing = {name for name, _ in list_partitions()}
+
+    created = []
+    month = first
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            _create_partition(name, _bound(month), _bound(add_months(month, 1)))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def _create_partition(name, lower, upper):
+    """创建月度分区；兜底分区中已有该月数据时先将其迁入新分区"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE created_at >= %s AND created_at < %s)',
+            [lower, upper]
+        )
+        stranded = cursor.fetchone()[0]
+
+        if stranded:
+            cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+        cursor.execute(
+            f'CREATE TABLE "{name}" PARTITION OF "{PARENT_TABLE}" FOR VALUES FROM (%s) TO (%s)',
+            [lower, upper]
+        )
+        if stranded:
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE created_at >= %s AND created_at < %s '
+                f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved',
+                [lower, upper]
+            )
+            cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+
+
+def _copy_to_file(cursor, table, path):
+    """以 COPY 导出分区数据到 gzip 压缩的 CSV"""
+    sql = f'COPY (SELECT * FROM "{table}") TO STDOUT WITH CSV HEADER'
+    with gzip.open(path, 'wb') as fp:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            raw.copy_expert(sql, fp)
+        else:
+            # psycopg 3
+            with raw.copy(sql) as copy:
+                for chunk in copy:
+                    fp.write(chunk)
+
+
+def archive_partitions(retain_months, archive_dir=None, dry_run=False):
+    """
+    归档并删除超过保留期的月度分区
+
+    Args:
+        retain_months: 保留的月数（含本月）
+        archive_dir: 归档目录，默认 AUDIT_LOG_ARCHIVE_DIR
+        dry_run: 只返回将被归档的分区，不做修改
+
+    Returns:
+        [(分区表名, 归档文件路径), ...]
+    """
+    archive_dir = str(archive_dir or settings.AUDIT_LOG_ARCHIVE_DIR)
+    cutoff = add_months(month_start(timezone.localdate()), -(retain_months - 1))
+    expired = [(name, month) for name, month in list_partitions() if month < cutoff]
+    if dry_run:
+        return [(name, None) for name, _ in expired]
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = []
+    for name, _ in expired:
+        path = os.path.join(archive_dir, f'{name}.csv.gz')
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{name}"')
+            _copy_to_file(cursor, name, path)
+            cursor.execute(f'DROP TABLE "{name}"')
+        logger.info('审计日志分区已归档: %s -> %s', name, path)
+        archived.append((name, path))
+    return archived
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from .models import AuditLog
+
+
+class AuditLogSerializer(serializers.ModelSerializer):
+    """审计日志序列化器"""
+    action_display = serializers.CharField(source='get_action_display', read_only=True)
+    actor_name = serializers.CharField(source='actor.username', read_only=True, default=None)
+
+    class Meta:
+        model = AuditLog
+        fields = [
+            'id', 'actor', 'actor_name', 'action', 'action_display', 'target_type', 'target_id',
+            'context', 'ip_address', 'user_agent', 'created_at'
+        ]
+        read_only_fields = fields
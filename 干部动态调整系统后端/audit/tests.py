@@ -1,3 +1,210 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.models import DataScope, Role, ScopeType, User, UserRole
+from orgs.models import Membership, OrgUnit, UnitType
+from 干部动态调整系统.pagination import KeysetPagination
+
+from .models import AuditAction, AuditLog
+from .writer import FAILED_PREFIX, AuditLogWriter, record_audit, replay_spool
+
+
+def make_event(**kwargs):
+    return {
+        'id': str(uuid.uuid4()),
+        'actor_id': None,
+        'action': AuditAction.OTHER,
+        'target_type': '',
+        'target_id': None,
+        'context': {},
+        'ip_address': None,
+        'user_agent': '',
+        'created_at': timezone.now().isoformat(),
+        **kwargs,
+    }
+
+
+# 测试在事务中运行，写入器不能关闭数据库连接
+@mock.patch('audit.writer.close_old_connections', lambda: None)
+class AuditLogWriterTests(TestCase):
+    """审计日志批量写入与 spool 补写"""
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+        # 标记为已启动，不启动后台线程
+        self.writer = AuditLogWriter(spool_dir=self.spool_dir)
+        self.writer._pid = os.getpid()
+        self.addCleanup(lambda: self.writer._segment_file and self.writer._segment_file.close())
+
+    def spool_files(self, prefix=''):
+        return [name for name in os.listdir(self.spool_dir) if name.startswith(prefix)]
+
+    def test_flush_writes_and_removes_segment(self):
+        self.assertEqual(self.writer.flush(), 0)
+        self.assertEqual(self.spool_files(), [])
+
+        events = [make_event() for _ in range(3)]
+        for event in events:
+            self.writer.record(event)
+        self.assertEqual(len(self.spool_files()), 1)
+
+        self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(AuditLog.objects.filter(id__in=[event['id'] for event in events]).count(), 3)
+        # 写库后不留空分段，下一条事件再开新分段
+        self.assertEqual(self.spool_files(), [])
+        self.writer.record(make_event())
+        self.assertEqual(len(self.spool_files()), 1)
+
+    def test_failed_events_are_kept_and_replayed(self):
+        good, bad = make_event(), make_event()
+        self.writer.record(good)
+        self.writer.record(bad)
+
+        original = AuditLog.objects.bulk_create
+
+        def bulk_create(instances, **kwargs):
+            if any(str(instance.id) == bad['id'] for instance in instances):
+                raise DatabaseError('写库失败')
+            return original(instances, **kwargs)
+
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=bulk_create), \
+                self.assertLogs('app', level='WARNING'):
+            self.assertEqual(self.writer.flush(), 1)
+        self.assertTrue(AuditLog.objects.filter(id=good['id']).exists())
+        self.assertEqual(len(self.spool_files(FAILED_PREFIX)), 1)
+
+        # 恢复后补写 failed- 分段，当前进程正在写入的分段不动
+        self.assertEqual(replay_spool(self.spool_dir, exclude={self.writer._segment}), 1)
+        self.assertTrue(AuditLog.objects.filter(id=bad['id']).exists())
+        self.assertEqual(self.spool_files(FAILED_PREFIX), [])
+
+    def test_replay_crashed_segment(self):
+        path = os.path.join(self.spool_dir, f'999999999-{timezone.now().timestamp():.0f}.jsonl')
+        event = make_event()
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(f'{{"id": "{event["id"]}", "action": "OTHER", "created_at": "{event["created_at"]}"}}\n')
+            fp.write('{"id": "half')
+
+        self.assertEqual(replay_spool(self.spool_dir, exclude={self.writer._segment}), 1)
+        self.assertTrue(AuditLog.objects.filter(id=event['id']).exists())
+        self.assertFalse(os.path.exists(path))
+
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class AuditLogViewTests(TestCase):
+    """审计日志查询"""
+
+    def setUp(self):
+        cache.clear()
+        self.unit = OrgUnit.objects.create(name='甲', unit_type=UnitType.DEPARTMENT)
+        self.colleague = User.objects.create_user('colleague', password='x', real_name='同事', email='c@a.com')
+        self.outsider = User.objects.create_user('outsider', password='x', real_name='外人', email='o@a.com')
+        Membership.objects.create(user=self.colleague, unit=self.unit)
+
+        self.viewer = User.objects.create_user('viewer', password='x', real_name='审计员', email='v@a.com')
+        role = Role.objects.create(code=Role.ANALYST, name='审计', permissions=['audit:view'])
+        UserRole.objects.create(user=self.viewer, role=role)
+        scope = DataScope.objects.create(user=self.viewer, scope_type=ScopeType.ORG_UNIT)
+        scope.org_units.add(self.unit)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def test_data_scope_limits_actors(self):
+        record_audit(actor=self.colleague, action=AuditAction.LOGIN)
+        record_audit(actor=self.outsider, action=AuditAction.LOGIN)
+
+        response = self.client.get('/api/audit/logs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['actor'] for row in response.data['results']], [self.colleague.pk])
+
+    def test_defaults_to_recent_window(self):
+        old = AuditLog.objects.create(
+            actor=self.colleague, action=AuditAction.LOGIN, created_at=timezone.now() - timedelta(days=40)
+        )
+        record_audit(actor=self.colleague, action=AuditAction.LOGIN)
+
+        response = self.client.get('/api/audit/logs/')
+        self.assertNotIn(str(old.pk), [row['id'] for row in response.data['results']])
+        self.assertEqual(len(response.data['results']), 1)
+
+        start = (timezone.now() - timedelta(days=60)).date().isoformat()
+        response = self.client.get('/api/audit/logs/', {'start': start})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_keyset_pages(self):
+        now = timezone.now()
+        # 相同时间的事件也不会跨页重复或遗漏
+        AuditLog.objects.bulk_create([
+            AuditLog(actor=self.colleague, action=AuditAction.LOGIN, created_at=now - timedelta(minutes=index // 2))
+            for index in range(7)
+        ])
+
+        seen, url = [], '/api/audit/logs/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_count_is_approximate_by_default(self):
+        record_audit(actor=self.colleague, action=AuditAction.LOGIN)
+
+        response = self.client.get('/api/audit/logs/')
+        self.assertEqual(response.data['count'], 1)
+        self.assertNotIn('count', self.client.get('/api/audit/logs/', {'count': 'none'}).data)
+
+
+class KeysetPaginationTests(TestCase):
+    """键集分页"""
+
+    def setUp(self):
+        users = [
+            User.objects.create_user(name, password='x', real_name=name, email=f'{name}@a.com')
+            for name in ('b', 'a')
+        ]
+        now = timezone.now()
+        AuditLog.objects.bulk_create([
+            AuditLog(actor=actor, action=AuditAction.LOGIN, created_at=now - timedelta(minutes=index))
+            for index, actor in enumerate([*users, *users, None])
+        ])
+
+    def paginate(self, queryset, url):
+        request = Request(APIRequestFactory().get(url))
+        paginator = KeysetPagination()
+        return paginator, paginator.paginate_queryset(queryset, request)
+
+    def test_orders_through_foreign_key(self):
+        queryset = AuditLog.objects.order_by('actor__username', '-created_at')
+        # 分页约定 NULL 排在升序末尾
+        expected = list(AuditLog.objects.order_by(
+            F('actor__username').asc(nulls_last=True), '-created_at'
+        ).values_list('pk', flat=True))
+
+        seen, url = [], '/?page_size=2'
+        while url:
+            paginator, rows = self.paginate(queryset, url)
+            seen.extend(row.pk for row in rows)
+            url = paginator.get_next_link()
+        self.assertEqual(seen, expected)
+
+    def test_rejects_multi_valued_ordering(self):
+        with self.assertRaises(TypeError):
+            self.paginate(User.objects.order_by('user_roles__role__code'), '/')
+        with self.assertRaises(TypeError):
+            self.paginate(AuditLog.objects.order_by('created_at__date'), '/')
@@ -1,3 +1,77 @@
-from django.shortcuts import render
+from datetime import datetime, time, timedelta
 
-# Create your views here.
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+
+from accounts.permissions import DataScopePermission, HasPermissionCode
+from 干部动态调整系统.pagination import KeysetPagination
+
+from .models import AuditLog
+from .serializers import AuditLogSerializer
+
+
+def _parse_time(value, name):
+    """解析时间参数：支持日期或日期时间"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: '时间格式不正确'})
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    审计日志视图集（只读）
+
+    按 (created_at, id) 游标分页；start/end 限定时间范围 [start, end)，
+    PostgreSQL 上只扫描相关月份分区；未传 start 时默认只查 end（缺省为当前）之前
+    default_days 天，避免扫描全部分区；按用户数据范围过滤操作人
+    """
+    permission_classes = [IsAuthenticated, HasPermissionCode]
+    permission_code = 'audit:view'
+    serializer_class = AuditLogSerializer
+    pagination_class = KeysetPagination
+    default_days = 30
+
+    def get_queryset(self):
+        """获取查询集"""
+        params = self.request.query_params
+        queryset = DataScopePermission.apply_data_scope(
+            self.request.user, AuditLog.objects.select_related('actor')
+        )
+
+        # 时间范围
+        start = params.get('start', None)
+        end = params.get('end', None)
+        if not start and not end:
+            queryset = queryset.recent(self.default_days)
+        else:
+            end = _parse_time(end, 'end') if end else None
+            queryset = queryset.within(
+                start=_parse_time(start, 'start') if start else (end - timedelta(days=self.default_days)),
+                end=end
+            )
+
+        # 操作类型、操作人、目标过滤
+        for param, field in (
+            ('action', 'action'),
+            ('actor', 'actor_id'),
+            ('target_type', 'target_type'),
+            ('target_id', 'target_id'),
+        ):
+            value = params.get(param, None)
+            if value:
+                try:
+                    queryset = queryset.filter(**{field: value})
+                except DjangoValidationError:
+                    raise ValidationError({param: '参数格式不正确'})
+
+        return queryset
@@ -0,0 +1,280 @@
+"""
+审计日志异步写入
+事件先追加到本进程的落盘文件（spool），再放入内存缓冲；
+后台线程按数量/时间阈值用 bulk_create 批量写库，写库成功后删除对应 spool 分段。
+分段在有事件写入时才创建，进程空闲或退出时不会留下空分段。
+进程崩溃时未写库的事件保留在 spool 中，下次启动或执行 flush_audit_spool 命令时补写；
+写库失败（如数据库不可用）的事件另存为 failed- 分段，由后台线程定期或 flush_audit_spool 命令补写。
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+
+logger = logging.getLogger('app')
+
+
+# 写库失败的事件另存的分段前缀；这类分段没有写入进程，任何进程都可以认领补写
+FAILED_PREFIX = 'failed-'
+
+
+def _spool_dir():
+    return str(getattr(settings, 'AUDIT_LOG_SPOOL_DIR', settings.BASE_DIR / 'logs' / 'audit_spool'))
+
+
+def _spool_failed(spool_dir, events):
+    """将写库失败的事件另存为 failed- 分段（先写临时文件再改名，补写方不会读到半个文件）"""
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f'{FAILED_PREFIX}{os.getpid()}-{time.time_ns()}.jsonl')
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as fp:
+        for event in events:
+            fp.write(json.dumps(event, ensure_ascii=False) + '\n')
+    os.rename(f'{path}.tmp', path)
+    return path
+
+
+def _to_instance(event):
+    """将 spool 中的事件还原为 AuditLog 实例"""
+    return AuditLog(
+        id=uuid.UUID(event['id']),
+        actor_id=event.get('actor_id'),
+        action=event['action'],
+        target_type=event.get('target_type', ''),
+        target_id=event.get('target_id'),
+        context=event.get('context') or {},
+        ip_address=event.get('ip_address'),
+        user_agent=event.get('user_agent') or '',
+        created_at=parse_datetime(event['created_at']),
+    )
+
+
+def write_events(events):
+    """
+    批量写入事件；整批失败时逐条重试
+
+    Returns:
+        写入失败的事件列表（全部写入时为空），由调用方保留待补写
+    """
+    instances = [_to_instance(event) for event in events]
+    try:
+        AuditLog.objects.bulk_create(instances, batch_size=500, ignore_conflicts=True)
+        return []
+    except Exception:
+        logger.exception('审计日志批量写入失败，改为逐条写入')
+
+    failed = []
+    for event, instance in zip(events, instances):
+        try:
+            AuditLog.objects.bulk_create([instance], ignore_conflicts=True)
+        except Exception as exc:
+            logger.warning('审计日志写入失败，保留待补写: %s (%s)', instance.id, exc)
+            failed.append(event)
+    return failed
+
+
+def _owner_alive(name):
+    """spool 分段的写入进程是否仍在运行（文件名以进程号开头，failed- 分段无写入进程）"""
+    try:
+        pid = int(name.split('-', 1)[0])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def replay_spool(spool_dir=None, exclude=()):
+    """
+    补写遗留的 spool 文件（先改名认领，避免多进程重复补写）
+
+    仍然写库失败的事件另存为 failed- 分段，下次补写时重试
+
+    Returns:
+        补写的事件条数
+    """
+    spool_dir = spool_dir or _spool_dir()
+    if not os.path.isdir(spool_dir):
+        return 0
+
+    total = 0
+    for name in sorted(os.listdir(spool_dir)):
+        path = os.path.join(spool_dir, name)
+        if not name.endswith('.jsonl') or path in exclude or _owner_alive(name):
+            continue
+        claimed = f'{path}.replay-{os.getpid()}'
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            continue
+
+        events = []
+        with open(claimed, encoding='utf-8') as fp:
+            for line in fp:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # 崩溃时可能留下半行，忽略
+                    continue
+        failed = write_events(events) if events else []
+        if failed:
+            _spool_failed(spool_dir, failed)
+        total += len(events) - len(failed)
+        os.remove(claimed)
+    return total
+
+
+class AuditLogWriter:
+    """进程内审计日志批量写入器"""
+
+    def __init__(self, batch_size=100, flush_interval=2.0, spool_dir=None, retry_interval=60.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.spool_dir = spool_dir or _spool_dir()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._buffer = []
+        self._segment = None
+        self._segment_file = None
+        self._thread = None
+        self._pid = None
+
+    def _open_segment(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._segment = os.path.join(
+            self.spool_dir, f'{os.getpid()}-{time.time_ns()}.jsonl'
+        )
+        self._segment_file = open(self._segment, 'a', encoding='utf-8')
+
+    def _ensure_started(self):
+        """首次写入或 fork 后在本进程内启动后台线程"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._buffer = []
+        # fork 继承的分段属于父进程，子进程写入时另开分段
+        self._segment = None
+        self._segment_file = None
+        self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def record(self, event):
+        """登记一条事件：先落盘，再放入内存缓冲"""
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._ensure_started()
+            if self._segment_file is None:
+                self._open_segment()
+            self._segment_file.write(line + '\n')
+            self._segment_file.flush()
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        将缓冲中的事件写库，成功后删除对应的 spool 分段
+
+        部分事件写库失败时，先将其另存为 failed- 分段再删除原分段，事件不会丢失
+
+        Returns:
+            写入的条数
+        """
+        with self._lock:
+            if not self._buffer:
+                return 0
+            events, self._buffer = self._buffer, []
+            segment, segment_file = self._segment, self._segment_file
+            # 下一条事件到来时再开新分段
+            self._segment = None
+            self._segment_file = None
+
+        segment_file.close()
+        close_old_connections()
+        failed = write_events(events)
+        if failed:
+            _spool_failed(self.spool_dir, failed)
+        os.remove(segment)
+        return len(events) - len(failed)
+
+    def _run(self):
+        # 启动时补写其他进程崩溃遗留的 spool，此后按 retry_interval 补写写库失败的分段
+        last_replay = None
+        while True:
+            if last_replay is None or time.monotonic() - last_replay >= self.retry_interval:
+                last_replay = time.monotonic()
+                try:
+                    replay_spool(self.spool_dir, exclude={self._segment})
+                except Exception:
+                    logger.exception('审计日志 spool 补写失败')
+
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('审计日志写入线程异常')
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """获取进程内单例写入器"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter(
+                    batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100),
+                    flush_interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0),
+                    retry_interval=getattr(settings, 'AUDIT_LOG_RETRY_INTERVAL', 60.0),
+                )
+    return _writer
+
+
+def record_audit(actor=None, action=None, target_type='', target_id=None, context=None,
+                 ip_address=None, user_agent=''):
+    """
+    记录审计日志（参数与 AuditLog.objects.create 一致）
+
+    AUDIT_LOG_ASYNC 关闭时直接同步写库
+    """
+    # 事件统一转换为 JSON 形态，保证内存写库与 spool 补写结果一致
+    event = json.loads(json.dumps({
+        'id': str(uuid.uuid4()),
+        'actor_id': str(actor.pk) if actor is not None else None,
+        'action': action,
+        'target_type': target_type,
+        'target_id': str(target_id) if target_id else None,
+        'context': context or {},
+        'ip_address': ip_address,
+        'user_agent': user_agent or '',
+        'created_at': timezone.now(),
+    }, cls=DjangoJSONEncoder))
+
+    if not getattr(settings, 'AUDIT_LOG_ASYNC', True):
+        return _to_instance(event).save(force_insert=True)
+    get_writer().record(event)
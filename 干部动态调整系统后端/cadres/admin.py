@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PersonnelRoster, Cadre, CadreResume
+from .models import PersonnelRoster, Cadre, CadreResume, ImportJob
 
 
 @admin.register(PersonnelRoster)
@@ -89,3 +89,12 @@ class CadreResumeAdmin(admin.ModelAdmin):
     list_filter = ['start_date', 'end_date']
     search_fields = ['cadre__name', 'position_title']
     readonly_fields = ['created_at']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """导入任务管理"""
+    list_display = ['file_name', 'status', 'processed_rows', 'success_count', 'error_count', 'created_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['file_name', 'created_by__username']
+    readonly_fields = [field.name for field in ImportJob._meta.fields]
@@ -0,0 +1,265 @@
+"""
+花名册/干部主档导出
+以 values_list().iterator() 分批从数据库游标读取，逐行渲染后写出：
+    CSV   每行直接产出，边查边发送
+    xlsx  工作表 XML 逐行写入 zip 流（不可 seek 的输出按数据描述符写入），
+          每写满一批行就把已压缩的字节发送出去，首个字节不必等待整个文件生成
+全程不在内存中保留全部行，内存占用只与批大小有关
+"""
+
+import csv
+import datetime
+import re
+import zipfile
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+
+from .importer import ROSTER_COLUMNS
+from .models import Gender
+
+
+EXPORT_FORMATS = ('xlsx', 'csv')
+EXPORT_CHUNK_SIZE = 2000
+
+# xlsx 每写入该行数发送一次已生成的字节
+XLSX_FLUSH_ROWS = 500
+
+# xlsx 包内除工作表外的固定部件；日期单元格使用样式 1（yyyy-mm-dd）
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# 花名册导出与导入模板列一致，导出文件可直接修改后重新导入（upsert）；
+# 导入时同名列会被追加 .1 后缀，导出时去掉
+ROSTER_EXPORT_COLUMNS = [
+    (re.sub(r'\.\d+$', '', header), field, kind) for header, field, kind in ROSTER_COLUMNS
+]
+
+CADRE_EXPORT_COLUMNS = [
+    ('干部编号', 'cadre_code', 'str'),
+    ('姓名', 'name', 'str'),
+    ('性别', 'gender', 'choice'),
+    ('出生日期', 'birth_date', 'date'),
+    ('籍贯', 'native_place', 'str'),
+    ('民族', 'ethnicity', 'str'),
+    ('政治面貌', 'political_status', 'str'),
+    ('学历层次', 'education_level', 'choice'),
+    ('学位', 'degree', 'str'),
+    ('参加工作时间', 'join_work_date', 'date'),
+    ('入职时间', 'hire_date', 'date'),
+    ('现任职务', 'current_position', 'str'),
+    ('现任职级', 'current_rank', 'str'),
+    ('任现职时间', 'position_start_date', 'date'),
+    ('状态', 'status', 'choice'),
+    ('身份证号', 'id_card', 'str'),
+    ('警号', 'police_number', 'str'),
+]
+
+GENDER_LABELS = {Gender.MALE: '男', Gender.FEMALE: '女'}
+
+
+def _renderer(model, field, kind, file_format):
+    """按列类型生成单元格渲染函数"""
+    if kind == 'gender':
+        return lambda value: GENDER_LABELS.get(value, '')
+    if kind == 'choice':
+        labels = {key: str(label) for key, label in model._meta.get_field(field).flatchoices}
+        return lambda value: labels.get(value, value or '')
+    if kind == 'flag':
+        return lambda value: '是' if value else ''
+    if kind == 'date' and file_format == 'csv':
+        return lambda value: value.isoformat() if value else ''
+    if kind == 'str':
+        return lambda value: value or ''
+    return lambda value: value
+
+
+def iter_export_rows(queryset, columns, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    逐行产出导出数据（已渲染为单元格值）
+
+    Args:
+        columns: [(表头, 字段, 列类型), ...]
+    """
+    model = queryset.model
+    fields = [field for _, field, _ in columns]
+    renderers = [_renderer(model, field, kind, file_format) for _, field, kind in columns]
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield [render(value) for render, value in zip(renderers, row)]
+
+
+class _Echo:
+    """csv.writer 的写入目标：直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    # 带 BOM，Excel 打开 UTF-8 CSV 时不乱码
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ChunkSink:
+    """zip 流的写入目标：只能追加、不能 seek，暂存写入的字节由生成器取走"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _xlsx_cell(ref, value):
+    """单元格值 -> <c> 元素（字符串写为内联字符串，日期写为序列值并套用日期样式）"""
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return f'<c r="{ref}" s="1"><v>{to_excel(value)}</v></c>'
+    text = escape(ILLEGAL_CHARACTERS_RE.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number, letters, values):
+    cells = ''.join(_xlsx_cell(f'{letter}{number}', value) for letter, value in zip(letters, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def stream_xlsx(headers, rows, flush_rows=XLSX_FLUSH_ROWS):
+    sink = _ChunkSink()
+    letters = [get_column_letter(index) for index in range(1, len(headers) + 1)]
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(XLSX_SHEET_HEAD.encode())
+            sheet.write(_xlsx_row(1, letters, headers).encode())
+            for number, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(number, letters, row).encode())
+                if number % flush_rows == 0:
+                    data = sink.take()
+                    if data:
+                        yield data
+            sheet.write(XLSX_SHEET_TAIL.encode())
+    yield sink.take()
+
+
+def export_response(queryset, columns, file_format, file_name):
+    """
+    生成流式下载响应
+
+    Args:
+        file_format: xlsx / csv
+        file_name: 不含扩展名的文件名，会追加导出时间
+    """
+    headers = [header for header, _, _ in columns]
+    rows = iter_export_rows(queryset, columns, file_format)
+    if file_format == 'csv':
+        content = stream_csv(headers, rows)
+    else:
+        content = stream_xlsx(headers, rows)
+
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[file_format])
+    full_name = f'{file_name}_{timezone.localtime():%Y%m%d%H%M%S}.{file_format}'
+    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(full_name)}"
+    return response
+
+
+def export_cadres(queryset, file_format):
+    return export_response(queryset, CADRE_EXPORT_COLUMNS, file_format, '干部主档')
+
+
+def export_roster(queryset, file_format):
+    return export_response(queryset, ROSTER_EXPORT_COLUMNS, file_format, '花名册')
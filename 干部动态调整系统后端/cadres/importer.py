@@ -0,0 +1,529 @@
+"""
+花名册 Excel 导入
+以 openpyxl 只读模式流式读取工作表，按块组装为 DataFrame，
+列映射与行校验由 validation 模块按列向量化完成（大文件时在进程池中按块并行），
+比对已有数据与写库在主进程中按块进行。内存占用只与块大小有关，与文件行数无关。
+"""
+
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from openpyxl import load_workbook
+
+from .models import Gender, ImportMode, JobLevel, PersonnelRoster, PoliceRank, PoliticalStatus
+from .statistics import STAT_FIELDS, apply_deltas, count_rows, row_delta
+from .validation import add_error, matrix_messages, prepare_chunk
+
+
+# (Excel 列名, 模型字段, 列类型)
+# 列类型：str 文本、date 日期、int 整数、gender 性别、flag 是/否、serial 序号
+ROSTER_COLUMNS = [
+    ('序号*', 'serial_number', 'serial'),
+    ('姓名*', 'name', 'str'),
+    ('部门*', 'department', 'str'),
+    ('性别*', 'gender', 'gender'),
+    ('年龄*', 'age', 'int'),
+    ('出生年月*', 'birth_date', 'date'),
+    ('民族*', 'ethnicity', 'str'),
+    ('籍贯*', 'native_place', 'str'),
+    ('户籍所在地\n（未核对原件）', 'household_registration', 'str'),
+    ('工龄', 'working_years', 'int'),
+    ('参加工作时间*', 'join_work_date', 'date'),
+    ('参加监狱工作时间*', 'join_prison_date', 'date'),
+    ('连续工龄计算时间*', 'continuous_service_date', 'date'),
+    ('是否有2年基层工作经历', 'has_2years_grassroots', 'str'),
+    ('政治面貌*', 'political_status', 'str'),
+    ('入党时间*', 'join_party_date', 'date'),
+    ('职务*', 'position', 'str'),
+    ('晋升四高及以上序列分类', 'promotion_category', 'str'),
+    ('职务类别', 'position_category', 'str'),
+    ('任现职年限', 'current_position_years', 'str'),
+    ('任现职务时间', 'current_position_date', 'date'),
+    ('职务级别', 'position_level', 'str'),
+    ('职务层次', 'position_rank', 'str'),
+    ('任同级领导职务年限', 'same_level_leadership_years', 'str'),
+    ('任同级\n领导职务时间', 'same_level_leadership_date', 'date'),
+    ('任同级领导职务层次时间年限', 'same_level_rank_years', 'str'),
+    ('任同级领导职务层次时间', 'same_level_rank_date', 'date'),
+    ('任现职级年限（即任现警员职级年限）*', 'current_rank_years', 'str'),
+    ('任现职级时间（即任现警员职级时间）*', 'current_rank_date', 'date'),
+    ('量化计分起算时间', 'calculation_start_date', 'date'),
+    ('现警员职级*', 'police_rank', 'str'),
+    ('任现警员职级起算时间', 'police_rank_start_date', 'date'),
+    ('首套警员职级', 'first_set_rank', 'str'),
+    ('首套警员职级起算时间', 'first_set_rank_date', 'date'),
+    ('首晋警员职级', 'first_promote_rank', 'str'),
+    ('首晋警员职级起算时间', 'first_promote_rank_date', 'date'),
+    ('分管工作', 'work_charge', 'str'),
+    ('全日制教育学历*', 'fulltime_education', 'str'),
+    ('毕业院校*', 'fulltime_school', 'str'),
+    ('专业*', 'fulltime_major', 'str'),
+    ('学位*', 'fulltime_degree', 'str'),
+    ('入学时间', 'fulltime_start_date', 'date'),
+    ('毕业时间', 'fulltime_graduate_date', 'date'),
+    ('在职学历*', 'inservice_education', 'str'),
+    ('毕业院校*.1', 'inservice_school', 'str'),
+    ('学习形式', 'inservice_form', 'str'),
+    ('专业*.1', 'inservice_major', 'str'),
+    ('学位*.1', 'inservice_degree', 'str'),
+    ('入学时间.1', 'inservice_start_date', 'date'),
+    ('毕业时间.1', 'inservice_graduate_date', 'date'),
+    ('警衔*（已更新至20250526）', 'police_title', 'str'),
+    ('警号*', 'police_number', 'str'),
+    ('专业资格\n名称', 'profession_name', 'str'),
+    ('专业资格级别', 'profession_level', 'str'),
+    ('专业技术职务', 'technical_title', 'str'),
+    ('心理咨询证书级别', 'counseling_cert_level', 'str'),
+    ('英语专业', 'english_level', 'str'),
+    ('备注', 'remark', 'str'),
+    ('季度报表备注', 'quarterly_remark', 'str'),
+    ('在本部门工作年限', 'dept_work_years', 'str'),
+    ('本部门工作时间*', 'dept_work_date', 'date'),
+    ('在本单位年限', 'unit_work_years', 'str'),
+    ('进入本单位时间*', 'enter_unit_date', 'date'),
+    ('进入本单位形式', 'enter_unit_form', 'str'),
+    ('身份来源', 'identity_source', 'str'),
+    ('军转干/部队经历*', 'military_experience', 'str'),
+    ('最高学历*', 'highest_education', 'str'),
+    ('最高学历毕业院校*', 'highest_school', 'str'),
+    ('学历*', 'education_level', 'str'),
+    ('最高学历专业*', 'highest_major', 'str'),
+    ('最高学位*', 'highest_degree', 'str'),
+    ('最高学历专业类别', 'major_category', 'str'),
+    ('身份证号*', 'id_card', 'str'),
+    ('出生年月与身份证信息不一致', 'id_card_inconsistent', 'flag'),
+    ('电话*', 'phone', 'str'),
+    ('证书级别', 'cert_level', 'str'),
+]
+
+REQUIRED_COLUMNS = ['姓名*', '部门*', '性别*']
+
+# 唯一且可为空的字段：空值写 NULL，避免多条空值互相冲突
+UNIQUE_FIELDS = ['id_card', 'police_number']
+
+CHOICE_FIELDS = {
+    'political_status': PoliticalStatus.values,
+    'police_rank': JobLevel.values,
+    'police_title': PoliceRank.values,
+}
+
+GENDER_MAP = {'男': Gender.MALE, '女': Gender.FEMALE}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# 预检/导入报告中每类明细最多保留的行数
+REPORT_LIMIT = 1000
+
+
+class RosterImportError(Exception):
+    """文件级错误（格式不支持、缺少必需列等），整个文件不予导入"""
+
+    def __init__(self, message, required_columns=None):
+        super().__init__(message)
+        self.required_columns = required_columns
+
+
+def _dedupe_headers(headers):
+    """与 pandas 一致地处理重复/空列名：重复列依次追加 .1、.2"""
+    seen = {}
+    result = []
+    for index, header in enumerate(headers):
+        name = f'Unnamed: {index}' if header is None else str(header)
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        result.append(name)
+    return result
+
+
+def read_excel_chunks(file, chunk_size=DEFAULT_CHUNK_SIZE, on_open=None):
+    """
+    流式读取 Excel，按块产出 DataFrame
+
+    .xlsx 使用 openpyxl 只读模式逐行读取；旧版 .xls 只能整体读入后再分块
+
+    Args:
+        on_open: 打开文件后以预计数据行数（不含表头，可能为 None）回调
+
+    Yields:
+        DataFrame，索引为 Excel 行号（表头为第 1 行）
+    """
+    if file.name.endswith('.xls'):
+        frame = pd.read_excel(file, dtype=object)
+        frame.index = frame.index + 2
+        if on_open:
+            on_open(len(frame))
+        for start in range(0, max(len(frame), 1), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+        return
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.active
+        if on_open:
+            # 只读模式下 max_row 取自工作表的 dimension 声明，可能缺失
+            on_open(worksheet.max_row - 1 if worksheet.max_row else None)
+        rows = worksheet.iter_rows(values_only=True)
+        headers = _dedupe_headers(next(rows, ()))
+        width = len(headers)
+        buffer, row_numbers, yielded = [], [], False
+        for row_number, row in enumerate(rows, start=2):
+            if not any(value is not None and value != '' for value in row):
+                continue
+            # 只读模式下行宽可能与表头不一致，按表头补齐/截断
+            buffer.append(row[:width] + (None,) * (width - len(row)))
+            row_numbers.append(row_number)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=headers, index=row_numbers, dtype=object)
+                buffer, row_numbers, yielded = [], [], True
+        if buffer or not yielded:
+            yield pd.DataFrame(buffer, columns=headers, index=row_numbers, dtype=object)
+    finally:
+        workbook.close()
+
+
+class RosterImporter:
+    """
+    花名册导入器
+
+    两种模式：
+        insert  仅新增，身份证号/警号已存在的行记为错误
+        upsert  按身份证号（其次警号）匹配已有人员，只写入有变化的行；
+                文件中没有的列保持原值
+    dry_run 时只比对并生成报告，不写库
+    """
+
+    def __init__(self, created_by=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None,
+                 mode=ImportMode.INSERT, dry_run=False, workers=None):
+        """
+        Args:
+            progress: 每处理完一块后调用 progress(importer)，用于上报进度
+            workers: 校验进程数，默认取 ROSTER_IMPORT_WORKERS
+        """
+        self.workers = workers or getattr(settings, 'ROSTER_IMPORT_WORKERS', 1)
+        self.rules = self.build_rules()
+        self.created_by = created_by
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.mode = mode
+        self.dry_run = dry_run
+        self.expected_total = None
+        self.total = 0
+        self.inserted_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.conflict_count = 0
+        self.errors = []
+        self.report = {'inserted': [], 'updated': [], 'conflicts': []}
+        # 已处理的唯一字段值，用于识别文件内跨块的重复行
+        self._seen = {field: set() for field in UNIQUE_FIELDS}
+
+    @property
+    def success_count(self):
+        return self.inserted_count + self.updated_count + self.unchanged_count
+
+    @property
+    def error_count(self):
+        return len(self.errors)
+
+    @classmethod
+    def build_rules(cls):
+        """生成校验规则（普通字典，可传给子进程）"""
+        fields = {field.name: field for field in PersonnelRoster._meta.concrete_fields}
+        return {
+            'columns': ROSTER_COLUMNS,
+            'unique_fields': UNIQUE_FIELDS,
+            'required_fields': ['name', 'department'],
+            'choices': {field: list(choices) for field, choices in CHOICE_FIELDS.items()},
+            'max_lengths': {
+                field: fields[field].max_length
+                for _, field, kind in ROSTER_COLUMNS
+                if kind == 'str' and fields[field].max_length
+            },
+            'gender_map': {text: gender.value for text, gender in GENDER_MAP.items()},
+            'gender_default': Gender.UNKNOWN.value,
+            'labels': {field: str(fields[field].verbose_name) for _, field, _ in ROSTER_COLUMNS},
+        }
+
+    def prepared_chunks(self, chunks):
+        """
+        按块执行转换与校验，产出 (records, 错误矩阵)
+
+        文件超过两块且 ROSTER_IMPORT_WORKERS > 1 时在进程池中并行，
+        按提交顺序取回结果，在途块数有上限以控制内存
+        """
+        if self.workers <= 1 or (self.expected_total or 0) <= self.chunk_size * 2:
+            for chunk in chunks:
+                yield prepare_chunk(chunk, self.rules)
+            return
+
+        # 导入可能运行在 Web 进程的后台线程中，使用 spawn 避免 fork 多线程进程
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(prepare_chunk, chunk, self.rules))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def match_existing(self, records, fields):
+        """
+        按唯一字段匹配已有人员
+
+        Returns:
+            (matches, conflicts)：matches 为 {Excel行号: (匹配字段, 已有记录字段字典)}；
+            conflicts 为 {Excel行号: 错误信息}
+        """
+        lookups = {}
+        for field in UNIQUE_FIELDS:
+            values = records[field].dropna().unique().tolist()
+            lookups[field] = {
+                row[field]: row
+                for row in PersonnelRoster.objects.filter(**{f'{field}__in': values}).values(
+                    *dict.fromkeys(['id', 'serial_number', *UNIQUE_FIELDS, *STAT_FIELDS, *fields])
+                )
+            } if values else {}
+
+        matches, conflicts = {}, {}
+        for row_number, keys in records[UNIQUE_FIELDS].iterrows():
+            found = [
+                (field, lookups[field][keys[field]])
+                for field in UNIQUE_FIELDS
+                if keys[field] is not None and keys[field] in lookups[field]
+            ]
+            if len({row['id'] for _, row in found}) > 1:
+                conflicts[row_number] = '身份证号与警号分别属于不同的已有人员'
+            elif found:
+                matches[row_number] = found[0]
+        return matches, conflicts
+
+    def diff(self, records, matches, fields):
+        """
+        比对文件与已有记录
+
+        Returns:
+            {Excel行号: [有变化的字段, ...]}，只包含有变化的行
+        """
+        if not matches:
+            return {}
+        rows = list(matches)
+        current = pd.DataFrame([matches[row][1] for row in rows], index=rows)[fields]
+        incoming = records.loc[rows, fields]
+        changed = (incoming != current) & ~(incoming.isna() & current.isna())
+        # 文件中序号为空时沿用原序号
+        if 'serial_number' in fields:
+            changed['serial_number'] &= incoming['serial_number'].notna()
+        changed = changed[changed.any(axis=1)]
+        return {
+            row_number: [field for field, flag in flags.items() if flag]
+            for row_number, flags in changed.iterrows()
+        }
+
+    def import_chunk(self, records, matrix, fields):
+        """
+        比对并写入一块已校验的数据
+
+        Args:
+            records: 字段 DataFrame（prepare_chunk 的结果）
+            matrix: 错误矩阵
+            fields: 文件中实际存在的列对应的字段（只比对/更新这些字段）
+        """
+        names = records['name']
+        labels = self.rules['labels']
+        # 跨块重复
+        for field in UNIQUE_FIELDS:
+            add_error(matrix, records[field].isin(list(self._seen[field])), field, f'{labels[field]}在文件中重复')
+        row_errors = matrix_messages(matrix, labels)
+
+        candidates = records.drop(index=list(row_errors))
+        matches, conflicts = self.match_existing(candidates, fields)
+        for row_number, message in conflicts.items():
+            row_errors.setdefault(row_number, {})[labels['id_card']] = message
+            self.conflict_count += 1
+            self._add_report('conflicts', row_number, names, error=message)
+
+        if self.mode == ImportMode.INSERT:
+            for row_number, (field, _) in matches.items():
+                row_errors.setdefault(row_number, {})[labels[field]] = f'{labels[field]}已存在'
+            matches = {}
+
+        for row_number, cells in sorted(row_errors.items()):
+            self.errors.append({
+                'row': row_number,
+                'name': names[row_number],
+                'error': '；'.join(cells.values()),
+                'fields': cells,
+            })
+
+        valid = records.drop(index=list(row_errors))
+        for field in UNIQUE_FIELDS:
+            self._seen[field].update(valid[field].dropna())
+
+        changes = self.diff(valid, matches, fields)
+        inserts = valid.drop(index=list(matches))
+        # 新增行序号为空时按文件中的位置编号
+        fallback = pd.Series(range(self.total + 1, self.total + len(records) + 1), index=records.index)
+        inserts = inserts.assign(serial_number=inserts['serial_number'].where(
+            inserts['serial_number'].notna(), fallback[inserts.index]
+        ))
+
+        if not self.dry_run:
+            # 本块数据与统计差值在同一事务中提交
+            with transaction.atomic():
+                skipped = self._write_inserts(inserts)
+                if skipped:
+                    # 比对之后被并发写入抢先插入的行未写入，计为失败
+                    inserts = inserts.drop(index=skipped)
+                    message = f'{labels["id_card"]}或{labels["police_number"]}已存在'
+                    for row_number in skipped:
+                        self.errors.append({
+                            'row': row_number,
+                            'name': names[row_number],
+                            'error': message,
+                            'fields': {labels['id_card']: message},
+                        })
+                self._write_updates(valid, matches, changes)
+                apply_deltas(self._statistics_delta(inserts, valid, matches, changes))
+
+        for row_number in inserts.index:
+            self._add_report('inserted', row_number, names)
+        for row_number, changed_fields in changes.items():
+            self._add_report('updated', row_number, names, fields=[labels[field] for field in changed_fields])
+
+        self.total += len(records)
+        self.inserted_count += len(inserts)
+        self.updated_count += len(changes)
+        self.unchanged_count += len(matches) - len(changes)
+        if self.progress:
+            self.progress(self)
+
+    def _write_inserts(self, inserts):
+        """
+        写入新增行
+
+        ignore_conflicts 会静默跳过与已有记录重复的行（比对之后被并发写入），
+        写入后按预先生成的主键回查实际写入的行
+
+        Returns:
+            未写入的 Excel 行号列表
+        """
+        instances = {
+            row_number: PersonnelRoster(created_by=self.created_by, **record)
+            for row_number, record in zip(inserts.index, inserts.to_dict('records'))
+        }
+        if not instances:
+            return []
+        PersonnelRoster.objects.bulk_create(list(instances.values()), batch_size=500, ignore_conflicts=True)
+        written = set(
+            PersonnelRoster.objects.filter(pk__in=[instance.pk for instance in instances.values()])
+            .values_list('pk', flat=True)
+        )
+        return [row_number for row_number, instance in instances.items() if instance.pk not in written]
+
+    def _write_updates(self, valid, matches, changes):
+        """按匹配字段分组，用 INSERT ... ON CONFLICT DO UPDATE 只写入有变化的行"""
+        groups = {}
+        for row_number, changed_fields in changes.items():
+            field, current = matches[row_number]
+            record = valid.loc[row_number].to_dict()
+            if record['serial_number'] is None:
+                record['serial_number'] = current['serial_number']
+            group = groups.setdefault(field, {'instances': [], 'fields': set()})
+            group['instances'].append(PersonnelRoster(created_by=self.created_by, **record))
+            group['fields'].update(changed_fields)
+            if 'name' in changed_fields:
+                group['fields'].update(['name_pinyin', 'name_initials'])
+
+        for field, group in groups.items():
+            PersonnelRoster.objects.bulk_create(
+                group['instances'],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=[field],
+                update_fields=sorted(group['fields']) + ['updated_at']
+            )
+
+    def _statistics_delta(self, inserts, valid, matches, changes):
+        """本块写入引起的花名册统计差值"""
+        delta = count_rows(inserts[STAT_FIELDS].to_dict('records'))
+        for row_number, changed_fields in changes.items():
+            stat_changes = [field for field in changed_fields if field in STAT_FIELDS]
+            if not stat_changes:
+                continue
+            before = {field: matches[row_number][1][field] for field in STAT_FIELDS}
+            after = {**before, **{field: valid.at[row_number, field] for field in stat_changes}}
+            delta.update(row_delta(before, after))
+        return delta
+
+    def _add_report(self, kind, row_number, names, **extra):
+        if len(self.report[kind]) < REPORT_LIMIT:
+            self.report[kind].append({
+                'row': row_number,
+                'name': names[row_number],
+                **extra,
+            })
+
+    def import_file(self, file):
+        """
+        导入整个文件
+
+        Raises:
+            RosterImportError: 文件无法读取或缺少必需列
+        """
+        try:
+            chunks = read_excel_chunks(file, self.chunk_size, on_open=self._set_expected_total)
+            first = next(chunks, None)
+        except Exception as e:
+            raise RosterImportError(f'文件处理失败: {e}')
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if first is None or col not in first.columns]
+        if missing_columns:
+            raise RosterImportError(
+                f'Excel文件缺少必需的列: {", ".join(missing_columns)}',
+                required_columns=REQUIRED_COLUMNS
+            )
+
+        fields = [field for header, field, _ in ROSTER_COLUMNS if header in first.columns]
+        try:
+            for records, matrix in self.prepared_chunks(itertools.chain([first], chunks)):
+                self.import_chunk(records, matrix, fields)
+        except Exception as e:
+            # 已写入的块保留，返回处理到的位置便于核对
+            raise RosterImportError(f'文件处理失败（已处理 {self.total} 行）: {e}')
+        return self.summary()
+
+    def _set_expected_total(self, count):
+        self.expected_total = count
+
+    def summary(self):
+        prefix = '预检完成' if self.dry_run else '导入完成'
+        if self.mode == ImportMode.UPSERT:
+            message = (
+                f'{prefix}！新增: {self.inserted_count}条，更新: {self.updated_count}条，'
+                f'未变化: {self.unchanged_count}条，失败: {self.error_count}条'
+            )
+        else:
+            message = f'{prefix}！成功: {self.success_count}条，失败: {self.error_count}条'
+        return {
+            'message': message,
+            'mode': self.mode,
+            'dry_run': self.dry_run,
+            'total': self.total,
+            'success_count': self.success_count,
+            'inserted_count': self.inserted_count,
+            'updated_count': self.updated_count,
+            'unchanged_count': self.unchanged_count,
+            'conflict_count': self.conflict_count,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'report': self.report,
+        }
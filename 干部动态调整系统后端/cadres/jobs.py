@@ -0,0 +1,239 @@
+"""
+导入任务处理
+ImportJob 表即任务队列：上传接口只保存文件并登记任务，
+由 run_import_worker 命令（独立进程）或本进程内的后台线程认领并执行。
+认领时以状态条件更新保证同一任务只被一个处理器执行。
+进程内模式下，Web 进程处理首个请求时先清理中断的任务并处理遗留的排队任务，
+进程重启前登记但未处理的任务不必等到下一次上传。
+"""
+
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from audit.models import AuditAction
+from audit.writer import record_audit
+
+from .importer import RosterImporter, RosterImportError
+from .models import ImportJob, ImportJobStatus, ImportMode
+from .sync import sync_roster_to_cadres
+
+
+logger = logging.getLogger('app')
+
+
+def _worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def enqueue_roster_import(file, user, mode=ImportMode.INSERT, dry_run=False):
+    """
+    保存上传文件并登记导入任务
+
+    IMPORT_JOBS_RUN_IN_PROCESS 开启时，事务提交后在本进程的后台线程中处理；
+    否则等待 run_import_worker 命令认领
+    """
+    job = ImportJob(file_name=file.name, created_by=user, mode=mode, dry_run=dry_run)
+    job.file.save(file.name, file, save=False)
+    job.save()
+
+    if getattr(settings, 'IMPORT_JOBS_RUN_IN_PROCESS', True):
+        transaction.on_commit(lambda: _get_executor().submit(_process_in_thread))
+    return job
+
+
+def claim_next_job(worker=None):
+    """认领最早的排队任务，没有可处理任务时返回 None"""
+    while True:
+        job_id = (
+            ImportJob.objects.filter(status=ImportJobStatus.PENDING)
+            .order_by('created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        claimed = ImportJob.objects.filter(pk=job_id, status=ImportJobStatus.PENDING).update(
+            status=ImportJobStatus.RUNNING,
+            worker=worker or _worker_name(),
+            started_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        if claimed:
+            return ImportJob.objects.get(pk=job_id)
+        # 被其他处理器抢先认领，继续找下一个
+
+
+def run_job(job):
+    """执行一个已认领的导入任务，逐块记录进度"""
+    max_errors = getattr(settings, 'IMPORT_JOB_MAX_ERRORS', 1000)
+
+    def report(importer):
+        job.total_rows = importer.expected_total
+        job.processed_rows = importer.total
+        job.success_count = importer.success_count
+        job.error_count = importer.error_count
+        ImportJob.objects.filter(pk=job.pk).update(
+            total_rows=job.total_rows,
+            processed_rows=job.processed_rows,
+            success_count=job.success_count,
+            error_count=job.error_count,
+            updated_at=timezone.now()
+        )
+
+    importer = RosterImporter(created_by=job.created_by, progress=report, mode=job.mode, dry_run=job.dry_run)
+    try:
+        # 存储中的文件名保留了原始扩展名，导入器据此区分 .xls/.xlsx
+        with job.file.open('rb') as file:
+            result = importer.import_file(file)
+    except RosterImportError as e:
+        job.status = ImportJobStatus.FAILED
+        job.message = str(e)
+    except Exception as e:
+        logger.exception('导入任务执行失败: %s', job.pk)
+        job.status = ImportJobStatus.FAILED
+        job.message = f'文件处理失败: {e}'
+    else:
+        job.status = ImportJobStatus.SUCCEEDED
+        job.message = result['message']
+
+    job.processed_rows = importer.total
+    job.success_count = importer.success_count
+    job.inserted_count = importer.inserted_count
+    job.updated_count = importer.updated_count
+    job.unchanged_count = importer.unchanged_count
+    job.conflict_count = importer.conflict_count
+    job.error_count = importer.error_count
+    job.errors = importer.errors[:max_errors]
+    job.report = importer.report
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'message', 'processed_rows', 'success_count', 'inserted_count', 'updated_count',
+        'unchanged_count', 'conflict_count', 'error_count', 'errors', 'report', 'finished_at', 'updated_at'
+    ])
+
+    if job.dry_run:
+        # 预检不写库，无需审计
+        job.file.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(file='')
+        return job
+
+    # 导入后增量同步到干部主档；同步失败不影响导入结果，可通过 sync_roster 命令补做
+    if job.status == ImportJobStatus.SUCCEEDED and getattr(settings, 'ROSTER_SYNC_AFTER_IMPORT', True):
+        try:
+            job.report['sync'] = sync_roster_to_cadres()
+            ImportJob.objects.filter(pk=job.pk).update(report=job.report)
+        except Exception:
+            logger.exception('花名册同步失败: %s', job.pk)
+
+    record_audit(
+        actor=job.created_by,
+        action=AuditAction.IMPORT_DATA,
+        target_type='ImportJob',
+        target_id=job.pk,
+        context={
+            'file_name': job.file_name,
+            'mode': job.mode,
+            'status': job.status,
+            'inserted_count': job.inserted_count,
+            'updated_count': job.updated_count,
+            'error_count': job.error_count,
+        }
+    )
+
+    # 文件含身份证号等敏感信息，导入成功后不再保留；失败时保留以便排查
+    if job.status == ImportJobStatus.SUCCEEDED:
+        job.file.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(file='')
+    return job
+
+
+def process_pending_jobs(worker=None, limit=None):
+    """
+    依次处理排队中的任务
+
+    Returns:
+        处理的任务数
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job(worker)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def fail_stale_jobs(timeout=None):
+    """
+    将长时间无进度更新的处理中任务标记为失败（处理进程异常退出）
+
+    Returns:
+        标记的任务数
+    """
+    timeout = timeout or getattr(settings, 'IMPORT_JOB_STALE_TIMEOUT', 30 * 60)
+    return ImportJob.objects.filter(
+        status=ImportJobStatus.RUNNING,
+        updated_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(
+        status=ImportJobStatus.FAILED,
+        message='处理进程中断，请重新上传',
+        finished_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_started_pid = None
+
+
+def _get_executor():
+    """获取进程内的任务线程池（fork 后重新创建）"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMPORT_JOB_THREADS', 1),
+                thread_name_prefix='import-job'
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+def start_in_process_worker():
+    """
+    启动本进程的进程内处理器（每个进程只执行一次，fork 后重新执行）
+
+    在后台线程中将中断的任务标记为失败，并处理遗留的排队任务；
+    IMPORT_JOBS_RUN_IN_PROCESS 关闭时由 run_import_worker 负责，不做处理
+    """
+    global _started_pid
+    if _started_pid == os.getpid() or not getattr(settings, 'IMPORT_JOBS_RUN_IN_PROCESS', True):
+        return
+    with _executor_lock:
+        if _started_pid == os.getpid():
+            return
+        _started_pid = os.getpid()
+    _get_executor().submit(_process_in_thread)
+
+
+def _process_in_thread():
+    close_old_connections()
+    try:
+        fail_stale_jobs()
+        process_pending_jobs()
+    except Exception:
+        logger.exception('导入任务线程异常')
+    finally:
+        close_old_connections()
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from cadres.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = '按花名册全量重建预聚合统计（统计与花名册不一致时用于校准）'
+
+    def handle(self, *args, **options):
+        total = rebuild_statistics()
+        print(f"花名册统计已重建，共 {total} 人")
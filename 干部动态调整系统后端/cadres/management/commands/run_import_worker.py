@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from cadres.jobs import fail_stale_jobs, process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = '运行导入任务处理器：持续认领并执行排队中的导入任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='处理完当前排队的任务后退出'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='无任务时的轮询间隔（秒）'
+        )
+
+    def handle(self, *args, **options):
+        print("导入任务处理器已启动")
+        while True:
+            stale = fail_stale_jobs()
+            if stale:
+                print(f"已将 {stale} 个中断的任务标记为失败")
+
+            count = process_pending_jobs()
+            if count:
+                print(f"已处理 {count} 个导入任务")
+
+            if options['once']:
+                break
+            if not count:
+                time.sleep(options['poll_interval'])
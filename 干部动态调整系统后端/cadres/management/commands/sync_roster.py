@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from cadres.sync import sync_roster_to_cadres
+
+
+class Command(BaseCommand):
+    help = '将花名册增量同步到干部主档和组织归属'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略同步水位，重新同步全部花名册'
+        )
+
+    def handle(self, *args, **options):
+        stats = sync_roster_to_cadres(full=options['full'])
+        print(f"处理花名册 {stats['processed']} 条")
+        print(f"干部主档：新建 {stats['created']}，更新 {stats['updated']}，"
+              f"未变化 {stats['unchanged']}，跳过 {stats['skipped']}")
+        print(f"组织归属：新建 {stats['memberships_opened']}，关闭 {stats['memberships_closed']}")
+        print(f"处理花名册删除记录 {stats['deleted']} 条")
+        if stats['unresolved_departments']:
+            print(f"未匹配到组织单元的部门：{'、'.join(stats['unresolved_departments'])}")
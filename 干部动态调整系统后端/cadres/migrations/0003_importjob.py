@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:58
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0002_personnelroster'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file', models.FileField(blank=True, upload_to='imports/%Y/%m/', verbose_name='导入文件')),
+                ('file_name', models.CharField(max_length=255, verbose_name='原始文件名')),
+                ('status', models.CharField(choices=[('PENDING', '排队中'), ('RUNNING', '处理中'), ('SUCCEEDED', '已完成'), ('FAILED', '失败')], db_index=True, default='PENDING', max_length=20, verbose_name='状态')),
+                ('total_rows', models.IntegerField(blank=True, null=True, verbose_name='预计行数')),
+                ('processed_rows', models.IntegerField(default=0, verbose_name='已处理行数')),
+                ('success_count', models.IntegerField(default=0, verbose_name='成功条数')),
+                ('error_count', models.IntegerField(default=0, verbose_name='失败条数')),
+                ('errors', models.JSONField(blank=True, default=list, help_text='[{row, name, error}, ...]，最多保留 IMPORT_JOB_MAX_ERRORS 条', verbose_name='行错误')),
+                ('message', models.TextField(blank=True, verbose_name='结果说明')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='处理进程')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '导入任务',
+                'verbose_name_plural': '导入任务',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='cadres_impo_status_095fc4_idx'), models.Index(fields=['created_by', '-created_at'], name='cadres_impo_created_be6364_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0003_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='conflict_count',
+            field=models.IntegerField(default=0, verbose_name='冲突条数'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='dry_run',
+            field=models.BooleanField(default=False, help_text='只生成新增/更新/未变化/冲突报告，不写库', verbose_name='仅预检'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='inserted_count',
+            field=models.IntegerField(default=0, verbose_name='新增条数'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('insert', '仅新增'), ('upsert', '新增或更新')], default='insert', max_length=10, verbose_name='导入模式'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='report',
+            field=models.JSONField(blank=True, default=dict, help_text='{inserted, updated, conflicts}，每类最多保留 1000 行', verbose_name='比对报告'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_count',
+            field=models.IntegerField(default=0, verbose_name='未变化条数'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_count',
+            field=models.IntegerField(default=0, verbose_name='更新条数'),
+        ),
+    ]
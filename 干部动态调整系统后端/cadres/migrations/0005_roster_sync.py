@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0004_importjob_upsert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='同步任务')),
+                ('watermark', models.DateTimeField(blank=True, null=True, verbose_name='已同步到的更新时间')),
+                ('last_id', models.UUIDField(blank=True, null=True, verbose_name='同一时间点已同步到的ID')),
+                ('synced_at', models.DateTimeField(auto_now=True, verbose_name='最近同步时间')),
+            ],
+            options={
+                'verbose_name': '同步水位',
+                'verbose_name_plural': '同步水位',
+            },
+        ),
+        migrations.AddField(
+            model_name='cadre',
+            name='id_card',
+            field=models.CharField(blank=True, max_length=18, null=True, unique=True, verbose_name='身份证号'),
+        ),
+        migrations.AddField(
+            model_name='cadre',
+            name='police_number',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True, verbose_name='警号'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:11
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from cadres.pinyin import name_pinyin
+
+
+def fill_name_pinyin(apps, schema_editor):
+    """为已有数据生成姓名拼音"""
+    for model_name in ('Cadre', 'PersonnelRoster'):
+        model = apps.get_model('cadres', model_name)
+        batch = []
+        for instance in model.objects.only('id', 'name').iterator(chunk_size=2000):
+            instance.name_pinyin, instance.name_initials = name_pinyin(instance.name)
+            batch.append(instance)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['name_pinyin', 'name_initials'])
+                batch = []
+        model.objects.bulk_update(batch, ['name_pinyin', 'name_initials'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0005_roster_sync'),
+    ]
+
+    operations = [
+        # pg_trgm 扩展（非 PostgreSQL 数据库时跳过）
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='cadre',
+            name='name_initials',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='姓名首字母'),
+        ),
+        migrations.AddField(
+            model_name='cadre',
+            name='name_pinyin',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='姓名全拼'),
+        ),
+        migrations.AddField(
+            model_name='personnelroster',
+            name='name_initials',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='姓名首字母'),
+        ),
+        migrations.AddField(
+            model_name='personnelroster',
+            name='name_pinyin',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='姓名全拼'),
+        ),
+        migrations.RunPython(fill_name_pinyin, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cadre',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name', 'cadre_code', 'name_pinyin'], name='cadre_search_trgm', opclasses=['gin_trgm_ops', 'gin_trgm_ops', 'gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cadre',
+            index=models.Index(fields=['name'], name='cadre_name_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cadre',
+            index=models.Index(fields=['name_pinyin'], name='cadre_pinyin_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cadre',
+            index=models.Index(fields=['name_initials'], name='cadre_initials_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='personnelroster',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name', 'department', 'police_number', 'id_card', 'name_pinyin'], name='roster_search_trgm', opclasses=['gin_trgm_ops', 'gin_trgm_ops', 'gin_trgm_ops', 'gin_trgm_ops', 'gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='personnelroster',
+            index=models.Index(fields=['name'], name='roster_name_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='personnelroster',
+            index=models.Index(fields=['department'], name='roster_department_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='personnelroster',
+            index=models.Index(fields=['name_pinyin'], name='roster_pinyin_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='personnelroster',
+            index=models.Index(fields=['name_initials'], name='roster_initials_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
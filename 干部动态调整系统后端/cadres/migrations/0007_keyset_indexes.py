@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0006_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cadre',
+            index=models.Index(fields=['status', '-position_start_date', 'name', 'id'], name='cadre_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='personnelroster',
+            index=models.Index(fields=['serial_number', 'department', 'name', 'id'], name='roster_keyset'),
+        ),
+    ]
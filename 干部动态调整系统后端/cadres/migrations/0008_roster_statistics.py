@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:18
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+# 以下为迁移编写时统计口径的冻结副本（见 cadres/statistics.py），不随应用代码变化
+STAT_FIELDS = [
+    'department', 'gender', 'age', 'highest_education', 'education_level', 'political_status', 'police_rank'
+]
+
+AGE_BANDS = [
+    (None, 30, '30岁以下'),
+    (30, 40, '30-39岁'),
+    (40, 50, '40-49岁'),
+    (50, 55, '50-54岁'),
+    (55, None, '55岁及以上'),
+]
+UNKNOWN = '未知'
+
+EDUCATION_MAP = {
+    '中专': 'MIDDLE',
+    '大专': 'COLLEGE',
+    '本科': 'BACHELOR',
+    '大学': 'BACHELOR',
+    '硕士': 'MASTER',
+    '研究生': 'MASTER',
+    '博士': 'DOCTOR',
+}
+
+
+def age_band(age):
+    if age is None:
+        return UNKNOWN
+    for lower, upper, label in AGE_BANDS:
+        if (lower is None or age >= lower) and (upper is None or age < upper):
+            return label
+    return UNKNOWN
+
+
+def map_education(text):
+    if not text:
+        return ''
+    for keyword, level in EDUCATION_MAP.items():
+        if keyword in text:
+            return level
+    return 'OTHER'
+
+
+def count_rows(rows):
+    counter = Counter()
+    for row in rows:
+        department = row['department']
+        for key in (
+            (department, 'total', ''),
+            (department, 'gender', row['gender'] or 'U'),
+            (department, 'age_band', age_band(row['age'])),
+            (department, 'education', map_education(row['highest_education'] or row['education_level']) or UNKNOWN),
+            (department, 'political_status', row['political_status'] or UNKNOWN),
+            (department, 'police_rank', row['police_rank'] or UNKNOWN),
+        ):
+            counter[key] += 1
+    return counter
+
+
+def build_statistics(apps, schema_editor):
+    """按已有花名册生成初始统计"""
+    PersonnelRoster = apps.get_model('cadres', 'PersonnelRoster')
+    RosterStatistic = apps.get_model('cadres', 'RosterStatistic')
+    counter = count_rows(PersonnelRoster.objects.values(*STAT_FIELDS).iterator(chunk_size=5000))
+    RosterStatistic.objects.bulk_create(
+        [
+            RosterStatistic(department=department, dimension=dimension, value=value, count=count)
+            for (department, dimension, value), count in counter.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(max_length=100, verbose_name='部门')),
+                ('dimension', models.CharField(max_length=30, verbose_name='统计维度')),
+                ('value', models.CharField(blank=True, max_length=50, verbose_name='取值')),
+                ('count', models.IntegerField(default=0, verbose_name='人数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '花名册统计',
+                'verbose_name_plural': '花名册统计',
+                'constraints': [models.UniqueConstraint(fields=('department', 'dimension', 'value'), name='unique_roster_statistic')],
+            },
+        ),
+        migrations.RunPython(build_statistics, migrations.RunPython.noop),
+    ]
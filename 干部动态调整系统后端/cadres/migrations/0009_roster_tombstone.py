@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0008_roster_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('roster_id', models.UUIDField(verbose_name='花名册ID')),
+                ('id_card', models.CharField(blank=True, max_length=18, verbose_name='身份证号')),
+                ('police_number', models.CharField(blank=True, max_length=20, verbose_name='警号')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='删除时间')),
+            ],
+            options={
+                'verbose_name': '花名册删除记录',
+                'verbose_name_plural': '花名册删除记录',
+            },
+        ),
+    ]
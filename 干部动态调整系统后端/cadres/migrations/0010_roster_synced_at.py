@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadres', '0009_roster_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='personnelroster',
+            name='synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='已同步版本'),
+        ),
+    ]
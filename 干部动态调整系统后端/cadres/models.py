@@ -1,8 +1,11 @@
 import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
 from orgs.models import OrgUnit
 
+from .pinyin import name_pinyin
+
 
 User = get_user_model()
 
@@ -62,6 +65,14 @@ class JobLevel(models.TextChoices):
     LEVEL_4_SUPERINTENDENT = '四级警长', '四级警长'
 
 
+def _fill_name_pinyin(instance, save_kwargs):
+    """保存前按姓名生成拼音字段；指定 update_fields 且包含姓名时一并更新"""
+    instance.name_pinyin, instance.name_initials = name_pinyin(instance.name)
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None and 'name' in update_fields:
+        save_kwargs['update_fields'] = {*update_fields, 'name_pinyin', 'name_initials'}
+
+
 class Cadre(models.Model):
     """干部主档 - 简化版"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -93,6 +104,12 @@ class Cadre(models.Model):
         db_index=True
     )
     tags = models.JSONField('标签', default=dict, blank=True)
+    # 与花名册对应的身份标识，花名册同步时据此匹配
+    id_card = models.CharField('身份证号', max_length=18, unique=True, null=True, blank=True)
+    police_number = models.CharField('警号', max_length=20, unique=True, null=True, blank=True)
+    # 姓名拼音，用于拼音/首字母检索（保存时生成；批量写入时由导入/同步流程填充）
+    name_pinyin = models.CharField('姓名全拼', max_length=200, blank=True, editable=False)
+    name_initials = models.CharField('姓名首字母', max_length=50, blank=True, editable=False)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
 
@@ -103,11 +120,26 @@ class Cadre(models.Model):
         indexes = [
             models.Index(fields=['status', 'education_level']),
             models.Index(fields=['position_start_date']),
+            # 与默认排序一致的游标分页索引（末尾为主键）
+            models.Index(name='cadre_keyset', fields=['status', '-position_start_date', 'name', 'id']),
+            # 检索索引（见 cadres/search.py）
+            GinIndex(
+                name='cadre_search_trgm',
+                fields=['name', 'cadre_code', 'name_pinyin'],
+                opclasses=['gin_trgm_ops'] * 3
+            ),
+            models.Index(name='cadre_name_prefix', fields=['name'], opclasses=['varchar_pattern_ops']),
+            models.Index(name='cadre_pinyin_prefix', fields=['name_pinyin'], opclasses=['varchar_pattern_ops']),
+            models.Index(name='cadre_initials_prefix', fields=['name_initials'], opclasses=['varchar_pattern_ops']),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.cadre_code})"
 
+    def save(self, *args, **kwargs):
+        _fill_name_pinyin(self, kwargs)
+        super().save(*args, **kwargs)
+
     @property
     def age(self):
         """计算年龄"""
@@ -271,9 +303,15 @@ class PersonnelRoster(models.Model):
     # 证书级别
     cert_level = models.CharField('证书级别', max_length=50, blank=True)
 
+    # 姓名拼音，用于拼音/首字母检索（保存时生成；批量写入时由导入/同步流程填充）
+    name_pinyin = models.CharField('姓名全拼', max_length=200, blank=True, editable=False)
+    name_initials = models.CharField('姓名首字母', max_length=50, blank=True, editable=False)
+
     # 系统字段
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
+    # 同步到干部主档时该行的 updated_at；与 updated_at 相同表示当前版本已同步（见 cadres/sync.py）
+    synced_at = models.DateTimeField('已同步版本', null=True, blank=True, editable=False)
     created_by = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -293,7 +331,145 @@ class PersonnelRoster(models.Model):
             models.Index(fields=['name']),
             models.Index(fields=['police_number']),
             models.Index(fields=['id_card']),
+            # 与默认排序一致的游标分页索引（末尾为主键）
+            models.Index(name='roster_keyset', fields=['serial_number', 'department', 'name', 'id']),
+            # 检索索引（见 cadres/search.py）
+            GinIndex(
+                name='roster_search_trgm',
+                fields=['name', 'department', 'police_number', 'id_card', 'name_pinyin'],
+                opclasses=['gin_trgm_ops'] * 5
+            ),
+            models.Index(name='roster_name_prefix', fields=['name'], opclasses=['varchar_pattern_ops']),
+            models.Index(name='roster_department_prefix', fields=['department'], opclasses=['varchar_pattern_ops']),
+            models.Index(name='roster_pinyin_prefix', fields=['name_pinyin'], opclasses=['varchar_pattern_ops']),
+            models.Index(name='roster_initials_prefix', fields=['name_initials'], opclasses=['varchar_pattern_ops']),
         ]
 
     def __str__(self):
         return f"{self.serial_number} - {self.name} ({self.department})"
+
+    def save(self, *args, **kwargs):
+        _fill_name_pinyin(self, kwargs)
+        super().save(*args, **kwargs)
+
+
+class ImportJobStatus(models.TextChoices):
+    PENDING = 'PENDING', '排队中'
+    RUNNING = 'RUNNING', '处理中'
+    SUCCEEDED = 'SUCCEEDED', '已完成'
+    FAILED = 'FAILED', '失败'
+
+
+class ImportMode(models.TextChoices):
+    INSERT = 'insert', '仅新增'
+    UPSERT = 'upsert', '新增或更新'
+
+
+class ImportJob(models.Model):
+    """数据导入任务 - 上传文件后由后台任务处理器异步导入"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField('导入文件', upload_to='imports/%Y/%m/', blank=True)
+    file_name = models.CharField('原始文件名', max_length=255)
+    status = models.CharField(
+        '状态',
+        max_length=20,
+        choices=ImportJobStatus.choices,
+        default=ImportJobStatus.PENDING,
+        db_index=True
+    )
+    mode = models.CharField('导入模式', max_length=10, choices=ImportMode.choices, default=ImportMode.INSERT)
+    dry_run = models.BooleanField('仅预检', default=False, help_text='只生成新增/更新/未变化/冲突报告，不写库')
+    total_rows = models.IntegerField('预计行数', null=True, blank=True)
+    processed_rows = models.IntegerField('已处理行数', default=0)
+    success_count = models.IntegerField('成功条数', default=0)
+    error_count = models.IntegerField('失败条数', default=0)
+    errors = models.JSONField('行错误', default=list, blank=True, help_text='[{row, name, error}, ...]，最多保留 IMPORT_JOB_MAX_ERRORS 条')
+    inserted_count = models.IntegerField('新增条数', default=0)
+    updated_count = models.IntegerField('更新条数', default=0)
+    unchanged_count = models.IntegerField('未变化条数', default=0)
+    conflict_count = models.IntegerField('冲突条数', default=0)
+    report = models.JSONField('比对报告', default=dict, blank=True, help_text='{inserted, updated, conflicts}，每类最多保留 1000 行')
+    message = models.TextField('结果说明', blank=True)
+    worker = models.CharField('处理进程', max_length=100, blank=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_jobs',
+        verbose_name='创建人'
+    )
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+    started_at = models.DateTimeField('开始时间', null=True, blank=True)
+    finished_at = models.DateTimeField('结束时间', null=True, blank=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '导入任务'
+        verbose_name_plural = '导入任务'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['created_by', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """处理进度（0-100）"""
+        if self.status == ImportJobStatus.SUCCEEDED:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+
+
+class SyncWatermark(models.Model):
+    """增量同步水位：记录已处理到的 (更新时间, ID) 位置"""
+    name = models.CharField('同步任务', max_length=50, unique=True)
+    watermark = models.DateTimeField('已同步到的更新时间', null=True, blank=True)
+    last_id = models.UUIDField('同一时间点已同步到的ID', null=True, blank=True)
+    synced_at = models.DateTimeField('最近同步时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '同步水位'
+        verbose_name_plural = '同步水位'
+
+    def __str__(self):
+        return f"{self.name} @ {self.watermark}"
+
+
+class RosterTombstone(models.Model):
+    """花名册删除记录：增量同步按水位读不到已删除的行，据此关闭对应干部的主归属"""
+    roster_id = models.UUIDField('花名册ID')
+    id_card = models.CharField('身份证号', max_length=18, blank=True)
+    police_number = models.CharField('警号', max_length=20, blank=True)
+    deleted_at = models.DateTimeField('删除时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '花名册删除记录'
+        verbose_name_plural = '花名册删除记录'
+
+    def __str__(self):
+        return f"{self.roster_id} 已删除"
+
+
+class RosterStatistic(models.Model):
+    """花名册统计 - 按部门预聚合的人数，随花名册增删改增量维护（见 cadres/statistics.py）"""
+    department = models.CharField('部门', max_length=100)
+    dimension = models.CharField('统计维度', max_length=30)
+    value = models.CharField('取值', max_length=50, blank=True)
+    count = models.IntegerField('人数', default=0)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name = '花名册统计'
+        verbose_name_plural = '花名册统计'
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'dimension', 'value'], name='unique_roster_statistic')
+        ]
+
+    def __str__(self):
+        return f"{self.department} {self.dimension}={self.value}: {self.count}"
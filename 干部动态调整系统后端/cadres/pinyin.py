@@ -0,0 +1,19 @@
+"""
+姓名拼音
+生成姓名的全拼与首字母（小写、无分隔），用于拼音/首字母检索。
+不依赖 Django，可在导入校验的子进程中使用
+"""
+
+from pypinyin import Style, lazy_pinyin
+
+
+def name_pinyin(name):
+    """
+    姓名 -> (全拼, 首字母)
+
+    例：'张三' -> ('zhangsan', 'zs')；非汉字部分原样保留（转小写）
+    """
+    if not name:
+        return '', ''
+    syllables = [syllable for syllable in lazy_pinyin(name, style=Style.NORMAL) if syllable.strip()]
+    return ''.join(syllables).lower(), ''.join(syllable[0] for syllable in syllables).lower()
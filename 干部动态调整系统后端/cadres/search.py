@@ -0,0 +1,112 @@
+"""
+花名册/干部检索
+PostgreSQL 上由 pg_trgm GIN 索引支撑 LIKE/ILIKE '%词%' 子串匹配，并按三元组相似度排序：
+    纯字母      只匹配姓名全拼/首字母（前缀匹配，3 个字母起另做全拼子串匹配），如 zs、zhangs、xiaoming
+    含字母      各字段 ILIKE 子串匹配（如身份证号尾号 001x）
+    其他        各字段 LIKE 子串匹配（汉字与数字不区分大小写）
+不足 3 个字符的检索词（如“小明”）无法利用三元组索引，仍做子串匹配，接受顺序扫描。
+
+Django 的 icontains 在 PostgreSQL 上生成 UPPER(字段) LIKE UPPER(...)，无法命中建在原字段上的索引，
+因此不区分大小写的匹配使用 ILIKE（见 ILikeContains）
+"""
+
+import re
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.db.models.lookups import IContains
+
+
+# 三元组索引可用的最短检索词长度
+MIN_TRIGRAM_LENGTH = 3
+
+LETTERS = re.compile(r'[A-Za-z]+')
+
+
+class ILikeContains(IContains):
+    """
+    不区分大小写的子串匹配
+
+    PostgreSQL 上生成 字段 ILIKE '%词%'，可命中 gin_trgm_ops 索引；其他数据库与 icontains 相同
+    """
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        # 不经过 process_lhs：其会按 icontains 的 lookup_cast 给字段套上 UPPER()
+        lhs_sql, lhs_params = compiler.compile(self.lhs)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs_sql} ILIKE {rhs_sql}', (*lhs_params, *rhs_params)
+
+
+class TrigramSearch:
+    """
+    检索后端
+
+    Args:
+        text_fields: 文本字段（姓名、部门等），参与子串匹配与相似度排序
+        code_fields: 编号字段（身份证号、警号、干部编号等），参与子串匹配，相似度按大写计算
+    """
+
+    def __init__(self, text_fields, code_fields):
+        self.text_fields = list(text_fields)
+        self.code_fields = list(code_fields)
+
+    def filter(self, queryset, term, rank=True):
+        """
+        按检索词过滤；rank 为 True 且数据库为 PostgreSQL 时按相关度排序
+
+        相关度相同时保持模型默认排序
+        """
+        term = (term or '').strip()
+        if not term:
+            return queryset
+
+        queryset = queryset.filter(self.condition(term))
+        if rank and connections[queryset.db].vendor == 'postgresql':
+            queryset = queryset.annotate(search_rank=self.similarity(term)).order_by(
+                '-search_rank', *queryset.model._meta.ordering
+            )
+        return queryset
+
+    def condition(self, term):
+        """检索条件"""
+        if LETTERS.fullmatch(term):
+            # 拼音列保存为小写，前缀/子串匹配分别命中 varchar_pattern_ops 与三元组索引
+            letters = term.lower()
+            condition = Q(name_pinyin__startswith=letters) | Q(name_initials__startswith=letters)
+            if len(letters) >= MIN_TRIGRAM_LENGTH:
+                condition |= Q(name_pinyin__contains=letters)
+            return condition
+        return self._match(self.text_fields + self.code_fields, term)
+
+    def similarity(self, term):
+        """相关度：各字段三元组相似度的最大值（0~1）"""
+        if LETTERS.fullmatch(term):
+            expressions = [
+                TrigramSimilarity('name_pinyin', term.lower()),
+                TrigramSimilarity('name_initials', term.lower()),
+            ]
+        else:
+            expressions = [TrigramSimilarity(field, term) for field in self.text_fields]
+            expressions += [TrigramSimilarity(field, term.upper()) for field in self.code_fields]
+        return Greatest(*expressions)
+
+    @staticmethod
+    def _match(fields, term):
+        """各字段子串匹配：含字母时用 ILIKE 不区分大小写"""
+        condition = Q()
+        for field in fields:
+            if LETTERS.search(term):
+                condition |= Q(ILikeContains(F(field), term))
+            else:
+                condition |= Q(**{f'{field}__contains': term})
+        return condition
+
+
+roster_search = TrigramSearch(text_fields=['name', 'department'], code_fields=['police_number', 'id_card'])
+
+cadre_search = TrigramSearch(text_fields=['name'], code_fields=['cadre_code'])
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import PersonnelRoster, Cadre, CadreResume
+from .models import PersonnelRoster, Cadre, CadreResume, ImportJob
 
 
 class PersonnelRosterSerializer(serializers.ModelSerializer):
@@ -63,3 +63,30 @@ class CadreResumeSerializer(serializers.ModelSerializer):
         model = CadreResume
         fields = '__all__'
         read_only_fields = ['id', 'created_at']
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """导入任务序列化器（供上传后轮询进度）"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+    total = serializers.IntegerField(source='processed_rows', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'file_name', 'mode', 'dry_run', 'status', 'status_display', 'progress',
+            'total_rows', 'processed_rows', 'total', 'success_count', 'inserted_count',
+            'updated_count', 'unchanged_count', 'conflict_count', 'error_count',
+            'errors', 'report', 'message', 'created_by', 'created_by_name',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class ImportJobListSerializer(ImportJobSerializer):
+    """导入任务列表序列化器（不含行错误和比对明细）"""
+
+    class Meta(ImportJobSerializer.Meta):
+        fields = [field for field in ImportJobSerializer.Meta.fields if field not in ('errors', 'report')]
+        read_only_fields = fields
@@ -0,0 +1,51 @@
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .jobs import start_in_process_worker
+from .models import PersonnelRoster, RosterTombstone
+from .statistics import STAT_FIELDS, apply_deltas, row_delta, stat_values
+
+
+@receiver(pre_save, sender=PersonnelRoster)
+def remember_roster_statistics(sender, instance, update_fields=None, **kwargs):
+    """修改前记录原统计字段，保存后据此计算差值"""
+    instance._stat_before = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(STAT_FIELDS):
+        instance._stat_before = stat_values(instance)
+        return
+    instance._stat_before = (
+        PersonnelRoster.objects.filter(pk=instance.pk).values(*STAT_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=PersonnelRoster)
+def update_roster_statistics(sender, instance, created, **kwargs):
+    """花名册新增/修改后增量更新统计"""
+    before = None if created else getattr(instance, '_stat_before', None)
+    apply_deltas(row_delta(before, stat_values(instance)))
+
+
+@receiver(post_delete, sender=PersonnelRoster)
+def remove_roster_statistics(sender, instance, **kwargs):
+    """花名册删除后从统计中扣除"""
+    apply_deltas(row_delta(stat_values(instance), None))
+
+
+@receiver(post_delete, sender=PersonnelRoster)
+def record_roster_tombstone(sender, instance, **kwargs):
+    """记录花名册删除，下次同步时关闭对应干部的主归属（见 cadres/sync.py）"""
+    if instance.id_card or instance.police_number:
+        RosterTombstone.objects.create(
+            roster_id=instance.pk,
+            id_card=instance.id_card or '',
+            police_number=instance.police_number or ''
+        )
+
+
+@receiver(request_started)
+def start_import_worker(sender, **kwargs):
+    """Web 进程处理首个请求时启动进程内导入处理器"""
+    start_in_process_worker()
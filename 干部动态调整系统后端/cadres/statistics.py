@@ -0,0 +1,205 @@
+"""
+花名册统计
+按 (部门, 统计维度, 取值) 预聚合人数存于 RosterStatistic，花名册变化时只累加差值：
+    单条增删改    post_save / post_delete 信号（见 cadres/signals.py）
+    批量导入      导入器按块汇总差值后一次写入
+统计接口从缓存读取，缓存按统计版本号失效，版本号存于数据库（见 orgs/versions.py），在差值写入的事务提交后递增。
+rebuild_roster_statistics 命令可按花名册全量重建（用于校准）
+"""
+
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from orgs.versions import bump_version, get_version
+
+from .models import Gender, PersonnelRoster, RosterStatistic
+from .sync import map_education
+
+
+STATS_VERSION_NAME = 'cadres.roster-stats'
+STATS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 计算统计所需的花名册字段
+STAT_FIELDS = [
+    'department', 'gender', 'age', 'highest_education', 'education_level', 'political_status', 'police_rank'
+]
+
+# 统计维度（total 为部门人数）
+DIMENSIONS = ['gender', 'age_band', 'education', 'political_status', 'police_rank']
+
+# 年龄段：(下限, 上限, 名称)，左闭右开
+AGE_BANDS = [
+    (None, 30, '30岁以下'),
+    (30, 40, '30-39岁'),
+    (40, 50, '40-49岁'),
+    (50, 55, '50-54岁'),
+    (55, None, '55岁及以上'),
+]
+UNKNOWN = '未知'
+
+
+def age_band(age):
+    """年龄 -> 年龄段（按花名册中登记的年龄，与写入时保持一致）"""
+    if age is None:
+        return UNKNOWN
+    for lower, upper, label in AGE_BANDS:
+        if (lower is None or age >= lower) and (upper is None or age < upper):
+            return label
+    return UNKNOWN
+
+
+def stat_keys(row):
+    """
+    一行花名册计入的统计键
+
+    Args:
+        row: 含 STAT_FIELDS 的字典
+    """
+    department = row['department']
+    return [
+        (department, 'total', ''),
+        (department, 'gender', row['gender'] or Gender.UNKNOWN),
+        (department, 'age_band', age_band(row['age'])),
+        (department, 'education', map_education(row['highest_education'] or row['education_level']) or UNKNOWN),
+        (department, 'political_status', row['political_status'] or UNKNOWN),
+        (department, 'police_rank', row['police_rank'] or UNKNOWN),
+    ]
+
+
+def count_rows(rows, sign=1):
+    """汇总多行的统计键计数（sign=-1 表示移除）"""
+    counter = Counter()
+    for row in rows:
+        for key in stat_keys(row):
+            counter[key] += sign
+    return counter
+
+
+def row_delta(before, after):
+    """一行由 before 变为 after 的统计差值（新增时 before 为 None，删除时 after 为 None）"""
+    delta = Counter()
+    if before is not None:
+        delta.update(count_rows([before], sign=-1))
+    if after is not None:
+        delta.update(count_rows([after]))
+    return delta
+
+
+def stat_values(instance):
+    """模型实例 -> 统计字段字典"""
+    return {field: getattr(instance, field) for field in STAT_FIELDS}
+
+
+def apply_deltas(deltas):
+    """
+    累加统计差值
+
+    先以 ignore_conflicts 补齐缺失的统计行，再按主键顺序加行锁累加，
+    并发导入/编辑不会丢失更新，也不会因加锁顺序不同而死锁
+    """
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        RosterStatistic.objects.bulk_create(
+            [
+                RosterStatistic(department=department, dimension=dimension, value=value, count=0)
+                for department, dimension, value in deltas
+            ],
+            batch_size=500,
+            ignore_conflicts=True
+        )
+        rows = RosterStatistic.objects.select_for_update().filter(
+            department__in={department for department, _, _ in deltas}
+        ).order_by('id')
+
+        now = timezone.now()
+        changed = []
+        for row in rows:
+            delta = deltas.get((row.department, row.dimension, row.value))
+            if delta:
+                row.count += delta
+                row.updated_at = now
+                changed.append(row)
+        RosterStatistic.objects.bulk_update(changed, ['count', 'updated_at'], batch_size=500)
+        transaction.on_commit(bump_statistics_version)
+
+
+def rebuild_statistics():
+    """
+    按花名册全量重建统计
+
+    Returns:
+        花名册总人数
+    """
+    counter = count_rows(PersonnelRoster.objects.values(*STAT_FIELDS).iterator(chunk_size=5000))
+    with transaction.atomic():
+        RosterStatistic.objects.all().delete()
+        RosterStatistic.objects.bulk_create(
+            [
+                RosterStatistic(department=department, dimension=dimension, value=value, count=count)
+                for (department, dimension, value), count in counter.items()
+            ],
+            batch_size=500
+        )
+        transaction.on_commit(bump_statistics_version)
+    return sum(count for (_, dimension, _), count in counter.items() if dimension == 'total')
+
+
+def get_statistics_version():
+    """获取统计版本号"""
+    return get_version(STATS_VERSION_NAME)
+
+
+def bump_statistics_version():
+    """递增统计版本号，使已缓存的统计结果失效"""
+    bump_version(STATS_VERSION_NAME)
+
+
+def get_statistics():
+    """
+    花名册统计（按统计版本号缓存）
+
+    Returns:
+        {
+            total, departments, gender_stats,            # 与原统计接口一致
+            dimensions: {维度: {取值: 人数}},              # 全部部门合计
+            by_department: [{department, total, 维度: {取值: 人数}}, ...]
+        }
+    """
+    key = f'cadres:roster-stats:{get_statistics_version()}'
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    dimensions = {dimension: Counter() for dimension in DIMENSIONS}
+    departments = {}
+    for department, dimension, value, count in RosterStatistic.objects.filter(count__gt=0).order_by(
+        'department', 'dimension', 'value'
+    ).values_list('department', 'dimension', 'value', 'count'):
+        entry = departments.setdefault(department, {
+            'department': department,
+            'total': 0,
+            **{name: {} for name in DIMENSIONS},
+        })
+        if dimension == 'total':
+            entry['total'] = count
+        elif dimension in dimensions:
+            entry[dimension][value] = count
+            dimensions[dimension][value] += count
+
+    result = {
+        'total': sum(entry['total'] for entry in departments.values()),
+        'departments': len(departments),
+        'gender_stats': [
+            {'gender': gender, 'count': count} for gender, count in sorted(dimensions['gender'].items())
+        ],
+        'dimensions': {name: dict(counter) for name, counter in dimensions.items()},
+        'by_department': list(departments.values()),
+    }
+    cache.set(key, result, STATS_CACHE_TIMEOUT)
+    return result
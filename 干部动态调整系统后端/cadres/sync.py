@@ -0,0 +1,326 @@
+"""
+花名册 -> 干部主档同步
+按 (updated_at, id) 水位只处理上次同步后变化的花名册行：
+    1. 以身份证号/警号匹配或新建 Cadre，仅写入有变化的字段
+    2. 部门名称经组织单元名称索引解析为 OrgUnit
+    3. 主归属单位变化时批量关闭旧的 OrgMembership 并新建
+每批数据与水位在同一事务内提交，中断后可从水位处继续。
+
+updated_at 由应用在提交前写入，晚提交的事务可能带着早于水位的时间，
+因此每次从 水位 - ROSTER_SYNC_OVERLAP 处重读；同步后在花名册行上记下已同步的版本（synced_at），
+重读窗口内当前版本已同步的行直接跳过，不会每次重复写入；
+已删除的花名册行由 RosterTombstone 记录，同步时关闭对应干部的主归属
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from orgs.tree import get_unit_name_index, normalize_unit_name
+from staffing.models import MembershipStatus, OrgMembership
+
+from .models import Cadre, EducationLevel, PersonnelRoster, RosterTombstone, SyncWatermark
+
+
+SYNC_NAME = 'roster_to_cadre'
+BATCH_SIZE = 1000
+# 标记已同步版本时每条 UPDATE 的行数（条件为逐行的 (id, updated_at)，避免条件表达式过长）
+MARK_BATCH_SIZE = 100
+# 水位回退重读的时间窗口，应大于花名册写入事务的最长时长
+DEFAULT_OVERLAP = timedelta(minutes=10)
+
+# 每批同步写入后（事务内）发送；批量写入不触发模型信号，依赖干部/归属的模块据此更新
+# 参数：cadre_ids 信息有变化的已有干部ID，unit_ids 归属有变化的单元ID（含原单元与新单元）
+roster_synced = Signal()
+
+EDUCATION_MAP = {
+    '中专': EducationLevel.MIDDLE_SCHOOL,
+    '大专': EducationLevel.COLLEGE,
+    '本科': EducationLevel.BACHELOR,
+    '大学': EducationLevel.BACHELOR,
+    '硕士': EducationLevel.MASTER,
+    '研究生': EducationLevel.MASTER,
+    '博士': EducationLevel.DOCTOR,
+}
+
+ROSTER_FIELDS = [
+    'id', 'updated_at', 'id_card', 'police_number', 'name', 'name_pinyin', 'name_initials', 'gender', 'birth_date', 'native_place',
+    'ethnicity', 'political_status', 'highest_education', 'education_level', 'highest_degree',
+    'join_work_date', 'enter_unit_date', 'position', 'police_rank', 'current_position_date', 'department',
+]
+
+
+def map_education(text):
+    """将花名册中的学历文字归入学历层次"""
+    if not text:
+        return ''
+    for keyword, level in EDUCATION_MAP.items():
+        if keyword in text:
+            return level
+    return EducationLevel.OTHER
+
+
+def roster_to_cadre_values(row):
+    """花名册行 -> 干部主档字段"""
+    return {
+        'id_card': row['id_card'],
+        'police_number': row['police_number'],
+        'name': row['name'],
+        'name_pinyin': row['name_pinyin'],
+        'name_initials': row['name_initials'],
+        'gender': row['gender'],
+        'birth_date': row['birth_date'],
+        'native_place': row['native_place'],
+        'ethnicity': row['ethnicity'],
+        'political_status': row['political_status'],
+        'education_level': map_education(row['highest_education'] or row['education_level']),
+        'degree': row['highest_degree'],
+        'join_work_date': row['join_work_date'],
+        'hire_date': row['enter_unit_date'],
+        'current_position': row['position'],
+        'current_rank': row['police_rank'],
+        'position_start_date': row['current_position_date'],
+    }
+
+
+class RosterSync:
+    """花名册增量同步"""
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = {
+            'processed': 0,
+            'created': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'skipped': 0,
+            'memberships_opened': 0,
+            'memberships_closed': 0,
+            'deleted': 0,
+        }
+        self.unresolved_departments = set()
+
+    def run(self, full=False):
+        """
+        执行同步
+
+        Args:
+            full: 忽略水位，重新同步全部花名册
+
+        Returns:
+            统计信息字典
+        """
+        state, _ = SyncWatermark.objects.get_or_create(name=SYNC_NAME)
+        queryset = PersonnelRoster.objects.order_by('updated_at', 'id')
+        if state.watermark is not None and not full:
+            overlap = getattr(settings, 'ROSTER_SYNC_OVERLAP', DEFAULT_OVERLAP)
+            queryset = queryset.filter(updated_at__gte=state.watermark - overlap).exclude(
+                synced_at=F('updated_at')
+            )
+
+        position = None
+        while True:
+            batch = queryset
+            if position is not None:
+                batch = batch.filter(
+                    Q(updated_at__gt=position[0]) |
+                    Q(updated_at=position[0], id__gt=position[1])
+                )
+            rows = list(batch.values(*ROSTER_FIELDS)[:self.batch_size])
+            if not rows:
+                break
+
+            with transaction.atomic():
+                self.sync_batch(rows)
+                self.mark_synced(rows)
+                position = rows[-1]['updated_at'], rows[-1]['id']
+                state.watermark, state.last_id = position
+                state.save(update_fields=['watermark', 'last_id', 'synced_at'])
+
+            if len(rows) < self.batch_size:
+                break
+
+        with transaction.atomic():
+            self.sync_deletions()
+
+        return {**self.stats, 'unresolved_departments': sorted(self.unresolved_departments)}
+
+    def sync_batch(self, rows):
+        """同步一批花名册行"""
+        self.stats['processed'] += len(rows)
+        cadres, changed_ids = self._upsert_cadres(rows)
+        unit_ids = self._sync_memberships([row for row in rows if row['id'] in cadres], cadres)
+        roster_synced.send(sender=self.__class__, cadre_ids=changed_ids, unit_ids=unit_ids)
+
+    def mark_synced(self, rows):
+        """
+        记录各行已同步的版本
+
+        条件带上读取时的 updated_at：同步期间又被修改的行不匹配，下次同步时重新处理
+        """
+        for start in range(0, len(rows), MARK_BATCH_SIZE):
+            condition = Q()
+            for row in rows[start:start + MARK_BATCH_SIZE]:
+                condition |= Q(pk=row['id'], updated_at=row['updated_at'])
+            PersonnelRoster.objects.filter(condition).update(synced_at=F('updated_at'))
+
+    def sync_deletions(self):
+        """
+        处理花名册删除记录：关闭对应干部的在职主归属
+
+        身份证号/警号仍存在于花名册中（删除后重新录入）的记录只清除，不关闭归属
+        """
+        tombstones = list(RosterTombstone.objects.select_for_update(skip_locked=True).order_by('id'))
+        if not tombstones:
+            return
+
+        id_cards = {tombstone.id_card for tombstone in tombstones if tombstone.id_card}
+        police_numbers = {tombstone.police_number for tombstone in tombstones if tombstone.police_number}
+        present = PersonnelRoster.objects.filter(Q(id_card__in=id_cards) | Q(police_number__in=police_numbers))
+        for id_card, police_number in present.values_list('id_card', 'police_number'):
+            id_cards.discard(id_card)
+            police_numbers.discard(police_number)
+
+        memberships = list(OrgMembership.objects.filter(
+            Q(cadre__id_card__in=id_cards) | Q(cadre__police_number__in=police_numbers),
+            is_primary=True,
+            status=MembershipStatus.ACTIVE
+        ))
+        now = timezone.now()
+        today = timezone.localdate()
+        for membership in memberships:
+            membership.status = MembershipStatus.INACTIVE
+            membership.end_date = today
+            membership.updated_at = now
+        OrgMembership.objects.bulk_update(memberships, ['status', 'end_date', 'updated_at'], batch_size=500)
+        RosterTombstone.objects.filter(id__in=[tombstone.id for tombstone in tombstones]).delete()
+
+        self.stats['deleted'] += len(tombstones)
+        self.stats['memberships_closed'] += len(memberships)
+        if memberships:
+            roster_synced.send(
+                sender=self.__class__,
+                cadre_ids=set(),
+                unit_ids={membership.org_unit_id for membership in memberships}
+            )
+
+    def _upsert_cadres(self, rows):
+        """
+        匹配或新建干部主档（依次按身份证号、警号、干部编号匹配）
+
+        Returns:
+            ({花名册ID: Cadre}，不含无法对应的行; 有变化的已有干部ID集合)
+        """
+        codes = {key for row in rows for key in (row['id_card'], row['police_number']) if key}
+        existing = list(Cadre.objects.filter(
+            Q(id_card__in=codes) | Q(police_number__in=codes) | Q(cadre_code__in=codes)
+        ))
+        lookups = {
+            field: {getattr(cadre, field): cadre for cadre in existing if getattr(cadre, field)}
+            for field in ('id_card', 'police_number', 'cadre_code')
+        }
+
+        now = timezone.now()
+        result, to_create, to_update, changed_fields = {}, [], {}, set()
+        for row in rows:
+            # 无身份证号和警号的行无法与干部主档对应
+            if not (row['id_card'] or row['police_number']):
+                self.stats['skipped'] += 1
+                continue
+
+            candidates = {
+                cadre.pk: cadre for cadre in (
+                    lookups['id_card'].get(row['id_card']),
+                    lookups['police_number'].get(row['police_number']),
+                    lookups['cadre_code'].get(row['police_number'] or row['id_card']),
+                ) if cadre is not None
+            }
+            if len(candidates) > 1:
+                # 身份证号与警号分别对应不同干部，需人工处理
+                self.stats['skipped'] += 1
+                continue
+
+            values = roster_to_cadre_values(row)
+            if not candidates:
+                cadre = Cadre(cadre_code=row['police_number'] or row['id_card'], **values)
+                to_create.append(cadre)
+                for field in lookups:
+                    if getattr(cadre, field):
+                        lookups[field][getattr(cadre, field)] = cadre
+            else:
+                cadre = next(iter(candidates.values()))
+                fields = [field for field, value in values.items() if getattr(cadre, field) != value]
+                if fields:
+                    for field in fields:
+                        setattr(cadre, field, values[field])
+                    cadre.updated_at = now
+                    changed_fields.update(fields)
+                    if not cadre._state.adding:
+                        to_update[cadre.pk] = cadre
+                else:
+                    self.stats['unchanged'] += 1
+            result[row['id']] = cadre
+
+        Cadre.objects.bulk_create(to_create, batch_size=500)
+        if to_update:
+            Cadre.objects.bulk_update(to_update.values(), sorted(changed_fields) + ['updated_at'], batch_size=500)
+
+        self.stats['created'] += len(to_create)
+        self.stats['updated'] += len(to_update)
+        return result, set(to_update)
+
+    def _sync_memberships(self, rows, cadres):
+        """
+        按花名册部门批量调整主归属
+
+        Returns:
+            归属有变化的单元ID集合（含原单元与新单元）
+        """
+        index = get_unit_name_index()
+        target_units = {}
+        for row in rows:
+            unit_id = index.get(normalize_unit_name(row['department']))
+            if unit_id is None:
+                if row['department']:
+                    self.unresolved_departments.add(row['department'])
+                continue
+            target_units[cadres[row['id']].pk] = unit_id
+
+        current = {
+            membership.cadre_id: membership
+            for membership in OrgMembership.objects.filter(
+                cadre_id__in=target_units,
+                is_primary=True,
+                status=MembershipStatus.ACTIVE
+            )
+        }
+
+        now = timezone.now()
+        today = timezone.localdate()
+        to_close, to_open = [], []
+        for cadre_id, unit_id in target_units.items():
+            membership = current.get(cadre_id)
+            if membership is not None and membership.org_unit_id == unit_id:
+                continue
+            if membership is not None:
+                membership.status = MembershipStatus.INACTIVE
+                membership.end_date = today
+                membership.updated_at = now
+                to_close.append(membership)
+            to_open.append(OrgMembership(cadre_id=cadre_id, org_unit_id=unit_id, is_primary=True, start_date=today))
+
+        # 先关闭旧归属再新建，满足“唯一主归属”约束
+        OrgMembership.objects.bulk_update(to_close, ['status', 'end_date', 'updated_at'], batch_size=500)
+        OrgMembership.objects.bulk_create(to_open, batch_size=500)
+        self.stats['memberships_closed'] += len(to_close)
+        self.stats['memberships_opened'] += len(to_open)
+        return {membership.org_unit_id for membership in to_close + to_open}
+
+
+def sync_roster_to_cadres(full=False):
+    """执行花名册 -> 干部主档增量同步"""
+    return RosterSync().run(full=full)
@@ -1,3 +1,322 @@
-from django.test import TestCase
+import io
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from orgs.models import CacheVersion, OrgUnit, UnitType
+from staffing.models import MembershipStatus, OrgMembership
+
+from . import jobs
+from .exporter import ROSTER_EXPORT_COLUMNS, export_roster, stream_xlsx
+from .importer import RosterImporter
+from .models import (
+    Cadre, EducationLevel, Gender, ImportJob, ImportJobStatus, ImportMode, PersonnelRoster, RosterStatistic,
+    RosterTombstone, SyncWatermark,
+)
+from .search import cadre_search, roster_search
+from .statistics import STATS_VERSION_NAME, get_statistics, rebuild_statistics
+from .sync import SYNC_NAME, RosterSync
+
+
+ID_CARD_WEIGHTS = [7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2]
+
+
+def id_card(body):
+    """17 位本体 + 校验位"""
+    return body + '10X98765432'[sum(int(digit) * weight for digit, weight in zip(body, ID_CARD_WEIGHTS)) % 11]
+
+
+def make_roster(name, department='一科', **kwargs):
+    serial_number = PersonnelRoster.objects.count() + 1
+    return PersonnelRoster.objects.create(
+        serial_number=serial_number, name=name, department=department, gender=Gender.MALE, **kwargs
+    )
+
+
+def statistics():
+    return {
+        (row.department, row.dimension, row.value): row.count
+        for row in RosterStatistic.objects.filter(count__gt=0)
+    }
+
+
+def roster_workbook(rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['序号*', '姓名*', '部门*', '性别*', '年龄*', '最高学历*', '身份证号*', '警号*'])
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile('roster.xlsx', buffer.getvalue())
+
+
+class RosterImporterTests(TestCase):
+    """花名册导入"""
+
+    def setUp(self):
+        self.zhang = id_card('11010519800101001')
+        self.li = id_card('11010519900101002')
+        RosterImporter().import_file(roster_workbook([
+            [1, '张三', '一科', '男', 45, '本科', self.zhang, '1001'],
+            [2, '李四', '二科', '女', 35, '硕士', self.li, '1002'],
+        ]))
+
+    def test_insert_rejects_existing_and_invalid_rows(self):
+        importer = RosterImporter()
+        summary = importer.import_file(roster_workbook([
+            [3, '张三', '一科', '男', 45, '本科', self.zhang, '2001'],
+            # 校验位错误
+            [4, '王五', '一科', '男', 30, '本科', id_card('11010519900101001')[:-1] + '1', '2002'],
+        ]))
+        self.assertEqual(summary['error_count'], 2)
+        self.assertEqual(PersonnelRoster.objects.count(), 2)
+
+    def test_counts_only_rows_actually_inserted(self):
+        # 模拟比对之后张三被并发写入：比对时看不到已有记录
+        with mock.patch.object(RosterImporter, 'match_existing', return_value=({}, {})):
+            summary = RosterImporter().import_file(roster_workbook([
+                [3, '张三', '一科', '男', 45, '本科', self.zhang, '1001'],
+                [4, '王五', '一科', '男', 30, '本科', id_card('11010519950101003'), '1003'],
+            ]))
+
+        self.assertEqual((summary['inserted_count'], summary['error_count']), (1, 1))
+        self.assertEqual(PersonnelRoster.objects.count(), 3)
+        self.assertEqual(statistics()[('一科', 'total', '')], 2)
+
+    def test_upsert_dry_run_reports_without_writing(self):
+        summary = RosterImporter(mode=ImportMode.UPSERT, dry_run=True).import_file(roster_workbook([
+            [None, '张三', '三科', '男', 45, '本科', self.zhang, '1001'],
+            [None, '李四', '二科', '女', 35, '硕士', self.li, '1002'],
+            [None, '王五', '一科', '男', 30, '本科', id_card('11010519950101003'), '1003'],
+        ]))
+
+        self.assertEqual(
+            (summary['inserted_count'], summary['updated_count'], summary['unchanged_count']), (1, 1, 1)
+        )
+        self.assertEqual(PersonnelRoster.objects.count(), 2)
+        self.assertEqual(PersonnelRoster.objects.get(id_card=self.zhang).department, '一科')
+
+    def test_upsert_updates_changed_rows_and_statistics(self):
+        RosterImporter(mode=ImportMode.UPSERT).import_file(roster_workbook([
+            [None, '张三', '三科', '男', 45, '本科', self.zhang, '1001'],
+        ]))
+
+        roster = PersonnelRoster.objects.get(id_card=self.zhang)
+        self.assertEqual((roster.department, roster.serial_number), ('三科', 1))
+        self.assertEqual(statistics()[('三科', 'total', '')], 1)
+        self.assertNotIn(('一科', 'total', ''), statistics())
+
+
+class InProcessWorkerTests(TestCase):
+    """进程内导入处理器启动"""
+
+    def setUp(self):
+        jobs._started_pid = None
+        self.addCleanup(setattr, jobs, '_started_pid', None)
+
+    @override_settings(IMPORT_JOBS_RUN_IN_PROCESS=True)
+    def test_first_request_starts_worker_once(self):
+        with mock.patch.object(jobs, '_get_executor') as executor, self.assertLogs('django.request', 'WARNING'):
+            self.client.get('/api/cadres/')
+            self.client.get('/api/cadres/')
+        executor.return_value.submit.assert_called_once_with(jobs._process_in_thread)
+
+    def test_worker_fails_stale_jobs_before_processing_pending(self):
+        stale = ImportJob.objects.create(file_name='a.xlsx', status=ImportJobStatus.RUNNING)
+        ImportJob.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        # 测试在事务中运行，处理线程不能关闭数据库连接
+        with mock.patch.object(jobs, 'close_old_connections'), \
+                mock.patch.object(jobs, 'process_pending_jobs') as process:
+            jobs._process_in_thread()
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJobStatus.FAILED)
+        process.assert_called_once_with()
+
+
+class RosterStatisticsTests(TestCase):
+    """花名册统计增量维护"""
+
+    def test_signals_match_rebuild(self):
+        zhang = make_roster('张三', age=28, highest_education='本科')
+        li = make_roster('李四', department='二科', age=52, highest_education='硕士')
+        make_roster('王五', age=41)
+
+        zhang.department = '二科'
+        zhang.age = 31
+        zhang.save()
+        li.delete()
+
+        incremental = statistics()
+        self.assertEqual(incremental[('二科', 'age_band', '30-39岁')], 1)
+        self.assertEqual(incremental[('一科', 'education', '未知')], 1)
+        self.assertNotIn(('二科', 'education', EducationLevel.MASTER), incremental)
+
+        self.assertEqual(rebuild_statistics(), 2)
+        self.assertEqual(statistics(), incremental)
+
+    def test_cached_result_follows_database_version(self):
+        cache.clear()
+        make_roster('张三')
+        self.assertEqual(get_statistics()['total'], 1)
+
+        # 模拟其他进程写入差值并递增版本号：版本号存于数据库，本进程的本地缓存随即不再命中
+        make_roster('李四')
+        self.assertEqual(get_statistics()['total'], 1)
+        CacheVersion.objects.filter(name=STATS_VERSION_NAME).update(version=F('version') + 1)
+        self.assertEqual(get_statistics()['total'], 2)
+
+
+class RosterSyncTests(TestCase):
+    """花名册 -> 干部主档同步"""
+
+    def setUp(self):
+        cache.clear()
+        self.first = OrgUnit.objects.create(name='一科', unit_type=UnitType.DEPARTMENT)
+        self.second = OrgUnit.objects.create(name='二科', unit_type=UnitType.DEPARTMENT)
+        self.roster = make_roster('张三', id_card=id_card('11010519800101001'), highest_education='大学本科')
+
+    def primary(self, cadre):
+        return OrgMembership.objects.filter(cadre=cadre, is_primary=True, status=MembershipStatus.ACTIVE).first()
+
+    def test_creates_cadre_and_membership(self):
+        stats = RosterSync().run()
+
+        cadre = Cadre.objects.get(id_card=self.roster.id_card)
+        self.assertEqual((stats['created'], stats['memberships_opened']), (1, 1))
+        self.assertEqual(cadre.education_level, EducationLevel.BACHELOR)
+        self.assertEqual(self.primary(cadre).org_unit, self.first)
+        self.assertEqual(SyncWatermark.objects.get(name=SYNC_NAME).watermark, self.roster.updated_at)
+
+        self.roster.department = '二科'
+        self.roster.save()
+        stats = RosterSync().run()
+        self.assertEqual((stats['updated'], stats['memberships_closed']), (0, 1))
+        self.assertEqual(self.primary(cadre).org_unit, self.second)
+
+    def test_rereads_rows_committed_behind_watermark(self):
+        RosterSync().run()
+        watermark = SyncWatermark.objects.get(name=SYNC_NAME).watermark
+
+        # 晚提交的事务带着早于水位的时间
+        late = make_roster('李四', id_card=id_card('11010519900101002'))
+        PersonnelRoster.objects.filter(pk=late.pk).update(updated_at=watermark - timedelta(minutes=1))
+
+        with override_settings(ROSTER_SYNC_OVERLAP=timedelta(0)):
+            self.assertEqual(RosterSync().run()['created'], 0)
+        stats = RosterSync().run()
+        # 回退窗口内已同步的张三不再重读
+        self.assertEqual((stats['processed'], stats['created']), (1, 1))
+        self.assertEqual(RosterSync().run()['processed'], 0)
+
+    def test_row_changed_after_sync_is_reread(self):
+        RosterSync().run()
+        self.roster.refresh_from_db()
+        self.assertEqual(self.roster.synced_at, self.roster.updated_at)
+
+        self.roster.department = '二科'
+        self.roster.save()
+        self.assertEqual(RosterSync().run()['processed'], 1)
+
+    def test_deleted_rows_close_primary_membership(self):
+        RosterSync().run()
+        cadre = Cadre.objects.get(id_card=self.roster.id_card)
+        self.roster.delete()
+        self.assertEqual(RosterTombstone.objects.count(), 1)
+
+        stats = RosterSync().run()
+        self.assertEqual((stats['deleted'], stats['memberships_closed']), (1, 1))
+        self.assertIsNone(self.primary(cadre))
+        self.assertFalse(RosterTombstone.objects.exists())
+
+    def test_reentered_row_keeps_membership(self):
+        RosterSync().run()
+        cadre = Cadre.objects.get(id_card=self.roster.id_card)
+        self.roster.delete()
+        make_roster('张三', id_card=cadre.id_card)
+
+        self.assertEqual(RosterSync().run()['memberships_closed'], 0)
+        self.assertEqual(self.primary(cadre).org_unit, self.first)
+
+
+class SearchTests(TestCase):
+    """花名册/干部检索"""
+
+    def setUp(self):
+        self.wang = make_roster('王小明', police_number='1234567', id_card=id_card('11010519800101001'))
+        self.zhang = make_roster('张三', department='二科', police_number='7654321')
+        Cadre.objects.create(cadre_code='C001', name='王小明')
+
+    def search(self, term):
+        return set(roster_search.filter(PersonnelRoster.objects.all(), term).values_list('name', flat=True))
+
+    def test_short_terms_match_substrings(self):
+        self.assertEqual(self.search('小明'), {'王小明'})
+        self.assertEqual(self.search('明'), {'王小明'})
+        self.assertEqual(self.search('二科'), {'张三'})
+        self.assertEqual(self.search('56'), {'王小明'})
+
+    def test_letters_match_pinyin_and_codes(self):
+        self.assertEqual(self.search('wxm'), {'王小明'})
+        self.assertEqual(self.search('wangx'), {'王小明'})
+        self.assertEqual(self.search('xiaoming'), {'王小明'})
+        self.assertEqual(self.search(self.wang.id_card[-4:].lower()), {'王小明'})
+        self.assertEqual(self.search('zs'), {'张三'})
+
+    def test_pure_letters_match_pinyin_only(self):
+        make_roster('李四', department='IT科')
+        self.assertEqual(self.search('it'), set())
+        self.assertEqual(self.search('IT科'), {'李四'})
+        self.assertEqual(self.search('ls'), {'李四'})
+
+    def test_cadre_search(self):
+        queryset = Cadre.objects.all()
+        self.assertEqual(cadre_search.filter(queryset, 'c00').count(), 1)
+        self.assertEqual(cadre_search.filter(queryset, '小明').count(), 1)
+        self.assertEqual(cadre_search.filter(queryset, '').count(), 1)
+
+
+class ExporterTests(TestCase):
+    """流式导出"""
+
+    def test_xlsx_streams_while_rows_are_written(self):
+        consumed = []
+
+        def rows():
+            for number in range(50):
+                consumed.append(number)
+                yield [f'干部{number}', number, date(2020, 1, 1) + timedelta(days=number), None]
+
+        chunks = stream_xlsx(['姓名', '序号', '日期', '备注'], rows(), flush_rows=10)
+        first = next(chunks)
+        self.assertTrue(first)
+        self.assertLess(len(consumed), 50)
+
+        content = first + b''.join(chunks)
+        sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+        values = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(values[0], ('姓名', '序号', '日期', '备注'))
+        self.assertEqual(len(values), 51)
+        self.assertEqual(values[50][:2], ('干部49', 49))
+        self.assertEqual(values[1][2].date(), date(2020, 1, 1))
+
+    def test_roster_export_can_be_reimported(self):
+        make_roster('张三', id_card=id_card('11010519800101001'), police_number='1001', birth_date=date(1980, 1, 1))
+        response = export_roster(PersonnelRoster.objects.all(), 'xlsx')
+        content = b''.join(response.streaming_content)
+
+        sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+        self.assertEqual([cell.value for cell in sheet[1]], [header for header, _, _ in ROSTER_EXPORT_COLUMNS])
+
+        summary = RosterImporter(mode=ImportMode.UPSERT, dry_run=True).import_file(
+            SimpleUploadedFile('roster.xlsx', content)
+        )
+        self.assertEqual((summary['error_count'], summary['unchanged_count']), (0, 1))
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PersonnelRosterViewSet, CadreViewSet, CadreResumeViewSet
+from .views import PersonnelRosterViewSet, CadreViewSet, CadreResumeViewSet, ImportJobViewSet
 
 router = DefaultRouter()
 router.register(r'roster', PersonnelRosterViewSet, basename='personnel-roster')
 router.register(r'cadres', CadreViewSet, basename='cadre')
 router.register(r'resumes', CadreResumeViewSet, basename='cadre-resume')
+router.register(r'import-jobs', ImportJobViewSet, basename='import-job')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,192 @@
+"""
+花名册行转换与校验
+纯 pandas/numpy 实现，不依赖 Django，可在子进程中按块并行执行：
+    convert_chunk     Excel 原始值 -> 模型字段值（列向量化），并生成姓名拼音
+    validate_records  必填、枚举、长度、身份证号校验位、出生日期一致性、块内重复
+校验结果为错误矩阵：行索引为 Excel 行号，列为字段，值为错误信息（无错误为 None）
+rules 为导入器根据模型生成的普通字典（可序列化，见 RosterImporter.build_rules）
+"""
+
+import numpy as np
+import pandas as pd
+
+from .pinyin import name_pinyin
+
+
+FLAG_TRUE_VALUES = {'是', '√', 'Y', 'y', '1', 'True', 'TRUE', 'true'}
+
+# 常见日期写法，依次尝试；剩余无法识别的再交给 pandas 通用解析
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y%m%d', '%Y-%m']
+
+# GB 11643 身份证号校验位：前 17 位加权求和模 11
+ID_CARD_WEIGHTS = np.array([7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2])
+ID_CARD_CHECK_CODES = np.array(list('10X98765432'))
+
+
+def to_text(column):
+    """转为去除首尾空白的文本列，缺失值为 <NA>"""
+    return column.where(column.notna()).astype('string').str.strip()
+
+
+def to_datetimes(column):
+    """向量化解析日期列，返回 datetime64 列（无法识别为 NaT）"""
+    text = to_text(column).str.replace(r'[./年月]', '-', regex=True).str.rstrip('-日')
+    text = text.where(text != '')
+    result = pd.Series(pd.NaT, index=column.index, dtype='datetime64[ns]')
+    for fmt in DATE_FORMATS:
+        pending = result.isna() & text.notna()
+        if not pending.any():
+            break
+        result[pending] = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+
+    pending = result.isna() & text.notna()
+    if pending.any():
+        result[pending] = pd.to_datetime(text[pending], format='mixed', errors='coerce')
+    return result
+
+
+def to_dates(column):
+    """向量化解析日期列，无法识别的值为 None"""
+    result = to_datetimes(column)
+    return result.dt.date.astype(object).where(result.notna(), None)
+
+
+def to_ints(column):
+    """向量化解析整数列，返回 (值列, 非法值掩码)"""
+    text = to_text(column)
+    numbers = pd.to_numeric(text, errors='coerce')
+    invalid = numbers.isna() & text.notna() & (text != '')
+    values = numbers.round().astype('Int64')
+    return values.astype(object).where(values.notna(), None), invalid
+
+
+def id_card_checksum_valid(id_cards):
+    """
+    校验 18 位身份证号的格式与校验位
+
+    Returns:
+        布尔列；空值视为通过
+    """
+    text = id_cards.astype('string')
+    present = text.notna()
+    valid = ~present | text.str.fullmatch(r'\d{17}[\dX]').fillna(False).astype(bool)
+
+    candidates = present & valid
+    if candidates.any():
+        body = ''.join(text[candidates].str[:17])
+        digits = (np.frombuffer(body.encode('ascii'), dtype=np.uint8) - ord('0')).reshape(-1, 17)
+        expected = ID_CARD_CHECK_CODES[digits @ ID_CARD_WEIGHTS % 11]
+        valid[candidates] = expected == text[candidates].str[17].to_numpy(dtype=str)
+    return valid
+
+
+def id_card_birth_dates(id_cards):
+    """取身份证号第 7-14 位的出生日期（无效为 NaT）"""
+    return pd.to_datetime(id_cards.astype('string').str[6:14], format='%Y%m%d', errors='coerce')
+
+
+def empty_matrix(index, fields):
+    """空错误矩阵"""
+    return pd.DataFrame(None, index=index, columns=list(fields), dtype=object)
+
+
+def add_error(matrix, mask, field, message):
+    """在错误矩阵中标记错误（同一单元格保留第一条）"""
+    mask = mask.fillna(False).astype(bool) & matrix[field].isna()
+    if mask.any():
+        matrix.loc[mask, field] = message
+
+
+def convert_chunk(chunk, rules):
+    """
+    将一块 Excel 行映射为模型字段（序号为空时保留为 None）
+
+    Returns:
+        (records, matrix)：字段 DataFrame 与转换阶段产生的错误矩阵
+    """
+    records = pd.DataFrame(index=chunk.index)
+    matrix = empty_matrix(chunk.index, (field for _, field, _ in rules['columns']))
+    labels = rules['labels']
+
+    for header, field, kind in rules['columns']:
+        column = chunk[header] if header in chunk.columns else pd.Series(None, index=chunk.index, dtype=object)
+        if kind == 'str':
+            records[field] = to_text(column).fillna('').astype(object)
+        elif kind == 'date':
+            records[field] = to_dates(column)
+        elif kind in ('int', 'serial'):
+            records[field], invalid = to_ints(column)
+            add_error(matrix, invalid, field, f'{labels[field]}格式不正确')
+        elif kind == 'gender':
+            records[field] = (
+                to_text(column).map(rules['gender_map']).fillna(rules['gender_default']).astype(object)
+            )
+        elif kind == 'flag':
+            records[field] = to_text(column).isin(FLAG_TRUE_VALUES).fillna(False).astype(bool)
+
+    for field in rules['unique_fields']:
+        records[field] = records[field].where(records[field] != '', None)
+    records['id_card'] = records['id_card'].where(records['id_card'].isna(), records['id_card'].str.upper())
+
+    # 姓名拼音（检索用），同名只转换一次
+    pinyin = {name: name_pinyin(name) for name in records['name'].unique()}
+    records['name_pinyin'] = records['name'].map(lambda name: pinyin[name][0])
+    records['name_initials'] = records['name'].map(lambda name: pinyin[name][1])
+    return records, matrix
+
+
+def validate_records(records, matrix, rules):
+    """
+    字段级与块内跨行校验，结果写入错误矩阵；
+    同时按身份证号核对出生年月，回填 id_card_inconsistent
+    """
+    labels = rules['labels']
+
+    for field in rules['required_fields']:
+        add_error(matrix, records[field] == '', field, f'{labels[field]}不能为空')
+    for field, choices in rules['choices'].items():
+        add_error(matrix, (records[field] != '') & ~records[field].isin(choices), field,
+                  f'{labels[field]}不是有效选项')
+    for field, max_length in rules['max_lengths'].items():
+        values = records[field].where(records[field].notna(), '').astype(str)
+        add_error(matrix, values.str.len() > max_length, field, f'{labels[field]}超过{max_length}个字符')
+
+    # 身份证号：格式与校验位
+    id_cards = records['id_card']
+    add_error(matrix, ~id_card_checksum_valid(id_cards), 'id_card', '身份证号格式或校验位不正确')
+    births = id_card_birth_dates(id_cards)
+    add_error(matrix, id_cards.notna() & births.isna(), 'id_card', '身份证号中的出生日期无效')
+
+    # 出生年月与身份证不一致时置标记；两者缺一时保留文件中的标记
+    recorded = pd.to_datetime(records['birth_date'], errors='coerce')
+    comparable = births.notna() & recorded.notna()
+    mismatch = (births.dt.year != recorded.dt.year) | (births.dt.month != recorded.dt.month)
+    records['id_card_inconsistent'] = records['id_card_inconsistent'].where(~comparable, mismatch & comparable)
+
+    police_numbers = records['police_number'].astype('string')
+    add_error(matrix, police_numbers.notna() & ~police_numbers.str.isdigit().fillna(False).astype(bool),
+              'police_number', '警号必须为数字')
+
+    # 块内重复（跨块重复由导入器在主进程中检查）
+    for field in rules['unique_fields']:
+        values = records[field]
+        add_error(matrix, values.notna() & values.duplicated(keep='first'), field, f'{labels[field]}在文件中重复')
+
+    return matrix
+
+
+def prepare_chunk(chunk, rules):
+    """转换并校验一块数据（进程池任务入口）"""
+    records, matrix = convert_chunk(chunk, rules)
+    return records, validate_records(records, matrix, rules)
+
+
+def matrix_messages(matrix, labels):
+    """
+    将错误矩阵展开为 {Excel行号: {字段名称: 错误信息}}，只包含有错误的行
+    """
+    failed = matrix[matrix.notna().any(axis=1)]
+    return {
+        row_number: {labels[field]: message for field, message in cells.dropna().items()}
+        for row_number, cells in failed.iterrows()
+    }
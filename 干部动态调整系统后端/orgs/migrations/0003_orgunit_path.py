@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:35
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    """按层级回填已有组织单元的物化路径"""
+    OrgUnit = apps.get_model('orgs', 'OrgUnit')
+    units = list(OrgUnit.objects.only('id', 'parent_id'))
+    children = {}
+    for unit in units:
+        children.setdefault(unit.parent_id, []).append(unit)
+
+    stack = [(unit, '/', 0) for unit in children.get(None, [])]
+    while stack:
+        unit, prefix, depth = stack.pop()
+        unit.path = f"{prefix}{unit.id.hex}/"
+        unit.depth = depth
+        stack.extend((child, unit.path, depth + 1) for child in children.get(unit.id, []))
+
+    OrgUnit.objects.bulk_update(units, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0002_membership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orgunit',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='层级深度'),
+        ),
+        migrations.AddField(
+            model_name='orgunit',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=1024, verbose_name='层级路径'),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
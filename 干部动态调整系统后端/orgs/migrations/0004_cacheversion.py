@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0003_orgunit_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='名称')),
+                ('version', models.BigIntegerField(verbose_name='版本号')),
+            ],
+            options={
+                'verbose_name': '缓存版本号',
+                'verbose_name_plural': '缓存版本号',
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 from django.contrib.auth import get_user_model
 
 
@@ -14,6 +16,36 @@ class UnitType(models.TextChoices):
     OFFICE = 'OFFICE', '办公室'
 
 
+def _count_subquery(queryset):
+    """将查询集包装为标量 COUNT 子查询，避免多个 JOIN 计数互相放大"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().annotate(
+                count=Func(F('pk'), function='COUNT', output_field=models.IntegerField())
+            ).values('count')[:1]
+        ),
+        0
+    )
+
+
+class OrgUnitQuerySet(models.QuerySet):
+    """组织单元查询集"""
+
+    def with_children_count(self):
+        """标注直接下级单位数"""
+        return self.annotate(
+            children_count=_count_subquery(OrgUnit.objects.filter(parent=OuterRef('pk')))
+        )
+
+    def with_members_count(self):
+        """标注直接成员数与含下级单位的成员总数"""
+        active = Membership.objects.filter(effective_to__isnull=True)
+        return self.annotate(
+            members_count=_count_subquery(active.filter(unit=OuterRef('pk'))),
+            all_members_count=_count_subquery(active.filter(unit__path__startswith=OuterRef('path'))),
+        )
+
+
 class OrgUnit(models.Model):
     """组织单元：支部/部门/岗位容器"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -35,11 +67,15 @@ class OrgUnit(models.Model):
         verbose_name='上级单位'
     )
     sort_order = models.IntegerField('排序', default=0)
+    path = models.CharField('层级路径', max_length=1024, default='', editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField('层级深度', default=0, editable=False)
     is_active = models.BooleanField('启用', default=True, db_index=True)
     metrics_snapshot = models.JSONField('指标快照', null=True, blank=True)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
 
+    objects = OrgUnitQuerySet.as_manager()
+
     class Meta:
         verbose_name = '组织单元'
         verbose_name_plural = '组织单元'
@@ -54,23 +90,49 @@ class OrgUnit(models.Model):
     def __str__(self):
         return f"{self.get_unit_type_display()}: {self.name}"
 
+    def build_path(self):
+        """根据上级单位计算物化路径：/<祖先id>/.../<自身id>/"""
+        prefix = self.parent.path if self.parent_id else '/'
+        return f"{prefix}{self.id.hex}/"
+
+    def save(self, *args, **kwargs):
+        """保存时维护物化路径，移动时同步更新整棵子树"""
+        old_path = self.path
+        self.path = self.build_path()
+        self.depth = self.path.count('/') - 2
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'path', 'depth'}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                OrgUnit.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (self.path.count('/') - old_path.count('/'))
+                )
+
+    def get_ancestor_ids(self):
+        """从物化路径解析所有上级单位ID（由近及远）"""
+        return [uuid.UUID(part) for part in reversed(self.path.strip('/').split('/')[:-1])]
+
     def get_ancestors(self):
-        """获取所有上级单位"""
-        ancestors = []
-        parent = self.parent
-        while parent:
-            ancestors.append(parent)
-            parent = parent.parent
-        return ancestors
-
-    def get_descendants(self):
-        """获取所有下级单位"""
-        descendants = []
-        children = self.children.all()
-        for child in children:
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        """获取所有上级单位（由近及远，单次查询）"""
+        return OrgUnit.objects.filter(id__in=self.get_ancestor_ids()).order_by('-depth')
+
+    def get_descendants(self, include_self=False):
+        """获取所有下级单位（单次前缀查询）"""
+        queryset = OrgUnit.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
+    def is_descendant_of(self, other, include_self=True):
+        """判断是否为 other 的下级单位"""
+        if not include_self and self.pk == other.pk:
+            return False
+        return self.path.startswith(other.path)
 
 
 class Membership(models.Model):
@@ -133,3 +195,21 @@ class Membership(models.Model):
         if self.effective_to and self.effective_to < today:
             return False
         return True
+
+
+class CacheVersion(models.Model):
+    """
+    缓存版本号
+
+    存于数据库，所有进程读到的版本号一致；各进程的本地缓存以版本号作为键的一部分，
+    任一进程递增版本号后其他进程的旧缓存随即不再命中
+    """
+    name = models.CharField('名称', max_length=64, primary_key=True)
+    version = models.BigIntegerField('版本号')
+
+    class Meta:
+        verbose_name = '缓存版本号'
+        verbose_name_plural = '缓存版本号'
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
@@ -24,6 +24,8 @@ class OrgUnitListSerializer(serializers.ModelSerializer):
         ]
 
     def get_children_count(self, obj):
+        if hasattr(obj, 'children_count'):
+            return obj.children_count
         return obj.children.count()
 
 
@@ -46,17 +48,16 @@ class OrgUnitDetailSerializer(serializers.ModelSerializer):
 
     def get_members_count(self, obj):
         """直接成员数"""
+        if hasattr(obj, 'members_count'):
+            return obj.members_count
         return obj.memberships.filter(effective_to__isnull=True).count()
 
     def get_all_members_count(self, obj):
         """所有成员数（含子部门）"""
-        # 获取所有下级部门ID
-        descendant_ids = [obj.id]
-        descendants = obj.get_descendants()
-        descendant_ids.extend([d.id for d in descendants])
-
+        if hasattr(obj, 'all_members_count'):
+            return obj.all_members_count
         return Membership.objects.filter(
-            unit_id__in=descendant_ids,
+            unit__path__startswith=obj.path,
             effective_to__isnull=True
         ).count()
 
@@ -139,6 +140,19 @@ class OrgUnitReorderSerializer(serializers.Serializer):
     ordered_ids = serializers.ListField(child=serializers.UUIDField())
 
 
+class OrgUnitBulkMoveItemSerializer(serializers.Serializer):
+    """批量移动单项"""
+    unit_id = serializers.UUIDField()
+    # 必须显式给出，传 null 表示移动为顶级单元，避免漏传时被误移到顶级
+    new_parent_id = serializers.UUIDField(required=True, allow_null=True)
+    position = serializers.IntegerField(required=False, min_value=0)
+
+
+class OrgUnitBulkMoveSerializer(serializers.Serializer):
+    """批量移动/排序部门序列化器"""
+    operations = OrgUnitBulkMoveItemSerializer(many=True, allow_empty=False)
+
+
 class OrgUnitManagerSerializer(serializers.Serializer):
     """设置部门负责人序列化器"""
     user_id = serializers.UUIDField()
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import OrgUnit
+from .tree import bump_tree_version_on_commit
+
+
+@receiver(post_save, sender=OrgUnit)
+@receiver(post_delete, sender=OrgUnit)
+def invalidate_org_tree(sender, **kwargs):
+    """组织单元新增/修改/移动/删除后使组织树缓存失效"""
+    bump_tree_version_on_commit()
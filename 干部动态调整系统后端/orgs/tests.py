@@ -1,3 +1,197 @@
+import uuid
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
+from .models import CacheVersion, Membership, OrgUnit, UnitType
+from .tree import TREE_VERSION_NAME, build_org_tree, bulk_move_units, get_tree_version
+
+
+def make_unit(name, parent=None, **kwargs):
+    return OrgUnit.objects.create(name=name, parent=parent, unit_type=UnitType.DEPARTMENT, **kwargs)
+
+
+class MaterializedPathTests(TestCase):
+    """物化路径维护"""
+
+    def setUp(self):
+        self.root = make_unit('根')
+        self.child = make_unit('子', self.root)
+        self.grandchild = make_unit('孙', self.child)
+
+    def test_path_and_depth(self):
+        self.assertEqual(self.root.path, f'/{self.root.pk.hex}/')
+        self.assertEqual(self.grandchild.path, f'{self.child.path}{self.grandchild.pk.hex}/')
+        self.assertEqual([self.root.depth, self.child.depth, self.grandchild.depth], [0, 1, 2])
+        self.assertEqual(self.grandchild.get_ancestor_ids(), [self.child.pk, self.root.pk])
+
+    def test_save_moves_subtree(self):
+        other = make_unit('其他')
+        self.child.parent = other
+        self.child.save()
+
+        self.grandchild.refresh_from_db()
+        self.assertTrue(self.grandchild.path.startswith(other.path))
+        self.assertEqual(self.grandchild.depth, 2)
+        self.assertEqual(set(self.root.get_descendants()), set())
+
+
+class BulkMoveTests(TestCase):
+    """批量移动"""
+
+    def setUp(self):
+        self.a = make_unit('A')
+        self.a1 = make_unit('A1', self.a, sort_order=0)
+        self.a2 = make_unit('A2', self.a, sort_order=1)
+        self.a11 = make_unit('A11', self.a1)
+        self.b = make_unit('B')
+
+    def test_moves_subtree_and_orders_siblings(self):
+        count = bulk_move_units([
+            {'unit_id': self.a1.pk, 'new_parent_id': self.b.pk},
+            {'unit_id': self.a2.pk, 'new_parent_id': self.b.pk, 'position': 0},
+        ])
+
+        self.assertEqual(count, 2)
+        a1, a2, a11 = (OrgUnit.objects.get(pk=unit.pk) for unit in (self.a1, self.a2, self.a11))
+        self.assertEqual((a1.parent_id, a2.parent_id), (self.b.pk, self.b.pk))
+        self.assertEqual((a2.sort_order, a1.sort_order), (0, 1))
+        self.assertEqual(a11.path, f'{self.b.path}{self.a1.pk.hex}/{self.a11.pk.hex}/')
+        self.assertEqual(a11.depth, 2)
+
+    def test_nested_moves_use_new_parent_path(self):
+        bulk_move_units([
+            {'unit_id': self.a1.pk, 'new_parent_id': self.b.pk},
+            {'unit_id': self.b.pk, 'new_parent_id': self.a2.pk},
+        ])
+
+        a11 = OrgUnit.objects.get(pk=self.a11.pk)
+        self.assertEqual(a11.path, f'{self.a2.path}{self.b.pk.hex}/{self.a1.pk.hex}/{self.a11.pk.hex}/')
+        self.assertEqual(a11.depth, 4)
+
+    def test_rejects_move_under_descendant(self):
+        with self.assertRaises(ValidationError):
+            bulk_move_units([{'unit_id': self.a.pk, 'new_parent_id': self.a11.pk}])
+        self.assertIsNone(OrgUnit.objects.get(pk=self.a.pk).parent_id)
+
+    def test_rejects_cycle_formed_by_several_moves(self):
+        with self.assertRaises(ValidationError):
+            bulk_move_units([
+                {'unit_id': self.b.pk, 'new_parent_id': self.a1.pk},
+                {'unit_id': self.a.pk, 'new_parent_id': self.b.pk},
+            ])
+
+    def test_rejects_duplicate_and_missing_units(self):
+        with self.assertRaises(ValidationError):
+            bulk_move_units([
+                {'unit_id': self.a1.pk, 'new_parent_id': self.b.pk},
+                {'unit_id': self.a1.pk, 'new_parent_id': None},
+            ])
+        with self.assertRaises(ValidationError):
+            bulk_move_units([{'unit_id': self.a1.pk, 'new_parent_id': uuid.uuid4()}])
+
+    def test_touches_updated_at(self):
+        before = OrgUnit.objects.get(pk=self.a11.pk).updated_at
+        bulk_move_units([{'unit_id': self.a1.pk, 'new_parent_id': self.b.pk}])
+        self.assertGreater(OrgUnit.objects.get(pk=self.a1.pk).updated_at, before)
+        self.assertGreater(OrgUnit.objects.get(pk=self.a11.pk).updated_at, before)
+
+    def test_endpoint_requires_new_parent(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'a@a.com', 'x', real_name='管理员'))
+
+        response = client.post('/api/org/units/bulk-move/', {'operations': [{'unit_id': str(self.a1.pk)}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(OrgUnit.objects.get(pk=self.a1.pk).parent_id, self.a.pk)
+
+        response = client.post('/api/org/units/bulk-move/', {
+            'operations': [{'unit_id': str(self.a1.pk), 'new_parent_id': None}]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(OrgUnit.objects.get(pk=self.a1.pk).parent_id)
+
+    def test_bumps_tree_version_on_commit(self):
+        version = get_tree_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_move_units([{'unit_id': self.a1.pk, 'new_parent_id': self.b.pk}])
+        self.assertNotEqual(get_tree_version(), version)
+
+
+class OrgTreeTests(TestCase):
+    """组织树"""
+
+    def setUp(self):
+        cache.clear()
+        self.root = make_unit('根')
+        self.second = make_unit('乙', self.root, sort_order=1)
+        self.first = make_unit('甲', self.root, sort_order=0)
+        self.hidden = make_unit('停用', self.root, is_active=False)
+        make_unit('停用下级', self.hidden)
+
+    def test_build_tree_orders_children_and_skips_inactive(self):
+        tree = build_org_tree()
+        self.assertEqual(len(tree), 1)
+        self.assertEqual([node['name'] for node in tree[0]['children']], ['甲', '乙'])
+
+    def test_roots_follow_model_ordering(self):
+        OrgUnit.objects.create(name='处室', unit_type=UnitType.DIVISION, sort_order=0)
+        OrgUnit.objects.create(name='支部', unit_type=UnitType.BRANCH, sort_order=9)
+        self.assertEqual([node['name'] for node in build_org_tree()], ['支部', '根', '处室'])
+
+    def test_tree_endpoint_etag(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'a@a.com', 'x', real_name='管理员'))
+
+        response = client.get('/api/org/units/tree/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(client.get('/api/org/units/tree/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_unit('丙', self.root, sort_order=2)
+        response = client.get('/api/org/units/tree/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data[0]['children']), 3)
+
+    def test_version_is_shared_through_database(self):
+        version = get_tree_version()
+        self.assertEqual(CacheVersion.objects.get(name=TREE_VERSION_NAME).version, version)
+
+        # 模拟其他进程递增版本号：本进程不经过缓存也能读到
+        CacheVersion.objects.filter(name=TREE_VERSION_NAME).update(version=version + 1)
+        self.assertEqual(get_tree_version(), version + 1)
+
+
+class OrgUnitCountTests(TestCase):
+    """组织单元下级数与成员数标注"""
+
+    def setUp(self):
+        self.root = make_unit('根')
+        self.child = make_unit('子', self.root)
+        make_unit('孙', self.child)
+        users = [
+            User.objects.create_user(f'user{index}', password='x', real_name=f'用户{index}', email=f'u{index}@a.com')
+            for index in range(3)
+        ]
+        Membership.objects.create(user=users[0], unit=self.root)
+        Membership.objects.create(user=users[1], unit=self.child)
+        Membership.objects.create(user=users[2], unit=self.child, effective_to='2020-01-01')
+
+    def test_annotations(self):
+        units = {unit.pk: unit for unit in OrgUnit.objects.with_children_count().with_members_count()}
+        root = units[self.root.pk]
+        self.assertEqual((root.children_count, root.members_count, root.all_members_count), (1, 1, 2))
+        self.assertEqual(units[self.child.pk].all_members_count, 1)
+
+    def test_detail_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'a@a.com', 'x', real_name='管理员'))
 
-# Create your tests here.
+        response = client.get(f'/api/org/units/{self.root.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['members_count'], response.data['all_members_count']), (1, 2))
+        self.assertEqual([child['children_count'] for child in response.data['children']], [1])
@@ -0,0 +1,229 @@
+"""
+组织树构建与批量调整
+一次查询取出全部启用单元，在内存中按 parent_id 组装父子关系；
+结果按树版本号缓存，版本号存于数据库（见 orgs/versions.py），在组织单元变更后递增
+"""
+
+import uuid
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import OrgUnit
+from .versions import bump_version, get_version
+
+
+# 批量移动写入后（事务内）发送；批量更新不触发模型信号，依赖组织层级的模块据此更新
+# 参数：unit_ids 被移动的单元及其原各级上级单位ID
+units_moved = Signal()
+
+
+TREE_VERSION_NAME = 'orgs.tree'
+TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+TREE_FIELDS = ['id', 'name', 'code', 'unit_type', 'parent_id', 'is_active', 'sort_order']
+
+
+def _tree_node(unit):
+    """单个节点的输出结构（与 OrgUnitTreeSerializer 字段一致）"""
+    return {
+        'id': str(unit.id),
+        'name': unit.name,
+        'code': unit.code,
+        'unit_type': unit.unit_type,
+        'label': unit.name,
+        'value': str(unit.id),
+        'children': [],
+        'is_active': unit.is_active,
+        'sort_order': unit.sort_order,
+    }
+
+
+def build_org_tree(root_ids=None):
+    """
+    构建组织树
+
+    Args:
+        root_ids: 作为根节点的单元ID集合；为 None 时取所有无上级的启用单元
+
+    Returns:
+        根节点列表，每个节点的 children 为已排序的子节点列表
+    """
+    units = OrgUnit.objects.filter(is_active=True).order_by('sort_order', 'name').only(*TREE_FIELDS)
+
+    nodes = {}
+    ordered = []
+    for unit in units:
+        nodes[unit.id] = _tree_node(unit)
+        ordered.append(unit)
+
+    roots = []
+    for unit in ordered:
+        node = nodes[unit.id]
+        if unit.parent_id is None:
+            if root_ids is None or unit.id in root_ids:
+                roots.append(node)
+        elif unit.parent_id in nodes:
+            # 上级单位被停用时，其子树不展示
+            nodes[unit.parent_id]['children'].append(node)
+
+    # 根节点沿用模型默认排序 (unit_type, sort_order, name)：在已有顺序上按类型稳定排序
+    roots.sort(key=lambda node: node['unit_type'])
+    return roots
+
+
+def get_tree_version():
+    """获取当前树版本号（各进程一致，可用于 ETag）"""
+    return get_version(TREE_VERSION_NAME)
+
+
+def bump_tree_version():
+    """递增树版本号，使所有进程已缓存的组织树失效"""
+    bump_version(TREE_VERSION_NAME)
+
+
+def bump_tree_version_on_commit():
+    """在事务提交后递增版本号，避免并发读取把旧数据缓存到新版本下"""
+    transaction.on_commit(bump_tree_version)
+
+
+def tree_cache_key(version, variant=''):
+    """组织树缓存键"""
+    return f'orgs:tree:{version}:{variant}'
+
+
+def normalize_unit_name(name):
+    """规范化部门名称（去除全部空白），用于按名称匹配组织单元"""
+    return ''.join(str(name or '').split())
+
+
+def get_unit_name_index():
+    """
+    部门名称/编码 -> 组织单元ID 的索引（按树版本号缓存）
+
+    名称重复的单元无法唯一确定，对应值为 None
+    """
+    key = tree_cache_key(get_tree_version(), 'name-index')
+    index = cache.get(key)
+    if index is None:
+        index = {}
+        for unit_id, name, code in OrgUnit.objects.filter(is_active=True).values_list('id', 'name', 'code'):
+            for label in {normalize_unit_name(name), normalize_unit_name(code)} - {''}:
+                index[label] = None if label in index and index[label] != unit_id else unit_id
+        cache.set(key, index, TREE_CACHE_TIMEOUT)
+    return index
+
+
+def _path_ids(path):
+    """将物化路径拆分为由远及近的单元ID列表"""
+    return [uuid.UUID(part) for part in path.strip('/').split('/') if part]
+
+
+def bulk_move_units(operations):
+    """
+    批量移动/排序组织单元（单个事务内完成）
+
+    Args:
+        operations: [{'unit_id', 'new_parent_id', 'position'}, ...]，
+                    position 为在新上级下的目标位置，缺省时追加到末尾
+
+    Raises:
+        ValidationError: 单元不存在、重复操作或会形成循环
+    """
+    moves = {}
+    for op in operations:
+        if op['unit_id'] in moves:
+            raise ValidationError('同一部门不能在一次请求中重复移动')
+        moves[op['unit_id']] = op
+
+    parent_ids = {op.get('new_parent_id') for op in operations} - {None}
+    units = OrgUnit.objects.in_bulk(set(moves) | parent_ids)
+    missing = (set(moves) | parent_ids) - set(units)
+    if missing:
+        raise ValidationError('部门不存在: ' + ', '.join(str(pk) for pk in missing))
+
+    # 基于物化路径还原原始上级关系，再叠加本次移动得到最终上级关系
+    original_parent = {}
+    for unit in units.values():
+        chain = _path_ids(unit.path)
+        for index, pk in enumerate(chain):
+            original_parent.setdefault(pk, chain[index - 1] if index else None)
+
+    def final_parent(pk):
+        return moves[pk].get('new_parent_id') if pk in moves else original_parent.get(pk)
+
+    # 一次性校验循环：沿最终上级链向上，若回到自身则成环
+    final_depth = {}
+    for pk in moves:
+        depth, current, seen = 0, final_parent(pk), {pk}
+        while current is not None:
+            if current in seen:
+                raise ValidationError('不能将部门移动到其子部门下')
+            seen.add(current)
+            depth += 1
+            current = final_parent(current)
+        final_depth[pk] = depth
+
+    now = timezone.now()
+    with transaction.atomic():
+        # 自上而下重写路径，保证嵌套移动时下级使用上级的新路径
+        rewrites = []
+
+        def rewrite(path):
+            for old_prefix, new_prefix in rewrites:
+                if path.startswith(old_prefix):
+                    path = new_prefix + path[len(old_prefix):]
+            return path
+
+        for pk in sorted(moves, key=final_depth.get):
+            unit = units[pk]
+            parent_pk = final_parent(pk)
+            old_path = rewrite(unit.path)
+            new_path = f"{rewrite(units[parent_pk].path) if parent_pk else '/'}{pk.hex}/"
+            if old_path != new_path:
+                OrgUnit.objects.filter(path__startswith=old_path).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (new_path.count('/') - old_path.count('/')),
+                    updated_at=now
+                )
+                rewrites.append((old_path, new_path))
+
+        # 按目标上级重新编排同级顺序，移入的单元插入到指定位置
+        target_parents = {final_parent(pk) for pk in moves}
+        sibling_filter = Q(parent_id__in=target_parents - {None})
+        if None in target_parents:
+            sibling_filter |= Q(parent__isnull=True)
+        siblings = {}
+        for unit in OrgUnit.objects.filter(sibling_filter).exclude(pk__in=moves).order_by('sort_order', 'name'):
+            siblings.setdefault(unit.parent_id, []).append(unit)
+
+        changed = []
+        for parent_pk in target_parents:
+            ordered = siblings.get(parent_pk, [])
+            incoming = sorted(
+                (op for op in operations if op.get('new_parent_id') == parent_pk),
+                key=lambda op: op.get('position', len(ordered))
+            )
+            for op in incoming:
+                unit = units[op['unit_id']]
+                unit.parent_id = parent_pk
+                ordered.insert(min(op.get('position', len(ordered)), len(ordered)), unit)
+            for index, unit in enumerate(ordered):
+                if unit.pk in moves or unit.sort_order != index:
+                    unit.sort_order = index
+                    unit.updated_at = now
+                    changed.append(unit)
+
+        # bulk_update 不会触发 auto_now，更新时间需显式写入
+        OrgUnit.objects.bulk_update(changed, ['parent', 'sort_order', 'updated_at'], batch_size=500)
+        bump_tree_version_on_commit()
+        units_moved.send(
+            sender=OrgUnit,
+            unit_ids={pk for unit_pk in moves for pk in _path_ids(units[unit_pk].path)}
+        )
+
+    return len(moves)
@@ -0,0 +1,42 @@
+"""
+数据库中的缓存版本号
+组织树、权限、数据范围等缓存以版本号作为缓存键的一部分，版本号存于数据库，
+使用进程内缓存（LocMemCache）的多个进程也能看到彼此的变更，不会读到过期缓存
+"""
+
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import CacheVersion
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """获取版本号（首次读取时以毫秒时间戳初始化）"""
+    version = CacheVersion.objects.filter(name=name).values_list('version', flat=True).first()
+    if version is None:
+        version = CacheVersion.objects.get_or_create(name=name, defaults={'version': _now_ms()})[0].version
+    return version
+
+
+def bump_version(name):
+    """
+    递增版本号
+
+    版本号不小于当前毫秒时间戳，数据库回滚或重建后也不会与进程缓存中的旧版本号重复
+    """
+    version = Greatest(F('version') + 1, Value(_now_ms()))
+    if CacheVersion.objects.filter(name=name).update(version=version):
+        return
+    try:
+        with transaction.atomic():
+            CacheVersion.objects.create(name=name, version=_now_ms())
+    except IntegrityError:
+        # 并发创建，改为递增
+        CacheVersion.objects.filter(name=name).update(version=version)
@@ -2,20 +2,33 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Prefetch
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from hashlib import md5
+from urllib.parse import urlencode
 
 from .models import OrgUnit, Membership
 from .serializers import (
     OrgUnitListSerializer,
     OrgUnitDetailSerializer,
-    OrgUnitTreeSerializer,
     MembershipSerializer,
     MembershipCreateSerializer,
     OrgUnitMoveSerializer,
     OrgUnitReorderSerializer,
+    OrgUnitBulkMoveSerializer,
     OrgUnitManagerSerializer
 )
+from .tree import (
+    build_org_tree,
+    bulk_move_units,
+    get_tree_version,
+    bump_tree_version_on_commit,
+    tree_cache_key,
+    TREE_CACHE_TIMEOUT
+)
 
 
 class OrgUnitViewSet(viewsets.ModelViewSet):
@@ -24,7 +37,13 @@ class OrgUnitViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """获取查询集"""
-        queryset = OrgUnit.objects.select_related('parent').all()
+        queryset = OrgUnit.objects.select_related('parent').with_children_count()
+
+        # 计数通过子查询标注，列表/详情不再逐行 COUNT
+        if self.action == 'retrieve':
+            queryset = queryset.with_members_count().prefetch_related(
+                Prefetch('children', queryset=OrgUnit.objects.with_children_count())
+            )
 
         # 搜索过滤
         search = self.request.query_params.get('search', None)
@@ -85,11 +104,30 @@ class OrgUnitViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def tree(self, request):
-        """获取组织树"""
-        # 只返回根节点，子节点通过序列化器的 children 字段递归获取
-        root_units = self.get_queryset().filter(parent__isnull=True, is_active=True)
-        serializer = OrgUnitTreeSerializer(root_units, many=True)
-        return Response(serializer.data)
+        """获取组织树（按树版本号缓存，支持 ETag 条件请求）"""
+        filters = {key: request.query_params[key] for key in ('search', 'unit_type') if request.query_params.get(key)}
+        variant = urlencode(sorted(filters.items()))
+        version = get_tree_version()
+        etag = '"orgtree-%s-%s"' % (version, md5(variant.encode()).hexdigest()[:8])
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache_key = tree_cache_key(version, variant)
+        data = cache.get(cache_key)
+        if data is None:
+            # 带筛选条件时只对根节点生效，否则直接取所有顶级启用单元
+            root_ids = None
+            if filters:
+                root_ids = set(
+                    self.get_queryset().filter(parent__isnull=True, is_active=True).values_list('id', flat=True)
+                )
+            data = build_org_tree(root_ids)
+            cache.set(cache_key, data, TREE_CACHE_TIMEOUT)
+
+        return Response(data, headers=headers)
 
     @action(detail=True, methods=['post'])
     def move(self, request, pk=None):
@@ -105,8 +143,8 @@ class OrgUnitViewSet(viewsets.ModelViewSet):
             if new_parent_id:
                 try:
                     new_parent = OrgUnit.objects.get(id=new_parent_id)
-                    # 检查是否会形成循环
-                    if new_parent in unit.get_descendants():
+                    # 检查是否会形成循环（含移动到自身）
+                    if new_parent.is_descendant_of(unit):
                         return Response(
                             {'error': '不能将部门移动到其子部门下'},
                             status=status.HTTP_400_BAD_REQUEST
@@ -146,27 +184,44 @@ class OrgUnitViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # 更新排序
-            for index, unit_id in enumerate(ordered_ids):
-                OrgUnit.objects.filter(id=unit_id).update(sort_order=index)
+            # 更新排序（单条 CASE 语句批量更新）
+            with transaction.atomic():
+                OrgUnit.objects.bulk_update(
+                    [OrgUnit(id=unit_id, sort_order=index) for index, unit_id in enumerate(ordered_ids)],
+                    ['sort_order']
+                )
+                bump_tree_version_on_commit()
 
             return Response({'message': '排序更新成功'})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='bulk-move')
+    def bulk_move(self, request):
+        """批量移动/排序部门（单个事务，失败时整体回滚）"""
+        serializer = OrgUnitBulkMoveSerializer(data=request.data)
+
+        if serializer.is_valid():
+            try:
+                count = bulk_move_units(serializer.validated_data['operations'])
+            except ValidationError as e:
+                return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response({'message': '批量移动成功', 'count': count})
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=True, methods=['get'])
     def members(self, request, pk=None):
         """获取部门成员列表"""
         unit = self.get_object()
-        memberships = unit.memberships.select_related('user__real_name', 'unit').filter(
+        memberships = unit.memberships.select_related('user', 'unit').filter(
             effective_to__isnull=True
         )
 
         # 是否包含子部门成员
         include_children = request.query_params.get('include_children', 'false').lower() == 'true'
         if include_children:
-            descendant_ids = [u.id for u in unit.get_descendants()]
             memberships = Membership.objects.filter(
-                unit_id__in=descendant_ids + [unit.id],
+                unit__path__startswith=unit.path,
                 effective_to__isnull=True
             ).select_related('user', 'unit')
 
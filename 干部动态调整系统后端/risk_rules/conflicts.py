@@ -0,0 +1,102 @@
+"""
+A库矛盾关系检查
+启用的 ConflictPair 组织为邻接表 {干部ID: (ConflictEdge, ...)}，按矛盾关系版本号缓存，
+版本号存于数据库（见 orgs/versions.py），矛盾关系增删改后在事务提交后递增（见 risk_rules/signals.py）。
+拖拽检查只把被调动干部的矛盾对象与目标单元成员比对，代价与该干部的矛盾关系数成正比，
+与单元人数无关
+"""
+
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from orgs.versions import bump_version, get_version
+from staffing.models import MembershipStatus, OrgMembership
+
+from .models import ConflictPair
+
+
+CONFLICT_VERSION_NAME = 'risk.conflicts'
+CONFLICT_CACHE_TIMEOUT = 60 * 60 * 24
+
+ConflictEdge = namedtuple('ConflictEdge', ['other_id', 'pair_id', 'conflict_type', 'severity'])
+
+# 进程内保留最近一次读取的邻接表，版本号未变时不必每次从缓存反序列化
+_local_index = (None, None)
+
+
+def get_conflict_version():
+    """获取矛盾关系版本号"""
+    return get_version(CONFLICT_VERSION_NAME)
+
+
+def bump_conflict_version():
+    """递增矛盾关系版本号，使邻接表缓存失效"""
+    bump_version(CONFLICT_VERSION_NAME)
+
+
+def bump_conflict_version_on_commit():
+    """在事务提交后递增版本号，避免并发读取把旧数据缓存到新版本下"""
+    transaction.on_commit(bump_conflict_version)
+
+
+def build_conflict_index():
+    """由启用的矛盾关系构建邻接表（每对关系在两名干部下各记一次）"""
+    index = {}
+    pairs = ConflictPair.objects.filter(is_active=True).values_list(
+        'id', 'cadre_a_id', 'cadre_b_id', 'conflict_type', 'severity'
+    ).order_by()
+    for pair_id, cadre_a, cadre_b, conflict_type, severity in pairs.iterator(chunk_size=5000):
+        index.setdefault(cadre_a, []).append(ConflictEdge(cadre_b, pair_id, conflict_type, severity))
+        index.setdefault(cadre_b, []).append(ConflictEdge(cadre_a, pair_id, conflict_type, severity))
+    return {cadre_id: tuple(edges) for cadre_id, edges in index.items()}
+
+
+def get_conflict_index():
+    """获取矛盾关系邻接表（按版本号缓存）"""
+    global _local_index
+    version = get_conflict_version()
+    if _local_index[0] == version:
+        return _local_index[1]
+
+    key = f'risk:conflicts:{version}:index'
+    index = cache.get(key)
+    if index is None:
+        index = build_conflict_index()
+        cache.set(key, index, CONFLICT_CACHE_TIMEOUT)
+    _local_index = (version, index)
+    return index
+
+
+def conflict_hits(cadre_id, members, index=None):
+    """
+    干部与一组成员之间的矛盾关系
+
+    Args:
+        cadre_id: 被调动的干部
+        members: 目标单元成员（支持 in 判断的集合）
+        index: 邻接表，默认取缓存
+
+    Returns:
+        命中的 ConflictEdge 列表
+    """
+    index = get_conflict_index() if index is None else index
+    return [edge for edge in index.get(cadre_id, ()) if edge.other_id in members and edge.other_id != cadre_id]
+
+
+def check_move(cadre_id, unit_id, index=None):
+    """
+    干部调入单元时的矛盾关系检查（按数据库中的当前在职成员）
+
+    只查询该干部的矛盾对象是否在目标单元，无矛盾关系时只读取版本号
+    """
+    edges = (get_conflict_index() if index is None else index).get(cadre_id, ())
+    if not edges:
+        return []
+    present = set(OrgMembership.objects.filter(
+        org_unit_id=unit_id,
+        status=MembershipStatus.ACTIVE,
+        cadre_id__in=[edge.other_id for edge in edges]
+    ).values_list('cadre_id', flat=True))
+    return [edge for edge in edges if edge.other_id in present]
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from risk_rules.scan import run_risk_scan
+
+
+class Command(BaseCommand):
+    help = '全量排查矛盾关系同处一个单元与 B库人员超比例的单元，报告存库供接口读取（建议每晚执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=None,
+            help='B库人员占比阈值（默认取 RISK_B_LIBRARY_RATIO_THRESHOLD）'
+        )
+
+    def handle(self, *args, **options):
+        report = run_risk_scan(threshold=options['threshold'])
+        print(f"矛盾关系同处一个单元: {report['conflict_count']} 对")
+        print(f"B库占比超过 {report['threshold']:.0%} 的单元: {report['unit_count']} 个")
+        print(f"用时 {report['duration_ms']} ms")
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:51
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('risk_rules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskScanReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generated_at', models.DateTimeField(db_index=True, verbose_name='生成时间')),
+                ('threshold', models.FloatField(verbose_name='B库占比阈值')),
+                ('duration_ms', models.IntegerField(verbose_name='用时（毫秒）')),
+                ('conflict_count', models.IntegerField(verbose_name='矛盾同处数')),
+                ('unit_count', models.IntegerField(verbose_name='B库超比例单元数')),
+                ('report', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='报告内容')),
+            ],
+            options={
+                'verbose_name': '风险排查报告',
+                'verbose_name_plural': '风险排查报告',
+                'ordering': ['-generated_at'],
+            },
+        ),
+    ]
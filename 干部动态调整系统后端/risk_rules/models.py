@@ -2,6 +2,7 @@ import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from cadres.models import Cadre
 
 
@@ -147,3 +148,21 @@ class ConflictPair(models.Model):
             self.cadre_a, self.cadre_b = self.cadre_b, self.cadre_a
 
         super().save(*args, **kwargs)
+
+
+class RiskScanReport(models.Model):
+    """风险全量排查报告（见 risk_rules/scan.py），存库供各进程读取最近一份"""
+    generated_at = models.DateTimeField('生成时间', db_index=True)
+    threshold = models.FloatField('B库占比阈值')
+    duration_ms = models.IntegerField('用时（毫秒）')
+    conflict_count = models.IntegerField('矛盾同处数')
+    unit_count = models.IntegerField('B库超比例单元数')
+    report = models.JSONField('报告内容', encoder=DjangoJSONEncoder)
+
+    class Meta:
+        verbose_name = '风险排查报告'
+        verbose_name_plural = '风险排查报告'
+        ordering = ['-generated_at']
+
+    def __str__(self):
+        return f"风险排查 {self.generated_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,122 @@
+"""
+风险全量排查
+两项检查均由数据库完成，不在 Python 中逐对比较：
+    矛盾同处    启用的 ConflictPair 两名干部的在职主归属为同一单元
+                （ConflictPair 与两侧 OrgMembership 按单元相等连接）
+    B库超比例   直属 B库占比（analytics.metrics.direct_b_library_counts，与调整明细风险快照同一口径）
+                超过阈值的单元
+报告存入 RiskScanReport 表，由 scan_risks 命令定期生成，接口读取最近一份；
+不放在缓存中，本地内存缓存下命令进程写入的报告 Web 进程读不到
+"""
+
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from analytics.metrics import direct_b_library_counts
+from staffing.models import MembershipStatus
+
+from .models import ConflictPair, RiskScanReport
+
+
+# 保留的历史报告份数
+DEFAULT_REPORT_KEEP = 30
+
+
+def colocated_conflicts():
+    """在职主归属为同一单元的启用矛盾关系"""
+    membership = {
+        'status': MembershipStatus.ACTIVE,
+        'is_primary': True,
+    }
+    # 同一 filter() 中对多值关系的条件作用于同一连接，两侧各连接一次在职主归属
+    return ConflictPair.objects.filter(
+        is_active=True,
+        **{f'cadre_a__memberships__{field}': value for field, value in membership.items()},
+        **{f'cadre_b__memberships__{field}': value for field, value in membership.items()},
+        cadre_a__memberships__org_unit=F('cadre_b__memberships__org_unit'),
+    ).values(
+        'id', 'conflict_type', 'severity',
+        'cadre_a_id', 'cadre_a__name', 'cadre_b_id', 'cadre_b__name',
+        unit_id=F('cadre_a__memberships__org_unit_id'),
+        unit_name=F('cadre_a__memberships__org_unit__name'),
+    ).order_by('unit_name', 'cadre_a__name', 'id')
+
+
+def b_library_overloaded_units(threshold):
+    """直属 B库占比超过阈值的单元"""
+    return direct_b_library_counts('org_unit__name', 'org_unit__unit_type').filter(
+        direct_b_library_ratio__gt=threshold
+    ).order_by('-direct_b_library_ratio', 'org_unit__name')
+
+
+def run_risk_scan(threshold=None):
+    """
+    执行全量排查并保存报告（只保留最近 RISK_SCAN_REPORT_KEEP 份）
+
+    Args:
+        threshold: B库占比阈值，默认取 RISK_B_LIBRARY_RATIO_THRESHOLD
+
+    Returns:
+        报告字典（与存库内容相同）
+    """
+    if threshold is None:
+        threshold = settings.RISK_B_LIBRARY_RATIO_THRESHOLD
+    started = time.monotonic()
+
+    conflicts = [
+        {
+            'pair': row['id'],
+            'unit': row['unit_id'],
+            'unit_name': row['unit_name'],
+            'cadre_a': row['cadre_a_id'],
+            'cadre_a_name': row['cadre_a__name'],
+            'cadre_b': row['cadre_b_id'],
+            'cadre_b_name': row['cadre_b__name'],
+            'conflict_type': row['conflict_type'],
+            'severity': row['severity'],
+        }
+        for row in colocated_conflicts()
+    ]
+    units = [
+        {
+            'unit': row['org_unit_id'],
+            'unit_name': row['org_unit__name'],
+            'unit_type': row['org_unit__unit_type'],
+            'direct_headcount': row['direct_headcount'],
+            'direct_b_library_count': row['direct_b_library_count'],
+            'direct_b_library_ratio': round(row['direct_b_library_ratio'], 4),
+        }
+        for row in b_library_overloaded_units(threshold)
+    ]
+
+    report = {
+        'generated_at': timezone.now(),
+        'duration_ms': round((time.monotonic() - started) * 1000),
+        'threshold': threshold,
+        'conflict_count': len(conflicts),
+        'unit_count': len(units),
+        'conflicts': conflicts,
+        'units': units,
+    }
+    saved = RiskScanReport.objects.create(
+        generated_at=report['generated_at'],
+        threshold=threshold,
+        duration_ms=report['duration_ms'],
+        conflict_count=report['conflict_count'],
+        unit_count=report['unit_count'],
+        report=report,
+    )
+    keep = getattr(settings, 'RISK_SCAN_REPORT_KEEP', DEFAULT_REPORT_KEEP)
+    stale = RiskScanReport.objects.order_by('-generated_at').values_list('id', flat=True)[keep:]
+    RiskScanReport.objects.filter(id__in=list(stale)).delete()
+    # 返回存库后的内容，与之后读取的报告一致（时间按 JSON 编码精度截断）
+    saved.refresh_from_db(fields=['report'])
+    return saved.report
+
+
+def get_risk_scan_report():
+    """最近一次排查报告；尚未排查过时返回 None"""
+    return RiskScanReport.objects.order_by('-generated_at').values_list('report', flat=True).first()
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .conflicts import bump_conflict_version_on_commit
+from .models import ConflictPair
+
+
+@receiver(post_save, sender=ConflictPair)
+@receiver(post_delete, sender=ConflictPair)
+def invalidate_conflict_index(sender, **kwargs):
+    """矛盾关系新增/修改/停用/删除后使邻接表缓存失效"""
+    bump_conflict_version_on_commit()
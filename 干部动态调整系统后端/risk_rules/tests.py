@@ -1,3 +1,116 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from cadres.models import Cadre
+from orgs.models import CacheVersion, OrgUnit, UnitType
+from staffing.models import OrgMembership
+
+from .conflicts import CONFLICT_VERSION_NAME, check_move, get_conflict_index, get_conflict_version
+from .models import ConflictPair, RiskPersonTag, RiskScanReport
+from .scan import get_risk_scan_report, run_risk_scan
+
+
+class RiskTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.unit_a = OrgUnit.objects.create(name='甲', unit_type=UnitType.DEPARTMENT)
+        self.unit_b = OrgUnit.objects.create(name='乙', unit_type=UnitType.DEPARTMENT)
+        self.zhang = self.make_cadre('张一', self.unit_a)
+        self.li = self.make_cadre('李二', self.unit_a)
+        self.wang = self.make_cadre('王三', self.unit_b)
+
+    def make_cadre(self, name, unit, **kwargs):
+        cadre = Cadre.objects.create(cadre_code=f'C{Cadre.objects.count() + 1:03d}', name=name)
+        OrgMembership.objects.create(cadre=cadre, org_unit=unit, start_date=date(2020, 1, 1), **kwargs)
+        return cadre
+
+
+class ConflictIndexTests(RiskTestCase):
+    """矛盾关系邻接表"""
+
+    def test_index_rebuilt_after_commit(self):
+        self.assertEqual(get_conflict_index(), {})
+        version = get_conflict_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pair = ConflictPair.objects.create(cadre_a=self.zhang, cadre_b=self.wang)
+        self.assertNotEqual(get_conflict_version(), version)
+        index = get_conflict_index()
+        self.assertEqual([edge.other_id for edge in index[self.zhang.pk]], [self.wang.pk])
+        self.assertEqual([edge.other_id for edge in index[self.wang.pk]], [self.zhang.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pair.is_active = False
+            pair.save()
+        self.assertEqual(get_conflict_index(), {})
+
+    def test_version_is_shared_through_database(self):
+        self.assertEqual(get_conflict_index(), {})
+        # 模拟其他进程新增矛盾关系并递增版本号：本进程的邻接表随即重建
+        ConflictPair.objects.create(cadre_a=self.zhang, cadre_b=self.wang)
+        CacheVersion.objects.filter(name=CONFLICT_VERSION_NAME).update(version=F('version') + 1)
+        self.assertIn(self.zhang.pk, get_conflict_index())
+
+    def test_check_move_compares_target_members(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ConflictPair.objects.create(cadre_a=self.zhang, cadre_b=self.wang)
+
+        self.assertEqual([edge.other_id for edge in check_move(self.zhang.pk, self.unit_b.pk)], [self.wang.pk])
+        self.assertEqual(check_move(self.zhang.pk, self.unit_a.pk), [])
+        with self.assertNumQueries(1):
+            # 只读取版本号
+            self.assertEqual(check_move(self.li.pk, self.unit_b.pk), [])
+
+
+class RiskScanTests(RiskTestCase):
+    """风险全量排查"""
+
+    def setUp(self):
+        super().setUp()
+        ConflictPair.objects.create(cadre_a=self.zhang, cadre_b=self.li)
+        ConflictPair.objects.create(cadre_a=self.zhang, cadre_b=self.wang)
+        RiskPersonTag.objects.create(cadre=self.li)
+        RiskPersonTag.objects.create(cadre=self.wang, is_active=False)
+
+    def test_reports_colocated_conflicts_and_overloaded_units(self):
+        report = run_risk_scan(threshold=0.2)
+
+        self.assertEqual(report['conflict_count'], 1)
+        conflict = report['conflicts'][0]
+        self.assertEqual(conflict['unit'], str(self.unit_a.pk))
+        self.assertEqual({conflict['cadre_a'], conflict['cadre_b']}, {str(self.zhang.pk), str(self.li.pk)})
+        # 停用的 B库标签不计入
+        self.assertEqual([unit['unit'] for unit in report['units']], [str(self.unit_a.pk)])
+        self.assertEqual(report['units'][0]['direct_b_library_ratio'], 0.5)
+
+    def test_part_time_membership_is_not_colocation(self):
+        self.make_cadre('赵四', self.unit_b)
+        OrgMembership.objects.create(cadre=self.wang, org_unit=self.unit_a, is_primary=False, start_date=date(2020, 1, 1))
+        self.assertEqual(run_risk_scan(threshold=0.2)['conflict_count'], 1)
+
+    @override_settings(RISK_SCAN_REPORT_KEEP=2)
+    def test_reports_persisted_and_pruned(self):
+        self.assertIsNone(get_risk_scan_report())
+        for threshold in (0.1, 0.2, 0.3):
+            run_risk_scan(threshold=threshold)
+
+        self.assertEqual(RiskScanReport.objects.count(), 2)
+        self.assertEqual(get_risk_scan_report()['threshold'], 0.3)
+
+    def test_scan_endpoint_reads_latest_report(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'a@a.com', 'x', real_name='管理员'))
+
+        response = client.get('/api/risk/scan/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RiskScanReport.objects.count(), 1)
+        self.assertEqual(client.get('/api/risk/scan/').json(), response.json())
+
+        self.assertEqual(client.post('/api/risk/scan/').status_code, 200)
+        self.assertEqual(RiskScanReport.objects.count(), 2)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import RiskScanView
+
+urlpatterns = [
+    path('scan/', RiskScanView.as_view(), name='risk-scan'),
+]
@@ -1,3 +1,25 @@
-from django.shortcuts import render
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from accounts.permissions import CanManageRiskData
+
+from .scan import get_risk_scan_report, run_risk_scan
+
+
+class RiskScanView(APIView):
+    """
+    风险全量排查报告
+    GET  /api/risk/scan/  最近一次报告（尚无报告时立即排查一次）
+    POST /api/risk/scan/  立即重新排查
+    """
+    permission_classes = [IsAuthenticated, CanManageRiskData]
+
+    def get(self, request):
+        report = get_risk_scan_report()
+        if report is None:
+            report = run_risk_scan()
+        return Response(report)
+
+    def post(self, request):
+        return Response(run_risk_scan())
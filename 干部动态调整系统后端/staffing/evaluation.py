@@ -0,0 +1,100 @@
+"""
+调整动作风险评估
+在方案推演（staffing.simulation）上逐个叠加动作，记录每个动作带来的：
+    conflicts     被调动干部与目标单元成员之间的矛盾关系
+    target/source 目标单元、原单元直属成员的关键结构指标在该动作前后的值与差值，
+                  B库占比为 direct_b_library_ratio（与风险排查同一口径，见 analytics.metrics）
+结果写入 StaffingPlanMove.risk_snapshot，审阅方案时直接读取，不再逐条重算
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MoveType, PlanStatus, StaffingPlan, StaffingPlanMove
+from .simulation import PlanSimulation, as_move, saved_moves
+
+
+# 风险快照中记录的关键指标（均按直属成员）
+KEY_METRICS = ['direct_headcount', 'direct_average_age', 'direct_b_library_count', 'direct_b_library_ratio']
+
+
+def _key_metrics(metrics):
+    return {
+        'direct_headcount': metrics['headcount'],
+        'direct_average_age': metrics['average_age'],
+        'direct_b_library_count': metrics['b_library']['count'],
+        'direct_b_library_ratio': metrics['b_library']['ratio'],
+    }
+
+
+def _unit_change(unit_id, before, after):
+    before, after = _key_metrics(before), _key_metrics(after)
+    return {
+        'unit': str(unit_id),
+        'before': before,
+        'after': after,
+        'delta': {
+            key: None if before[key] is None or after[key] is None else round(after[key] - before[key], 4)
+            for key in KEY_METRICS
+        },
+    }
+
+
+def evaluate_move(simulation, move):
+    """
+    在推演上叠加一个动作并评估其风险
+
+    Returns:
+        风险快照（可直接存入 JSONField）
+    """
+    move = as_move(move)
+    simulation.validate(move)
+    source_id = simulation.source_unit(move) if move.move_type != MoveType.ASSIGN else None
+    target_id = move.to_unit_id if move.move_type != MoveType.REMOVE else None
+    unit_ids = [unit_id for unit_id in (source_id, target_id) if unit_id is not None]
+
+    before = simulation.direct_metrics(unit_ids)
+    hits = simulation.check(move)
+    after = simulation.direct_metrics(unit_ids)
+
+    return {
+        'conflicts': [
+            {
+                'pair': str(edge.pair_id),
+                'other': str(edge.other_id),
+                'conflict_type': edge.conflict_type,
+                'severity': edge.severity,
+            }
+            for edge in hits
+        ],
+        'target': _unit_change(target_id, before[target_id], after[target_id]) if target_id else None,
+        'source': _unit_change(source_id, before[source_id], after[source_id]) if source_id else None,
+        'evaluated_at': timezone.now().isoformat(),
+    }
+
+
+def add_moves(plan, moves):
+    """
+    批量添加调整动作：按顺序在方案已有动作之后评估风险，一次写入
+
+    Args:
+        plan: 草案状态的 StaffingPlan
+        moves: 未保存的 StaffingPlanMove 列表（plan 可不设置）
+
+    Returns:
+        已保存的 StaffingPlanMove 列表
+
+    Raises:
+        ValueError: 方案不是草案，动作涉及的干部/单元不存在，或干部不在调动/移除的原单元
+    """
+    with transaction.atomic():
+        # 锁定方案，并发添加时按顺序评估，后写入的动作基于先写入的动作推演
+        plan = StaffingPlan.objects.select_for_update().get(pk=plan.pk)
+        if plan.status != PlanStatus.DRAFT:
+            raise ValueError('只有草案状态的方案可以添加调整明细')
+
+        simulation = PlanSimulation(saved_moves(plan), pending=moves)
+        for move in moves:
+            move.plan = plan
+            move.risk_snapshot = evaluate_move(simulation, move)
+        return StaffingPlanMove.objects.bulk_create(moves, batch_size=500)
@@ -0,0 +1,42 @@
+from rest_framework import serializers
+from .models import MoveType, StaffingPlanMove
+
+
+class DraftMoveSerializer(serializers.Serializer):
+    """调整动作输入（拖拽中的推演或添加到方案）"""
+    cadre = serializers.UUIDField()
+    move_type = serializers.ChoiceField(choices=MoveType.choices, default=MoveType.TRANSFER)
+    from_unit = serializers.UUIDField(required=False, allow_null=True, default=None)
+    to_unit = serializers.UUIDField(required=False, allow_null=True, default=None)
+    reason = serializers.CharField(required=False, allow_blank=True, max_length=200, default='')
+
+    def validate(self, attrs):
+        if attrs['move_type'] in (MoveType.ASSIGN, MoveType.TRANSFER) and not attrs['to_unit']:
+            raise serializers.ValidationError({'to_unit': '分配/调动需指定目标单元'})
+        return attrs
+
+
+class PlanSimulationSerializer(serializers.Serializer):
+    """推演请求：在方案已保存的动作之后叠加的动作"""
+    moves = DraftMoveSerializer(many=True, required=False, default=list)
+
+
+class AddMovesSerializer(serializers.Serializer):
+    """批量添加调整明细"""
+    moves = DraftMoveSerializer(many=True, allow_empty=False)
+
+
+class StaffingPlanMoveSerializer(serializers.ModelSerializer):
+    """调整明细序列化器（含添加时生成的风险快照）"""
+    cadre_name = serializers.CharField(source='cadre.name', read_only=True)
+    from_unit_name = serializers.CharField(source='from_unit.name', read_only=True, default=None)
+    to_unit_name = serializers.CharField(source='to_unit.name', read_only=True, default=None)
+    move_type_display = serializers.CharField(source='get_move_type_display', read_only=True)
+
+    class Meta:
+        model = StaffingPlanMove
+        fields = [
+            'id', 'plan', 'cadre', 'cadre_name', 'from_unit', 'from_unit_name', 'to_unit', 'to_unit_name',
+            'move_type', 'move_type_display', 'reason', 'risk_snapshot', 'created_by', 'created_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,216 @@
+"""
+调整方案推演
+不写 OrgMembership，在内存中得到方案生效后的组织状态：
+    1. 取方案涉及的单元（调动的原单元/目标单元、被调动干部当前的主归属单元）的在职成员，
+       以 {单元ID: 干部ID集合} 与 {干部ID: 指标属性} 保存
+    2. 按顺序叠加调整动作，得到推演后的成员
+    3. 推演前后的结构指标由 analytics.metrics.summarize 按直属成员（主/兼职在职归属）计算，
+       不含下级单位，也不投影到上级单位，与 metrics_snapshot / UnitMetric 的含下级口径不同；
+       结果中以 direct_before / direct_after 区分
+    4. 矛盾关系只检查被调动干部与其推演后所在单元的成员（见 risk_rules.conflicts）
+每次推演固定 4~5 次查询（含读取方案动作），与全组织规模无关
+"""
+
+from collections import namedtuple
+
+from analytics.metrics import MEMBERSHIP_ATTRIBUTE_FIELDS, cadre_attributes, in_library_annotation, summarize
+from cadres.models import Cadre
+from orgs.models import OrgUnit
+from risk_rules.conflicts import conflict_hits, get_conflict_index
+
+from .models import MembershipStatus, MoveType, OrgMembership
+
+
+Move = namedtuple('Move', ['cadre_id', 'move_type', 'from_unit_id', 'to_unit_id'])
+
+
+def as_move(move):
+    """StaffingPlanMove 或含相同字段的对象 -> Move"""
+    return Move(move.cadre_id, move.move_type, move.from_unit_id, move.to_unit_id)
+
+
+class PlanSimulation:
+    """
+    方案推演
+
+    Args:
+        moves: 调整动作（StaffingPlanMove 或 Move），按先后顺序叠加
+        unit_ids: 额外需要给出结果的单元
+        pending: 稍后逐个叠加的动作（如 check/evaluate_move），只预先载入其涉及的干部与单元
+    """
+
+    def __init__(self, moves, unit_ids=(), pending=()):
+        moves = [as_move(move) for move in moves]
+        self.baseline = {}
+        self.projected = {}
+        self.attributes = {}
+        self.primary_units = {}
+        self.units = {}
+        self.moved = {}
+        self._load([*moves, *(as_move(move) for move in pending)], set(unit_ids))
+        for move in moves:
+            self.apply(move)
+
+    def _load(self, moves, unit_ids):
+        cadre_ids = {move.cadre_id for move in moves}
+        unit_ids |= {unit_id for move in moves for unit_id in (move.from_unit_id, move.to_unit_id) if unit_id}
+
+        # 被调动干部的当前归属与属性
+        active = OrgMembership.objects.filter(status=MembershipStatus.ACTIVE).annotate(
+            in_library=in_library_annotation()
+        ).order_by()
+        for cadre_id, unit_id, is_primary, *values in active.filter(cadre_id__in=cadre_ids).values_list(
+            'cadre_id', 'org_unit_id', 'is_primary', *MEMBERSHIP_ATTRIBUTE_FIELDS
+        ):
+            self.attributes[cadre_id] = cadre_attributes(*values)
+            if is_primary:
+                self.primary_units[cadre_id] = unit_id
+        unit_ids |= set(self.primary_units.values())
+
+        # 尚无归属的干部（首次分配）
+        missing = cadre_ids - set(self.attributes)
+        if missing:
+            for cadre_id, *values in Cadre.objects.filter(id__in=missing).annotate(
+                in_library=in_library_annotation('pk')
+            ).values_list('id', *(field.replace('cadre__', '') for field in MEMBERSHIP_ATTRIBUTE_FIELDS)):
+                self.attributes[cadre_id] = cadre_attributes(*values)
+            missing -= set(self.attributes)
+            if missing:
+                raise ValueError(f'干部不存在: {", ".join(str(cadre_id) for cadre_id in sorted(missing))}')
+
+        self.units = {
+            unit_id: {'name': name, 'unit_type': unit_type}
+            for unit_id, name, unit_type in OrgUnit.objects.filter(id__in=unit_ids).values_list('id', 'name', 'unit_type')
+        }
+        missing = unit_ids - set(self.units)
+        if missing:
+            raise ValueError(f'组织单元不存在: {", ".join(str(unit_id) for unit_id in sorted(missing))}')
+
+        # 涉及单元的全部在职成员
+        self.baseline = {unit_id: set() for unit_id in unit_ids}
+        for unit_id, cadre_id, *values in active.filter(org_unit_id__in=unit_ids).values_list(
+            'org_unit_id', 'cadre_id', *MEMBERSHIP_ATTRIBUTE_FIELDS
+        ):
+            self.baseline[unit_id].add(cadre_id)
+            if cadre_id not in self.attributes:
+                self.attributes[cadre_id] = cadre_attributes(*values)
+        self.projected = {unit_id: set(members) for unit_id, members in self.baseline.items()}
+
+    def apply(self, move):
+        """
+        叠加一个调整动作
+
+        调动/移除未指定原单元时按干部当前主归属处理；目标单元须已在推演范围内
+        """
+        move = as_move(move)
+        self.moved[move.cadre_id] = None
+        if move.move_type in (MoveType.TRANSFER, MoveType.REMOVE):
+            from_unit_id = self.source_unit(move)
+            if from_unit_id is not None:
+                self.projected[from_unit_id].discard(move.cadre_id)
+                if self.primary_units.get(move.cadre_id) == from_unit_id:
+                    del self.primary_units[move.cadre_id]
+        if move.move_type in (MoveType.TRANSFER, MoveType.ASSIGN) and move.to_unit_id:
+            self.projected[move.to_unit_id].add(move.cadre_id)
+            if move.move_type == MoveType.TRANSFER:
+                self.primary_units[move.cadre_id] = move.to_unit_id
+
+    def validate(self, move):
+        """
+        校验动作与推演状态一致：调动/移除的原单元须为干部推演中的在职单元
+
+        Raises:
+            ValueError: 干部不在指定的原单元，或移除时干部没有在职主归属
+        """
+        move = as_move(move)
+        if move.move_type not in (MoveType.TRANSFER, MoveType.REMOVE):
+            return
+        from_unit_id = self.source_unit(move)
+        if from_unit_id is None:
+            if move.move_type == MoveType.REMOVE:
+                raise ValueError(f'干部没有在职主归属，无法移除: {move.cadre_id}')
+        elif move.cadre_id not in self.projected[from_unit_id]:
+            raise ValueError(f'干部 {move.cadre_id} 不在原单元 {from_unit_id}')
+
+    def source_unit(self, move):
+        """调动/移除的原单元：未指定时取干部推演中的当前主归属"""
+        return move.from_unit_id or self.primary_units.get(move.cadre_id)
+
+    def members(self, unit_id, projected=True):
+        """单元成员（干部ID集合）"""
+        return (self.projected if projected else self.baseline)[unit_id]
+
+    def direct_metrics(self, unit_ids=None, projected=True):
+        """
+        各单元直属成员的结构指标（不含下级单位）
+
+        Returns:
+            {单元ID: 指标}
+        """
+        unit_ids = list(self.baseline if unit_ids is None else unit_ids)
+        state = self.projected if projected else self.baseline
+        unit_of, attributes = [], []
+        for position, unit_id in enumerate(unit_ids):
+            for cadre_id in state[unit_id]:
+                unit_of.append(position)
+                attributes.append(self.attributes[cadre_id])
+        return dict(zip(unit_ids, summarize(unit_of, attributes, len(unit_ids))))
+
+    def check(self, move):
+        """
+        叠加一个调整动作并检查矛盾关系：只比对被调动干部与目标单元推演后的成员
+
+        Returns:
+            命中的 ConflictEdge 列表
+        """
+        move = as_move(move)
+        self.apply(move)
+        if not move.to_unit_id or move.move_type == MoveType.REMOVE:
+            return []
+        return conflict_hits(move.cadre_id, self.projected[move.to_unit_id])
+
+    def conflicts(self):
+        """推演后被调动干部与所在单元成员之间的矛盾关系（每个单元内每对关系只列一次）"""
+        index = get_conflict_index()
+        hits, seen = [], set()
+        for unit_id, members in self.projected.items():
+            for cadre_id in self.moved:
+                if cadre_id not in members:
+                    continue
+                for edge in conflict_hits(cadre_id, members, index):
+                    if (unit_id, edge.pair_id) in seen:
+                        continue
+                    seen.add((unit_id, edge.pair_id))
+                    hits.append({
+                        'unit': unit_id,
+                        'pair': edge.pair_id,
+                        'cadre': cadre_id,
+                        'other': edge.other_id,
+                        'conflict_type': edge.conflict_type,
+                        'severity': edge.severity,
+                    })
+        return hits
+
+    def result(self):
+        """推演结果：各涉及单元推演后的成员、增减与前后的直属成员指标"""
+        before = self.direct_metrics(projected=False)
+        after = self.direct_metrics()
+        return [
+            {
+                'unit': unit_id,
+                'unit_name': self.units[unit_id]['name'],
+                'unit_type': self.units[unit_id]['unit_type'],
+                'members': sorted(self.projected[unit_id], key=str),
+                'added': sorted(self.projected[unit_id] - self.baseline[unit_id], key=str),
+                'removed': sorted(self.baseline[unit_id] - self.projected[unit_id], key=str),
+                'direct_before': before[unit_id],
+                'direct_after': after[unit_id],
+            }
+            for unit_id in self.baseline
+        ]
+
+
+def saved_moves(plan):
+    """方案已保存的调整动作（按创建时间）"""
+    return list(plan.moves.order_by('created_at', 'id').only('cadre_id', 'move_type', 'from_unit_id', 'to_unit_id'))
+
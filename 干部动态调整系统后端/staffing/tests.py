@@ -1,3 +1,141 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from cadres.models import Cadre
+from orgs.models import OrgUnit, UnitType
+from risk_rules.models import ConflictPair, RiskPersonTag
+
+from .evaluation import add_moves
+from .models import MoveType, OrgMembership, PlanStatus, StaffingPlan, StaffingPlanMove
+from .simulation import Move, PlanSimulation
+
+
+class StaffingTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser('admin', 'a@a.com', 'x', real_name='管理员')
+        self.root = OrgUnit.objects.create(name='根', unit_type=UnitType.DEPARTMENT)
+        self.unit_a = OrgUnit.objects.create(name='甲', parent=self.root, unit_type=UnitType.DEPARTMENT)
+        self.unit_b = OrgUnit.objects.create(name='乙', parent=self.root, unit_type=UnitType.DEPARTMENT)
+        self.zhang = self.make_cadre('张一', self.unit_a, date(1980, 1, 1))
+        self.li = self.make_cadre('李二', self.unit_a, date(1990, 1, 1))
+        self.wang = self.make_cadre('王三', self.unit_b, date(1985, 1, 1))
+        self.plan = StaffingPlan.objects.create(title='方案', created_by=self.user)
+
+    def make_cadre(self, name, unit, birth_date):
+        cadre = Cadre.objects.create(cadre_code=f'C{Cadre.objects.count() + 1:03d}', name=name, birth_date=birth_date)
+        OrgMembership.objects.create(cadre=cadre, org_unit=unit, start_date=date(2020, 1, 1))
+        return cadre
+
+    def transfer(self, cadre, from_unit, to_unit):
+        return StaffingPlanMove(
+            cadre=cadre, move_type=MoveType.TRANSFER, from_unit=from_unit, to_unit=to_unit, created_by=self.user
+        )
+
+
+class PlanSimulationTests(StaffingTestCase):
+    """方案推演"""
+
+    def test_transfer_updates_direct_metrics(self):
+        simulation = PlanSimulation([Move(self.li.pk, MoveType.TRANSFER, self.unit_a.pk, self.unit_b.pk)])
+        result = {row['unit']: row for row in simulation.result()}
+
+        self.assertEqual(result[self.unit_a.pk]['removed'], [self.li.pk])
+        self.assertEqual(result[self.unit_b.pk]['added'], [self.li.pk])
+        self.assertEqual(result[self.unit_a.pk]['direct_before']['headcount'], 2)
+        self.assertEqual(result[self.unit_a.pk]['direct_after']['headcount'], 1)
+        self.assertEqual(result[self.unit_b.pk]['direct_after']['headcount'], 2)
+        # 直属口径：上级单元不在推演结果中
+        self.assertNotIn(self.root.pk, result)
+
+    def test_does_not_write_memberships(self):
+        PlanSimulation([Move(self.li.pk, MoveType.TRANSFER, None, self.unit_b.pk)]).result()
+        self.assertEqual(OrgMembership.objects.get(cadre=self.li).org_unit, self.unit_a)
+
+    def test_validate_rejects_wrong_source_unit(self):
+        move = Move(self.li.pk, MoveType.TRANSFER, self.unit_b.pk, self.root.pk)
+        simulation = PlanSimulation([], pending=[move])
+        with self.assertRaises(ValueError):
+            simulation.validate(move)
+
+    def test_validate_follows_projected_state(self):
+        removal = Move(self.li.pk, MoveType.REMOVE, None, None)
+        assign = Move(self.li.pk, MoveType.ASSIGN, None, self.unit_b.pk)
+        simulation = PlanSimulation([removal], pending=[assign])
+        with self.assertRaises(ValueError):
+            simulation.validate(removal)
+        # 移除后再分配并调动是合法的
+        simulation.apply(assign)
+        simulation.validate(Move(self.li.pk, MoveType.TRANSFER, self.unit_b.pk, self.unit_a.pk))
+
+
+class AddMovesTests(StaffingTestCase):
+    """批量添加调整明细与风险快照"""
+
+    def test_snapshot_records_conflicts_and_metrics(self):
+        ConflictPair.objects.create(cadre_a=self.li, cadre_b=self.wang)
+        RiskPersonTag.objects.create(cadre=self.li)
+
+        created = add_moves(self.plan, [self.transfer(self.li, self.unit_a, self.unit_b)])
+
+        snapshot = StaffingPlanMove.objects.get(pk=created[0].pk).risk_snapshot
+        self.assertEqual([hit['other'] for hit in snapshot['conflicts']], [str(self.wang.pk)])
+        self.assertEqual(snapshot['target']['before']['direct_headcount'], 1)
+        self.assertEqual(snapshot['target']['after']['direct_b_library_ratio'], 0.5)
+        self.assertEqual(snapshot['source']['delta']['direct_headcount'], -1)
+
+    def test_later_moves_build_on_saved_moves(self):
+        add_moves(self.plan, [self.transfer(self.li, self.unit_a, self.unit_b)])
+        created = add_moves(self.plan, [self.transfer(self.zhang, self.unit_a, self.unit_b)])
+        self.assertEqual(created[0].risk_snapshot['target']['before']['direct_headcount'], 2)
+
+        # 李二已在推演中调出甲，不能再从甲调出
+        with self.assertRaises(ValueError):
+            add_moves(self.plan, [self.transfer(self.li, self.unit_a, self.root)])
+        self.assertEqual(self.plan.moves.count(), 2)
+
+    def test_rejects_non_draft_plan(self):
+        StaffingPlan.objects.filter(pk=self.plan.pk).update(status=PlanStatus.SUBMITTED)
+        with self.assertRaises(ValueError):
+            add_moves(self.plan, [self.transfer(self.li, self.unit_a, self.unit_b)])
+
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class PlanApiTests(StaffingTestCase):
+    """方案推演与明细接口"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_add_moves(self):
+        response = self.client.post(f'/api/staffing/plans/{self.plan.pk}/moves/', {
+            'moves': [{'cadre': str(self.li.pk), 'from_unit': str(self.unit_a.pk), 'to_unit': str(self.unit_b.pk)}]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data[0]['risk_snapshot']['target']['after']['direct_headcount'], 2)
+
+        response = self.client.get(f'/api/staffing/plans/{self.plan.pk}/moves/')
+        self.assertEqual(len(response.data), 1)
+
+    def test_invalid_source_unit_is_rejected(self):
+        moves = {'moves': [{'cadre': str(self.li.pk), 'from_unit': str(self.unit_b.pk), 'to_unit': str(self.root.pk)}]}
+        for url in ('moves', 'simulation'):
+            response = self.client.post(f'/api/staffing/plans/{self.plan.pk}/{url}/', moves, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('moves', response.data)
+
+    def test_simulation(self):
+        response = self.client.post(f'/api/staffing/plans/{self.plan.pk}/simulation/', {
+            'moves': [{'cadre': str(self.li.pk), 'to_unit': str(self.unit_b.pk)}]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['evaluations']), 1)
+        self.assertEqual({row['unit'] for row in response.data['units']}, {self.unit_a.pk, self.unit_b.pk})
+        self.assertFalse(self.plan.moves.exists())
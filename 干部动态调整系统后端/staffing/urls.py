@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import PlanMovesView, PlanSimulationView
+
+urlpatterns = [
+    path('plans/<uuid:pk>/simulation/', PlanSimulationView.as_view(), name='plan-simulation'),
+    path('plans/<uuid:pk>/moves/', PlanMovesView.as_view(), name='plan-moves'),
+]
@@ -1,3 +1,107 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from accounts.permissions import HasPermissionCode
+from accounts.views import get_client_ip
+from audit.models import AuditAction
+from audit.writer import record_audit
+
+from .evaluation import add_moves, evaluate_move
+from .models import StaffingPlan, StaffingPlanMove
+from .serializers import AddMovesSerializer, PlanSimulationSerializer, StaffingPlanMoveSerializer
+from .simulation import Move, PlanSimulation, saved_moves
+
+
+class PlanSimulationView(APIView):
+    """
+    调整方案推演（不写入归属）
+    GET  /api/staffing/plans/{id}/simulation/  按方案已保存的动作推演
+    POST /api/staffing/plans/{id}/simulation/  {"moves": [...]} 在已保存动作之后叠加拖拽中的动作
+
+    返回各涉及单元推演前后的成员与直属成员指标，被调动干部在推演后所在单元的矛盾关系，
+    以及拖拽中各动作的风险评估（与添加明细时写入的风险快照一致）
+    """
+    permission_classes = [IsAuthenticated, HasPermissionCode]
+    permission_code = 'staffing:plan:create'
+
+    def get(self, request, pk):
+        return self.simulate(pk, [])
+
+    def post(self, request, pk):
+        serializer = PlanSimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        moves = [
+            Move(move['cadre'], move['move_type'], move['from_unit'], move['to_unit'])
+            for move in serializer.validated_data['moves']
+        ]
+        return self.simulate(pk, moves)
+
+    def simulate(self, pk, moves):
+        plan = get_object_or_404(StaffingPlan, pk=pk)
+        try:
+            simulation = PlanSimulation(saved_moves(plan), pending=moves)
+            evaluations = [evaluate_move(simulation, move) for move in moves]
+        except ValueError as error:
+            raise ValidationError({'moves': str(error)})
+        return Response({
+            'plan': plan.pk,
+            'units': simulation.result(),
+            'conflicts': simulation.conflicts(),
+            'evaluations': evaluations,
+        })
+
+
+class PlanMovesView(APIView):
+    """
+    调整明细
+    GET  /api/staffing/plans/{id}/moves/  明细列表（含风险快照）
+    POST /api/staffing/plans/{id}/moves/  {"moves": [...]} 批量添加，逐条评估风险后一次写入
+    """
+    permission_classes = [IsAuthenticated, HasPermissionCode]
+    permission_code = 'staffing:plan:create'
+
+    def get(self, request, pk):
+        plan = get_object_or_404(StaffingPlan, pk=pk)
+        moves = plan.moves.select_related('cadre', 'from_unit', 'to_unit').order_by('created_at', 'id')
+        return Response(StaffingPlanMoveSerializer(moves, many=True).data)
+
+    def post(self, request, pk):
+        plan = get_object_or_404(StaffingPlan, pk=pk)
+        serializer = AddMovesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        moves = [
+            StaffingPlanMove(
+                cadre_id=move['cadre'],
+                move_type=move['move_type'],
+                from_unit_id=move['from_unit'],
+                to_unit_id=move['to_unit'],
+                reason=move['reason'],
+                created_by=request.user,
+            )
+            for move in serializer.validated_data['moves']
+        ]
+        try:
+            created = add_moves(plan, moves)
+        except ValueError as error:
+            raise ValidationError({'moves': str(error)})
+
+        record_audit(
+            actor=request.user,
+            action=AuditAction.ADD_MOVE,
+            target_type='StaffingPlan',
+            target_id=plan.pk,
+            ip_address=get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            context={
+                'move_ids': [str(move.pk) for move in created],
+                'conflict_count': sum(len(move.risk_snapshot['conflicts']) for move in created),
+            }
+        )
+        moves = StaffingPlanMove.objects.filter(pk__in=[move.pk for move in created]).select_related(
+            'cadre', 'from_unit', 'to_unit'
+        ).order_by('created_at', 'id')
+        return Response(StaffingPlanMoveSerializer(moves, many=True).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,313 @@
+"""
+列表分页
+KeysetPagination 以排序字段的值作为游标（WHERE 排序键 > 上一页末行），
+任意深度翻页都只读取一页数据，不做 OFFSET 扫描。
+
+    ?cursor=...        按游标翻页（默认方式，响应中的 next/previous 即下一页/上一页链接）
+    ?page=N            兼容页码跳转（OFFSET），响应中同样返回游标链接，相邻翻页可改用游标
+    ?count=approx      默认，返回估算总数：无过滤条件时取表统计信息 pg_class.reltuples，
+                       有过滤条件时取执行计划的估算行数；估算值较小时改为精确计数
+    ?count=exact       返回精确总数（页码方式默认）
+    ?count=none        不返回总数
+
+排序键取查询集上的排序（如检索相关度），否则取视图的 keyset_ordering 或模型 Meta.ordering，
+并追加主键保证唯一。各表需有与排序键一致的组合索引。
+排序键可以经外键/一对一关联取值（如 user__username），不支持一对多、多对多关联与查找变换（如 __date）。
+"""
+
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models.constants import LOOKUP_SEP
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# 估算总数低于该值时改为精确计数（小结果集 COUNT 代价低，且估算误差相对更大）
+APPROXIMATE_COUNT_THRESHOLD = 10000
+
+
+def _table_estimate(queryset):
+    """表统计信息中的行数；分区表取各分区之和。未 ANALYZE 过时返回 None"""
+    table = queryset.model._meta.db_table
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE("
+            "  (SELECT SUM(GREATEST(c.reltuples, 0)) FROM pg_inherits i "
+            "   JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass),"
+            "  (SELECT reltuples FROM pg_class WHERE oid = %s::regclass))",
+            [table, table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _plan_estimate(queryset):
+    """执行计划估算的结果行数"""
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def approximate_count(queryset):
+    """
+    估算查询集的行数（仅 PostgreSQL，其他数据库直接精确计数）
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    estimate = _plan_estimate(queryset) if queryset.query.where else _table_estimate(queryset)
+    if estimate is None or estimate < APPROXIMATE_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        # 保留微秒，游标值需与数据库中的值完全相等
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """游标（键集）分页，兼容页码跳转"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    count_query_param = 'count'
+    default_count_mode = 'approx'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_ordering(queryset, view)
+        self.fields, self.nullable = zip(*(self._resolve_field(queryset.model, name) for name, _ in self.keys))
+
+        cursor = self.decode_cursor(request)
+        page = None if cursor is not None else self.get_page_number(request)
+
+        self.count = self.get_count(queryset, request)
+
+        reverse = cursor is not None and cursor[1]
+        queryset = queryset.order_by(*self._order_expressions(reverse))
+        if cursor is not None:
+            queryset = queryset.filter(self._position_filter(cursor[0], reverse))
+            rows = list(queryset[:self.page_size + 1])
+        else:
+            offset = ((page or 1) - 1) * self.page_size
+            rows = list(queryset[offset:offset + self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None or (page or 1) > 1
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_page_number(self, request):
+        value = request.query_params.get(self.page_query_param)
+        if value is None:
+            return None
+        try:
+            number = int(value)
+        except ValueError:
+            raise NotFound('无效的页码')
+        if number < 1:
+            raise NotFound('无效的页码')
+        return number
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode is None:
+            # 页码方式需要总页数，保持与原分页一致返回精确总数
+            paged = request.query_params.get(self.page_query_param) is not None
+            mode = 'exact' if paged else self.default_count_mode
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'approx':
+            return approximate_count(queryset)
+        return None
+
+    def get_ordering(self, queryset, view):
+        """
+        排序键：[(字段名, 是否降序), ...]，末尾保证有主键
+        """
+        ordering = list(queryset.query.order_by) or list(
+            getattr(view, 'keyset_ordering', None) or queryset.model._meta.ordering
+        )
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str):
+                raise TypeError('KeysetPagination 只支持字段名排序')
+            keys.append((item.lstrip('-'), item.startswith('-')))
+        if not any(name in ('pk', queryset.model._meta.pk.name) for name, _ in keys):
+            # 主键与首个排序字段同向，便于与组合索引方向一致
+            keys.append(('pk', keys[0][1] if keys else False))
+        return keys
+
+    def _resolve_field(self, model, name):
+        """
+        排序键对应的模型字段及其取值是否可能为 NULL；标注字段（如检索相关度）字段为 None
+
+        经关联取值的排序键逐级解析，途经可为空的外键时取值也可能为 NULL
+        """
+        if name == 'pk':
+            return model._meta.pk, False
+        parts = name.split(LOOKUP_SEP)
+        nullable = False
+        for index, part in enumerate(parts):
+            try:
+                field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+            except FieldDoesNotExist:
+                if len(parts) == 1:
+                    return None, True
+                raise TypeError(f'KeysetPagination 无法解析排序键 {name}')
+            if index == len(parts) - 1:
+                return field, nullable or field.null
+            if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                # 一对多、多对多及反向关联一行对应多个值，不能作为游标
+                raise TypeError(f'KeysetPagination 排序键 {name} 只能经外键或一对一关联取值')
+            nullable = nullable or field.null
+            model = field.related_model
+
+    def _order_expressions(self, reverse=False):
+        """
+        NULL 视为最大值（与 PostgreSQL 默认一致）：升序 NULLS LAST，降序 NULLS FIRST；
+        显式指定以保证不同数据库上游标比较与排序一致
+        """
+        expressions = []
+        for name, descending in self.keys:
+            if descending != reverse:
+                expressions.append(F(name).desc(nulls_first=True))
+            else:
+                expressions.append(F(name).asc(nulls_last=True))
+        return expressions
+
+    def _position_filter(self, values, reverse):
+        """
+        取排在游标之后（reverse 时为之前）的行：
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...，按各键方向与 NULL 位置展开
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), nullable, value in zip(self.keys, self.nullable, values):
+            if descending != reverse:
+                # 降序方向：之后的行取值更小；NULL 最大，排在最前
+                if value is None:
+                    beyond = Q(**{f'{name}__isnull': False})
+                else:
+                    beyond = Q(**{f'{name}__lt': value})
+            else:
+                if value is None:
+                    beyond = Q(pk__in=[])
+                else:
+                    beyond = Q(**{f'{name}__gt': value})
+                    if nullable:
+                        beyond |= Q(**{f'{name}__isnull': True})
+            condition |= equal & beyond
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+        # 首个排序键非空时补充范围条件，使数据库可以直接从索引定位
+        name, descending = self.keys[0]
+        if values[0] is not None and self.fields[0] is not None and not self.nullable[0]:
+            lookup = 'lte' if descending != reverse else 'gte'
+            condition &= Q(**{f'{name}__{lookup}': values[0]})
+        return condition
+
+    @staticmethod
+    def _row_value(row, name, field):
+        """行上排序键的值；经关联取值时沿关联对象逐级读取，途中为空则为 None"""
+        if field is None:
+            return getattr(row, name)
+        for part in name.split(LOOKUP_SEP)[:-1]:
+            row = getattr(row, part)
+            if row is None:
+                return None
+        return getattr(row, field.attname)
+
+    def encode_cursor(self, row, reverse=False):
+        values = [
+            _encode_value(self._row_value(row, name, field))
+            for (name, _), field in zip(self.keys, self.fields)
+        ]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            remove_query_param(self.request.build_absolute_uri(), self.page_query_param),
+            self.cursor_query_param,
+            token
+        )
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            values = payload['v']
+            if len(values) != len(self.keys):
+                raise ValueError
+            values = [
+                value if value is None or field is None else field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+            return values, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound('无效的分页游标')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
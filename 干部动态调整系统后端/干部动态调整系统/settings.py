@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,6 +56,7 @@ INSTALLED_APPS = [
     "staffing",
     "risk_rules",
     "audit",
+    "analytics",
 ]
 
 MIDDLEWARE = [
@@ -140,6 +144,10 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = []  # 可以添加额外的静态文件目录
 
+# 上传文件（导入任务的原始文件等，不对外提供访问）
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -180,6 +188,51 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# 缓存配置
+# 默认使用本地内存缓存。各类缓存的版本号存于数据库（见 orgs/versions.py），其他进程的变更同样能使本进程的缓存失效；
+# 多进程部署时可切换为共享缓存（如 Redis），各进程共用缓存结果，减少重复计算。
+# 共享缓存配置示例：
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cadre-management',
+    }
+}
+
+# 审计日志异步批量写入
+AUDIT_LOG_ASYNC = True  # 关闭后每条日志同步写库
+AUDIT_LOG_BATCH_SIZE = 100  # 缓冲达到该条数立即写库
+AUDIT_LOG_FLUSH_INTERVAL = 2.0  # 最长写库间隔（秒）
+AUDIT_LOG_RETRY_INTERVAL = 60.0  # 写库失败的事件补写间隔（秒）
+AUDIT_LOG_SPOOL_DIR = BASE_DIR / 'logs' / 'audit_spool'  # 未写库事件的落盘目录
+
+# 审计日志分区（PostgreSQL 按月分区，manage_audit_partitions 命令定期维护）
+AUDIT_LOG_PARTITIONS_AHEAD = 3  # 提前创建的月份数
+AUDIT_LOG_RETENTION_MONTHS = 36  # 在线保留的月份数，更早的分区归档后删除
+AUDIT_LOG_ARCHIVE_DIR = BASE_DIR / 'archive' / 'audit'  # 分区归档目录
+
+# 数据导入任务
+IMPORT_JOBS_RUN_IN_PROCESS = True  # 在 Web 进程的后台线程中处理；部署独立的 run_import_worker 时关闭
+IMPORT_JOB_THREADS = 1  # 进程内处理线程数
+IMPORT_JOB_MAX_ERRORS = 1000  # 每个任务保留的行错误条数
+IMPORT_JOB_STALE_TIMEOUT = 30 * 60  # 处理中任务超过该时间（秒）无进度视为中断
+ROSTER_IMPORT_WORKERS = min(os.cpu_count() or 1, 4)  # 大文件行校验的并行进程数，1 为不启用进程池
+ROSTER_SYNC_AFTER_IMPORT = True  # 导入完成后增量同步到干部主档和组织归属
+ROSTER_SYNC_OVERLAP = timedelta(minutes=10)  # 增量同步水位回退重读的窗口，应大于花名册写入事务的最长时长
+
+# 风险全量排查（scan_risks 命令定期执行，结果缓存供接口读取）
+RISK_B_LIBRARY_RATIO_THRESHOLD = 0.2  # 单元 B库人员占比超过该值时列入报告
+RISK_SCAN_REPORT_KEEP = 30  # 保留的排查报告份数
+
+# 运行测试时：审计日志同步写库，spool 指向临时目录，不在项目目录下留下分段文件；
+# 导入任务不在后台线程中处理
+TESTING = sys.argv[1:2] == ['test']
+if TESTING:
+    AUDIT_LOG_ASYNC = False
+    AUDIT_LOG_SPOOL_DIR = Path(tempfile.gettempdir()) / 'audit_spool_test'
+    IMPORT_JOBS_RUN_IN_PROCESS = False
+
 # CORS 配置
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 CORS_ALLOW_CREDENTIALS = True
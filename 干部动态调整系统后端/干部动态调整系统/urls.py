@@ -42,6 +42,10 @@ urlpatterns = [
     path("api/", include('accounts.urls')),
     path("api/", include('cadres.urls')),
     path("api/org/", include('orgs.urls')),
+    path("api/audit/", include('audit.urls')),
+    path("api/analytics/", include('analytics.urls')),
+    path("api/staffing/", include('staffing.urls')),
+    path("api/risk/", include('risk_rules.urls')),
     # Swagger文档
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),